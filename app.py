@@ -1,12 +1,31 @@
 import dash
-from dash import dcc, html, dash_table, Input, Output, callback
+from dash import dcc, html, dash_table, Input, Output, State, callback
+from dash.exceptions import PreventUpdate
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 from plotly.subplots import make_subplots
 import pandas as pd
 import numpy as np
 import os
 
+from data_store import load_normaliser
+from density import density_pyramid
+import figure_store
+from figure_store import figure, graph
+from lod import scatter_traces
+from model import RiskModel
+from page_cache import PageCache
+from partitions import PartitionCatalog
+from roster import COLUMNS as ROSTER_COLUMNS, Roster
+import score_api
+from score_history import ScoreRun, baseline_run, diff
+from scoring import RISK_BINS, RISK_LEVELS, WEIGHTS, score_weighted, weight_vector
+from snapshot import SnapshotStore
+from sqlite_backend import BACKEND, SqliteStudents
+from streaming import STREAMING, CohortAggregates, stream_aggregates
+from student_index import student_index
+
 # ── GitHub Repository ────────────────────────────────────────────────
 GITHUB_REPO   = "https://github.com/prachisingh342006/data_analytics_project"
 DRIVE_FOLDER  = "https://drive.google.com/drive/u/1/folders/1CN2-sJsGI9Efx54qJGCY23grD-jNhb7h"
@@ -15,31 +34,58 @@ KAGGLE_DATASET = "https://www.kaggle.com/datasets/lainguyn123/student-performanc
 # ── Load & Prepare Data ──────────────────────────────────────────────
 DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
                          "Student_performance_data _.csv")
-df = pd.read_csv(DATA_PATH)
-
-grade_map = {0: "A", 1: "B", 2: "C", 3: "D", 4: "F"}
-support_map = {0: "None", 1: "Low", 2: "Moderate", 3: "High", 4: "Very High"}
-edu_map = {0: "None", 1: "High School", 2: "Some College", 3: "Bachelor's", 4: "Higher"}
-
-df["GradeLetter"] = df["GradeClass"].map(grade_map)
-df["SupportLabel"] = df["ParentalSupport"].map(support_map)
-df["EducationLabel"] = df["ParentalEducation"].map(edu_map)
-df["PassFail"] = df["GradeClass"].apply(lambda x: "Fail" if x == 4 else "Pass")
-df["TutoringLabel"] = df["Tutoring"].map({0: "No Tutoring", 1: "With Tutoring"})
-df["GenderLabel"] = df["Gender"].map({0: "Female", 1: "Male"})
-
-max_abs = df["Absences"].max()
-max_study = df["StudyTimeWeekly"].max()
-df["RiskScore"] = (
-    (1 - df["GPA"] / 4.0) * 35 +
-    (df["Absences"] / max_abs) * 25 +
-    (1 - df["StudyTimeWeekly"] / max_study) * 20 +
-    (1 - df["ParentalSupport"] / 4.0) * 10 +
-    (df["GradeClass"] / 4.0) * 10
-).round(2)
-df["RiskCategory"] = pd.cut(df["RiskScore"], bins=[0, 30, 55, 75, 100],
-                             labels=["Low", "Medium", "High", "Critical"],
-                             include_lowest=True)
+RELOAD_INTERVAL = float(os.environ.get("EWS_RELOAD_INTERVAL", "5"))  # seconds, 0 = off
+
+# Workers share one read-only mapping of the prepared columns (data_store.py).
+# The watcher swaps in a new snapshot when the file changes; every callback
+# reads a single snapshot so in-flight requests finish on the data they began with.
+STORE = SnapshotStore(DATA_PATH, interval=RELOAD_INTERVAL).start_watcher()
+
+# Optional per-school / per-term partitions (partitions.py), loaded on selection.
+CATALOG = PartitionCatalog()
+
+# Built pages per (data version, tab); a reload starts from an empty cache.
+PAGES = PageCache()
+STORE.subscribe(lambda _snap: PAGES.clear())
+
+def selected_snapshot(cohorts):
+    return CATALOG.snapshot(cohorts) if cohorts else STORE.current()
+
+def aggregates(snap):
+    # KPIs and summary tables render from mergeable aggregates (see streaming.py),
+    # so the same pages work for a chunk-streamed cohort (EWS_STREAMING=1 folds
+    # the file chunk by chunk).  With EWS_BACKEND=sqlite the same views are
+    # answered by SQL over an indexed copy of the file.
+    def build(s):
+        if BACKEND == "sqlite" and os.path.isfile(s.path):
+            return SqliteStudents.for_csv(s.path)
+        if STREAMING and os.path.isfile(s.path):
+            return stream_aggregates(s.path)
+        return CohortAggregates.from_frame(s.df)
+    return snap.derive("agg", build)
+
+def risk_model(snap):
+    # Logistic model (model.py): coefficients persist per data hash, scores per snapshot.
+    return snap.derive("model", lambda s: RiskModel.for_frame(s.df))
+
+def model_scores(snap):
+    return snap.derive("scores:model", lambda s: risk_model(s).score(s.df))
+
+def scored_aggregates(snap, method="heuristic"):
+    if method != "model":
+        return aggregates(snap)
+    return snap.derive("agg:model",
+                       lambda s: CohortAggregates.rescored(s.df, *model_scores(s)))
+
+def risk_roster(snap, method="heuristic"):
+    # Full ranked cohort for the server-paged at-risk table (roster.py).
+    if method != "model":
+        return snap.derive("roster", lambda s: Roster(s.df))
+    return snap.derive("roster:model", lambda s: Roster(s.df, *model_scores(s)))
+
+# Display names of the scoring.py factors.
+FACTOR_NAMES = {"GPA": "GPA", "Absences": "Absences", "StudyTimeWeekly": "Study Time",
+                "ParentalSupport": "Parental Support", "GradeClass": "Grade Class"}
 
 # ── Colors ────────────────────────────────────────────────────────────
 COLORS = {
@@ -67,6 +113,8 @@ app = dash.Dash(__name__, suppress_callback_exceptions=True,
                             "content": "width=device-width, initial-scale=1"}])
 app.title = "Student Early Warning Dashboard"
 server = app.server  # Expose Flask server for Vercel deployment
+score_api.register(server, STORE.current, store=STORE)  # /api/score, /api/delta (score_api.py)
+figure_store.register(app, selected_snapshot)  # GET /api/figure/<version>/<name> (figure_store.py)
 
 # ── Shared Styles ─────────────────────────────────────────────────────
 CARD = {
@@ -86,11 +134,12 @@ KPI_BOX = {
     "minWidth": "160px",
 }
 
-def kpi_card(label, value, color=COLORS["accent"]):
+def kpi_card(label, value, color=COLORS["accent"], value_id=None):
+    value_props = {"id": value_id} if value_id else {}
     return html.Div([
         html.P(label, style={"color": COLORS["muted"], "fontSize": "13px",
                               "marginBottom": "6px", "fontWeight": "500"}),
-        html.H3(value, style={"color": color, "margin": "0", "fontSize": "28px",
+        html.H3(value, **value_props, style={"color": color, "margin": "0", "fontSize": "28px",
                                "fontWeight": "700"}),
     ], style=KPI_BOX)
 
@@ -123,44 +172,62 @@ def chart_layout(title=""):
         legend=dict(bgcolor="rgba(0,0,0,0)"),
     )
 
+# Validating the plotly_dark template is most of the cost of building a small
+# figure, so figures rebuilt on every callback attach it pre-encoded.
+DARK_TEMPLATE = pio.templates["plotly_dark"].to_plotly_json()
+
+def quick_figure(trace, title=""):
+    """Figure dict for *trace* styled as chart_layout(title)."""
+    fig = go.Figure(trace, layout=dict(chart_layout(title), template=None)).to_plotly_json()
+    fig["layout"]["template"] = DARK_TEMPLATE
+    return fig
+
 # ════════════════════════════════════════════════════════════════════════
 #  PAGE 1 – Academic Overview
 # ════════════════════════════════════════════════════════════════════════
-def page_academic():
-    total = len(df)
-    avg_gpa = round(df["GPA"].mean(), 2)
-    pass_rate = round((df["GradeClass"] < 4).mean() * 100, 1)
-    fail_rate = round((df["GradeClass"] == 4).mean() * 100, 1)
-    avg_study = round(df["StudyTimeWeekly"].mean(), 1)
-    avg_abs = round(df["Absences"].mean(), 1)
-
-    # Grade distribution bar
-    grade_counts = df["GradeLetter"].value_counts().reindex(["A","B","C","D","F"])
-    fig_grade = go.Figure(go.Bar(
+@figure("grade-distribution")
+def fig_grade_distribution(snap):
+    grade_counts = aggregates(snap).grade_distribution()
+    fig = go.Figure(go.Bar(
         x=grade_counts.index, y=grade_counts.values,
         marker_color=[GRADE_COLORS[g] for g in grade_counts.index],
         text=grade_counts.values, textposition="outside",
     ))
-    fig_grade.update_layout(**chart_layout("Grade Distribution"))
+    fig.update_layout(**chart_layout("Grade Distribution"))
+    return fig
 
-    # Pass/Fail pie
-    pf = df["PassFail"].value_counts()
-    fig_pf = go.Figure(go.Pie(
+@figure("pass-fail")
+def fig_pass_fail(snap):
+    pf = aggregates(snap).pass_fail()
+    fig = go.Figure(go.Pie(
         labels=pf.index, values=pf.values,
         marker_colors=[COLORS["green"], COLORS["red"]],
         hole=0.5, textinfo="label+percent",
     ))
-    fig_pf.update_layout(**chart_layout("Pass vs Fail Rate"))
+    fig.update_layout(**chart_layout("Pass vs Fail Rate"))
+    return fig
 
-    # GPA by education
-    gpa_edu = df.groupby("EducationLabel", observed=True)["GPA"].mean().reindex(
-        ["None","High School","Some College","Bachelor's","Higher"])
-    fig_edu = go.Figure(go.Bar(
+@figure("gpa-by-education")
+def fig_gpa_by_education(snap):
+    gpa_edu = aggregates(snap).gpa_by_education()
+    fig = go.Figure(go.Bar(
         x=gpa_edu.index, y=gpa_edu.values.round(2),
         marker_color=COLORS["orange"],
         text=gpa_edu.values.round(2), textposition="outside",
     ))
-    fig_edu.update_layout(**chart_layout("Avg GPA by Parental Education"))
+    fig.update_layout(**chart_layout("Avg GPA by Parental Education"))
+    return fig
+
+def page_academic(snap):
+    # Figures are encoded once per data version and fetched by the browser
+    # (figure_store.py); the page itself only carries the KPIs.
+    kpis = aggregates(snap).kpis()
+    total = kpis["total"]
+    avg_gpa = round(kpis["avg_gpa"], 2)
+    pass_rate = round(kpis["pass_rate"] * 100, 1)
+    fail_rate = round(kpis["fail_rate"] * 100, 1)
+    avg_study = round(kpis["avg_study"], 1)
+    avg_abs = round(kpis["avg_abs"], 1)
 
     return html.Div([
         # KPI row
@@ -175,11 +242,11 @@ def page_academic():
                   "marginBottom": "20px"}),
         # Charts row
         html.Div([
-            html.Div([dcc.Graph(figure=fig_grade)], style={**CARD, "flex": "1"}),
-            html.Div([dcc.Graph(figure=fig_pf)], style={**CARD, "flex": "1"}),
+            html.Div([graph(snap, "grade-distribution")], style={**CARD, "flex": "1"}),
+            html.Div([graph(snap, "pass-fail")], style={**CARD, "flex": "1"}),
         ], style={"display": "flex", "gap": "16px"}),
         html.Div([
-            html.Div([dcc.Graph(figure=fig_edu)], style={**CARD, "flex": "1"}),
+            html.Div([graph(snap, "gpa-by-education")], style={**CARD, "flex": "1"}),
         ]),
         # Resources Link Bar
         html.Div([
@@ -204,135 +271,276 @@ def page_academic():
 # ════════════════════════════════════════════════════════════════════════
 #  PAGE 2 – Risk Factor Analysis
 # ════════════════════════════════════════════════════════════════════════
-def page_risk_factors():
-    # Ensure categorical columns are strings for color mapping
-    df_plot = df.copy()
-    df_plot["GradeLetter"] = df_plot["GradeLetter"].astype(str)
-    df_plot["RiskCategory"] = df_plot["RiskCategory"].astype(str)
-
-    # Scatter: Study Time vs GPA
-    fig_scatter1 = go.Figure()
-    for grade in ["A", "B", "C", "D", "F"]:
-        mask = df_plot["GradeLetter"] == grade
-        if mask.any():
-            fig_scatter1.add_trace(go.Scatter(
-                x=df_plot.loc[mask, "StudyTimeWeekly"],
-                y=df_plot.loc[mask, "GPA"],
-                mode="markers",
-                name=grade,
-                marker=dict(color=GRADE_COLORS.get(grade, "#888"), opacity=0.6, size=6),
-            ))
-    fig_scatter1.update_layout(**chart_layout("Study Time vs GPA"),
-                                xaxis_title="Study Hours/Week", yaxis_title="GPA")
-
-    # Scatter: Absences vs GPA
-    fig_scatter2 = go.Figure()
-    for risk in ["Low", "Medium", "High", "Critical"]:
-        mask = df_plot["RiskCategory"] == risk
-        if mask.any():
-            fig_scatter2.add_trace(go.Scatter(
-                x=df_plot.loc[mask, "Absences"],
-                y=df_plot.loc[mask, "GPA"],
-                mode="markers",
-                name=risk,
-                marker=dict(color=RISK_COLORS.get(risk, "#888"), opacity=0.6, size=6),
-            ))
-    fig_scatter2.update_layout(**chart_layout("Absences vs GPA"),
-                                xaxis_title="Number of Absences", yaxis_title="GPA")
-
-    # Correlation bar
+def lod_scatter(snap, window, x, by, colors, title, xaxis_title):
+    # WebGL + level-of-detail sampling past the point budget (lod.py); a zoom
+    # window re-draws only the visible students, in full detail if they fit.
+    traces, shown, total = scatter_traces(snap.df, x, "GPA", by, colors, window,
+                                          opacity=0.6, size=6)
+    shown_title = f"{title} · {shown:,} of {total:,} shown" if shown < total else title
+    fig = go.Figure(traces)
+    # uirevision keeps the user's zoom and legend state when the detail arrives.
+    fig.update_layout(**chart_layout(shown_title), xaxis_title=xaxis_title, yaxis_title="GPA",
+                      uirevision=title)
+    return zoomed_to(fig, window)
+
+def density_heatmap(snap, window, x, by, title, xaxis_title):
+    # Binned counts from the per-version pyramid (density.py): the level is
+    # picked so the window holds a bounded number of bins, at any cohort size.
+    pyramid = density_pyramid(snap, x, "GPA", by)
+    xc, yc, counts, _ = pyramid.tile(window)
+    total = counts.sum(axis=0)
+    split = " · ".join(f"{g} %{{customdata[{i}]}}" for i, g in enumerate(pyramid.groups))
+    fig = go.Figure(go.Heatmap(
+        x=xc, y=yc, z=np.where(total > 0, total, np.nan).T,
+        customdata=np.moveaxis(counts, 0, -1).transpose(1, 0, 2),
+        colorscale="Inferno", colorbar=dict(title="Students"),
+        hovertemplate=(f"{xaxis_title} %{{x:.2f}}, GPA %{{y:.2f}}<br>"
+                       f"%{{z}} students<br>{split}<extra></extra>"),
+    ))
+    fig.update_layout(**chart_layout(f"{title} · density"), xaxis_title=xaxis_title,
+                      yaxis_title="GPA", uirevision=title)
+    return zoomed_to(fig, window)
+
+def zoomed_to(fig, window):
+    if window is not None:
+        x0, x1, y0, y1 = window
+        if x0 is not None:
+            fig.update_xaxes(range=[x0, x1])
+        if y0 is not None:
+            fig.update_yaxes(range=[y0, y1])
+    return fig
+
+@figure("study-vs-gpa", zoom=True)
+def fig_study_vs_gpa(snap, window=None):
+    return lod_scatter(snap, window, "StudyTimeWeekly", "GradeLetter", GRADE_COLORS,
+                       "Study Time vs GPA", "Study Hours/Week")
+
+@figure("absences-vs-gpa", zoom=True)
+def fig_absences_vs_gpa(snap, window=None):
+    return lod_scatter(snap, window, "Absences", "RiskCategory", RISK_COLORS,
+                       "Absences vs GPA", "Number of Absences")
+
+@figure("study-vs-gpa-density", zoom=True)
+def fig_study_vs_gpa_density(snap, window=None):
+    return density_heatmap(snap, window, "StudyTimeWeekly", "GradeLetter",
+                           "Study Time vs GPA", "Study Hours/Week")
+
+@figure("absences-vs-gpa-density", zoom=True)
+def fig_absences_vs_gpa_density(snap, window=None):
+    return density_heatmap(snap, window, "Absences", "RiskCategory",
+                           "Absences vs GPA", "Number of Absences")
+
+@figure("gpa-correlation")
+def fig_gpa_correlation(snap):
+    df = snap.df
     corr_factors = ["StudyTimeWeekly", "Absences", "ParentalSupport",
                     "ParentalEducation", "Tutoring"]
     corr_vals = [df[f].corr(df["GPA"]) for f in corr_factors]
     corr_labels = ["Study Time", "Absences", "Parental Support",
                    "Parental Education", "Tutoring"]
-    fig_corr = go.Figure(go.Bar(
+    fig = go.Figure(go.Bar(
         x=corr_vals, y=corr_labels, orientation="h",
         marker_color=[COLORS["green"] if v > 0 else COLORS["red"] for v in corr_vals],
         text=[f"{v:.3f}" for v in corr_vals], textposition="outside",
     ))
-    fig_corr.update_layout(**chart_layout("Correlation with GPA"))
+    fig.update_layout(**chart_layout("Correlation with GPA"))
+    return fig
 
-    # Tutoring impact
-    tut_gpa = df.groupby("TutoringLabel", observed=True)["GPA"].mean()
-    fig_tut = go.Figure(go.Bar(
+@figure("tutoring-impact")
+def fig_tutoring_impact(snap):
+    tut_gpa = snap.df.groupby("TutoringLabel", observed=True)["GPA"].mean()
+    fig = go.Figure(go.Bar(
         x=tut_gpa.index, y=tut_gpa.values.round(2),
         marker_color=[COLORS["red"], COLORS["green"]],
         text=tut_gpa.values.round(2), textposition="outside",
     ))
-    fig_tut.update_layout(**chart_layout("Tutoring Impact on GPA"))
+    fig.update_layout(**chart_layout("Tutoring Impact on GPA"))
+    return fig
 
-    # Parental Support
-    sup_gpa = df.groupby("SupportLabel", observed=True)["GPA"].mean().reindex(
+@figure("gpa-by-support")
+def fig_gpa_by_support(snap):
+    sup_gpa = snap.df.groupby("SupportLabel", observed=True)["GPA"].mean().reindex(
         ["None","Low","Moderate","High","Very High"])
-    fig_sup = go.Figure(go.Bar(
+    fig = go.Figure(go.Bar(
         x=sup_gpa.index, y=sup_gpa.values.round(2),
         marker_color=COLORS["accent"],
         text=sup_gpa.values.round(2), textposition="outside",
     ))
-    fig_sup.update_layout(**chart_layout("Avg GPA by Parental Support"))
+    fig.update_layout(**chart_layout("Avg GPA by Parental Support"))
+    return fig
 
+def risk_scatters(snap, mode="points"):
+    suffix = "-density" if mode == "density" else ""
+    return [
+        html.Div([graph(snap, f"study-vs-gpa{suffix}")], style={**CARD, "flex":"1"}),
+        html.Div([graph(snap, f"absences-vs-gpa{suffix}")], style={**CARD, "flex":"1"}),
+    ]
+
+def page_risk_factors(snap):
     return html.Div([
+        dcc.RadioItems(id="scatter-mode", value="points", inline=True,
+                       options=[{"label": " Points", "value": "points"},
+                                {"label": " Density", "value": "density"}],
+                       style={"color": COLORS["text"], "fontSize": "14px",
+                              "marginBottom": "12px"},
+                       inputStyle={"marginLeft": "12px"}),
+        html.Div(risk_scatters(snap), id="risk-scatters",
+                 style={"display":"flex","gap":"16px"}),
         html.Div([
-            html.Div([dcc.Graph(figure=fig_scatter1)], style={**CARD, "flex":"1"}),
-            html.Div([dcc.Graph(figure=fig_scatter2)], style={**CARD, "flex":"1"}),
-        ], style={"display":"flex","gap":"16px"}),
-        html.Div([
-            html.Div([dcc.Graph(figure=fig_corr)], style={**CARD, "flex":"1"}),
-            html.Div([dcc.Graph(figure=fig_tut)], style={**CARD, "flex":"1"}),
+            html.Div([graph(snap, "gpa-correlation")], style={**CARD, "flex":"1"}),
+            html.Div([graph(snap, "tutoring-impact")], style={**CARD, "flex":"1"}),
         ], style={"display":"flex","gap":"16px"}),
-        html.Div([dcc.Graph(figure=fig_sup)], style=CARD),
+        html.Div([graph(snap, "gpa-by-support")], style=CARD),
     ])
 
+@callback(Output("risk-scatters", "children"),
+          Input("scatter-mode", "value"), State("cohort-select", "value"),
+          prevent_initial_call=True)
+def update_scatter_mode(mode, cohorts=None):
+    return risk_scatters(selected_snapshot(cohorts), mode)
+
 # ════════════════════════════════════════════════════════════════════════
 #  PAGE 3 – Performance Risk Index
 # ════════════════════════════════════════════════════════════════════════
-def page_risk_index():
+def page_risk_index(snap, method="heuristic"):
+    search = html.Div([
+        html.H4("Look Up a Student", style={"color": COLORS["accent"], "marginBottom": "6px"}),
+        html.P("Enter a Student ID to see what drives their risk score.",
+               style={"color": COLORS["muted"], "fontSize": "13px", "marginBottom": "12px"}),
+        dcc.Input(id="student-search", type="number", placeholder="Student ID", debounce=True,
+                  style={"padding": "8px 12px", "borderRadius": "6px", "width": "200px"}),
+        html.Div(id="student-card", style={"marginTop": "16px"}),
+    ], style=CARD)
+    tuner = html.Div([
+        html.H4("Tune Risk Thresholds", style={"color": COLORS["accent"], "marginBottom": "6px"}),
+        html.P("Drag the cut points between Low / Medium / High / Critical.",
+               style={"color": COLORS["muted"], "fontSize": "13px", "marginBottom": "16px"}),
+        dcc.RangeSlider(id="risk-cuts", min=0, max=100, step=1, value=RISK_BINS[1:-1],
+                        pushable=1, marks={i: str(i) for i in range(0, 101, 10)},
+                        tooltip={"placement": "bottom"}),
+        html.Div(id="cut-results", style={"marginTop": "16px"}),
+    ], style=CARD)
+    if method != "model":
+        return html.Div([search] + risk_views(aggregates(snap), roster=method)
+                        + [movers_card(snap), tuner])
+    return html.Div([search, model_card(risk_model(snap))]
+                    + risk_views(scored_aggregates(snap, method), " (model)", roster=method)
+                    + [tuner])
+
+def score_movers(snap):
+    # Run-to-run diff against the last recorded run of other data (score_history.py).
+    def build(s):
+        base = baseline_run(s.sha1)
+        return diff(base, ScoreRun.from_frame(s.df)) if base is not None else None
+    return snap.derive("movers", build)
+
+def movers_card(snap, limit=200):
+    if snap.path != DATA_PATH:
+        return html.Div()  # history is recorded for the main dataset only
+    d = score_movers(snap)
+    title = html.H4(f"Movers Since {d.old.label}" if d else "Movers Since the Last Run",
+                    style={"color": COLORS["text"], "marginBottom": "10px"})
+    if d is None:
+        return html.Div([title, html.P(
+            "No earlier run recorded yet — build_dashboard.py and generate_pdf_report.py "
+            "record one each time the data changes.", style={"color": COLORS["muted"]})], style=CARD)
+
+    t = d.transitions
+    matrix = t.reset_index().rename(columns={"index": "From / To"})
+    movers = d.movers.head(limit).copy()
+    movers.columns = ["Student ID", "Old Score", "New Score", "Old Level", "New Level", "Change"]
+    movers["Change"] = np.where(movers["Change"] > 0, "▲ " + movers["Change"].astype(str),
+                                "▼ " + (-movers["Change"]).astype(str))
+    header = {"backgroundColor": COLORS["blue"], "color": "#fff",
+              "fontWeight": "bold", "textAlign": "center"}
+    cell = {"backgroundColor": COLORS["card"], "color": COLORS["text"], "textAlign": "center",
+            "padding": "8px", "border": f"1px solid {COLORS['card_border']}"}
+    return html.Div([
+        title,
+        html.Div([
+            kpi_card("Changed Level", f"{d.moved:,}"),
+            kpi_card("Escalated", f"{len(d.escalated()):,}", COLORS["red"]),
+            kpi_card("New Students", f"{int(t.loc['New'].drop('Removed').sum()):,}", COLORS["green"]),
+            kpi_card("Removed", f"{int(t['Removed'].sum()):,}", COLORS["muted"]),
+        ], style={"display": "flex", "gap": "12px", "flexWrap": "wrap", "marginBottom": "16px"}),
+        html.Div([
+            html.Div([dash_table.DataTable(
+                data=matrix.to_dict("records"),
+                columns=[{"name": c, "id": c} for c in matrix.columns],
+                style_header=header, style_cell=cell,
+            )], style={"flex": "1"}),
+            html.Div([dash_table.DataTable(
+                data=movers.to_dict("records"),
+                columns=[{"name": c, "id": c} for c in movers.columns],
+                style_header={**header, "backgroundColor": "#d32f2f"}, style_cell=cell,
+                style_data_conditional=[
+                    {"if": {"filter_query": '{Change} contains "▲"', "column_id": "Change"},
+                     "color": COLORS["red"]},
+                    {"if": {"filter_query": '{Change} contains "▼"', "column_id": "Change"},
+                     "color": COLORS["green"]},
+                ],
+                page_size=10,
+            )], style={"flex": "1.5"}),
+        ], style={"display": "flex", "gap": "16px", "alignItems": "flex-start"}),
+    ], style=CARD)
+
+def model_card(model):
+    # How the logistic model compares with the heuristic, and what drives it.
+    m = model.metrics
+    fmt = lambda v: f"{v:.3f}" if v is not None else "–"
+    coef = pd.Series(model.coef).sort_values()
+    fig = go.Figure(go.Bar(
+        x=coef.values, y=coef.index, orientation="h",
+        marker_color=[COLORS["red"] if b > 0 else COLORS["green"] for b in coef.values],
+    ))
+    fig.update_layout(**chart_layout("Model Coefficients (log-odds of failing per unit)"),
+                      height=320)
+    return html.Div([
+        html.H4("Logistic Risk Model", style={"color": COLORS["accent"], "marginBottom": "6px"}),
+        html.P("Risk Score = 100 × P(GradeClass F), fitted on study, attendance, support "
+               "and activity predictors. AUCs are on a 20% holdout.",
+               style={"color": COLORS["muted"], "fontSize": "13px", "marginBottom": "16px"}),
+        html.Div([
+            kpi_card("Model AUC", fmt(m.get("auc_model")), COLORS["purple"]),
+            kpi_card("Heuristic AUC", fmt(m.get("auc_heuristic")), COLORS["blue"]),
+            kpi_card("Training Rows", f"{m.get('rows', 0):,}"),
+        ], style={"display": "flex", "gap": "12px", "flexWrap": "wrap", "marginBottom": "16px"}),
+        dcc.Graph(figure=fig),
+    ], style=CARD)
+
+def risk_views(agg, title="", roster=None):
+    # Distribution charts, summary table and the at-risk list for one scoring of
+    # the cohort.  With roster=<score method> the list is the full ranked cohort,
+    # paged / sorted / filtered by update_roster; otherwise the Top 20.
     # Risk distribution
-    risk_order = ["Low","Medium","High","Critical"]
-    risk_counts = df["RiskCategory"].value_counts().reindex(risk_order)
+    risk_counts = agg.risk_distribution()
 
-    fig_pie = go.Figure(go.Pie(
+    fig_pie = quick_figure(go.Pie(
         labels=risk_counts.index, values=risk_counts.values,
         marker_colors=[RISK_COLORS[r] for r in risk_counts.index],
         hole=0.45, textinfo="label+percent+value",
-    ))
-    fig_pie.update_layout(**chart_layout("Student Risk Distribution"))
+    ), f"Student Risk Distribution{title}")
 
-    fig_bar = go.Figure(go.Bar(
+    fig_bar = quick_figure(go.Bar(
         x=risk_counts.index, y=risk_counts.values,
         marker_color=[RISK_COLORS[r] for r in risk_counts.index],
         text=risk_counts.values, textposition="outside",
-    ))
-    fig_bar.update_layout(**chart_layout("Students per Risk Category"))
+    ), f"Students per Risk Category{title}")
 
     # Risk summary table
-    risk_summary = df.groupby("RiskCategory", observed=False).agg(
-        Count=("StudentID","count"),
-        AvgGPA=("GPA","mean"),
-        AvgAbsences=("Absences","mean"),
-        AvgRiskScore=("RiskScore","mean"),
-    ).reindex(risk_order).reset_index()
+    risk_summary = agg.risk_summary()
     risk_summary["AvgGPA"] = risk_summary["AvgGPA"].round(2)
     risk_summary["AvgAbsences"] = risk_summary["AvgAbsences"].round(1)
     risk_summary["AvgRiskScore"] = risk_summary["AvgRiskScore"].round(1)
     risk_summary.columns = ["Risk Category","Count","Avg GPA","Avg Absences","Avg Risk Score"]
 
-    # Top 20 at-risk
-    top20 = df.nlargest(20, "RiskScore")[
-        ["StudentID","GPA","GradeLetter","Absences","StudyTimeWeekly","RiskScore","RiskCategory"]
-    ].copy()
-    top20["GPA"] = top20["GPA"].round(2)
-    top20["StudyTimeWeekly"] = top20["StudyTimeWeekly"].round(1)
-    top20.columns = ["Student ID","GPA","Grade","Absences","Study Hrs/Wk","Risk Score","Risk Level"]
-
-    return html.Div([
+    return [
         html.Div([
             html.Div([dcc.Graph(figure=fig_pie)], style={**CARD,"flex":"1"}),
             html.Div([dcc.Graph(figure=fig_bar)], style={**CARD,"flex":"1"}),
         ], style={"display":"flex","gap":"16px"}),
         html.Div([
-            html.H4("Risk Category Summary", style={"color": COLORS["text"], "marginBottom":"10px"}),
+            html.H4(f"Risk Category Summary{title}", style={"color": COLORS["text"], "marginBottom":"10px"}),
             dash_table.DataTable(
                 data=risk_summary.to_dict("records"),
                 columns=[{"name":c,"id":c} for c in risk_summary.columns],
@@ -349,31 +557,206 @@ def page_risk_index():
                 ],
             ),
         ], style=CARD),
-        html.Div([
-            html.H4("Top 20 At-Risk Students", style={"color": COLORS["text"], "marginBottom":"10px"}),
+        at_risk_list(agg, title, roster),
+    ]
+
+def at_risk_list(agg, title="", roster=None):
+    table_style = dict(
+        style_header={"backgroundColor":"#d32f2f","color":"#fff",
+                      "fontWeight":"bold","textAlign":"center"},
+        style_cell={"backgroundColor": COLORS["card"], "color": COLORS["text"],
+                    "textAlign":"center","padding":"8px",
+                    "border": f"1px solid {COLORS['card_border']}"},
+        style_data_conditional=[
+            {"if":{"filter_query":'{Risk Level} = "Critical"'},
+             "backgroundColor":"rgba(239,83,80,0.15)","color":COLORS["red"]},
+        ],
+        page_size=10,
+    )
+    if roster is None:
+        top20 = agg.top_n(20)
+        top20["GPA"] = top20["GPA"].round(2)
+        top20["StudyTimeWeekly"] = top20["StudyTimeWeekly"].round(1)
+        top20.columns = list(ROSTER_COLUMNS)
+        return html.Div([
+            html.H4(f"Top 20 At-Risk Students{title}", style={"color": COLORS["text"], "marginBottom":"10px"}),
             dash_table.DataTable(
                 data=top20.to_dict("records"),
                 columns=[{"name":c,"id":c} for c in top20.columns],
-                style_header={"backgroundColor":"#d32f2f","color":"#fff",
-                              "fontWeight":"bold","textAlign":"center"},
+                **table_style,
+            ),
+        ], style=CARD)
+    # Only the visible page is sent; update_roster answers every page / sort / filter.
+    return html.Div([
+        html.H4(f"At-Risk Roster{title}", style={"color": COLORS["text"], "marginBottom":"4px"}),
+        html.P("Every student, ranked by Risk Score. Sort by any column or filter "
+               "(e.g. >= 70, Critical, != F).",
+               style={"color": COLORS["muted"], "fontSize": "13px", "marginBottom": "10px"}),
+        dcc.Store(id="roster-method", data=roster),
+        dash_table.DataTable(
+            id="roster-table",
+            columns=[{"name":c,"id":c,
+                      "type":"text" if c in ("Grade","Risk Level") else "numeric"}
+                     for c in ROSTER_COLUMNS],
+            page_current=0, page_action="custom",
+            sort_action="custom", sort_mode="single", sort_by=[],
+            filter_action="custom", filter_query="",
+            **table_style,
+        ),
+        html.Div(id="roster-count", style={"color": COLORS["muted"], "fontSize": "12px",
+                                           "marginTop": "8px"}),
+    ], style=CARD)
+
+@callback(Output("roster-table", "data"), Output("roster-table", "page_count"),
+          Output("roster-count", "children"),
+          Input("roster-table", "page_current"), Input("roster-table", "page_size"),
+          Input("roster-table", "sort_by"), Input("roster-table", "filter_query"),
+          State("roster-method", "data"), State("cohort-select", "value"))
+def update_roster(page_current, page_size, sort_by, filter_query, method="heuristic",
+                  cohorts=None):
+    roster = risk_roster(selected_snapshot(cohorts), method)
+    try:
+        rows, total = roster.page(page_current, page_size or 10, sort_by, filter_query)
+    except ValueError as exc:
+        return [], 1, f"⚠ {exc}"
+    pages = max(-(-total // (page_size or 10)), 1)
+    return rows, pages, f"{total:,} of {len(roster):,} students"
+
+@callback(Output("cut-results", "children"),
+          Input("risk-cuts", "value"), State("cohort-select", "value"),
+          State("score-method", "value"))
+def update_cuts(cuts, cohorts=None, method="heuristic"):
+    if not cuts or len(cuts) != len(RISK_LEVELS) - 1:
+        raise PreventUpdate
+    # Re-bucketed from the 0.01-point score histogram: O(buckets), not O(students).
+    hist = scored_aggregates(selected_snapshot(cohorts), method).hist
+    bins = [RISK_BINS[0], *cuts, RISK_BINS[-1]]
+    tiers = hist.summary(bins, labels=RISK_LEVELS)
+    at = hist.above(cuts[1])
+
+    fig = go.Figure(go.Bar(
+        x=tiers["RiskCategory"], y=tiers["Count"],
+        marker_color=[RISK_COLORS[r] for r in RISK_LEVELS],
+        text=tiers["Count"], textposition="outside",
+    ))
+    fig.update_layout(**chart_layout("Students per Risk Category (tuned)"), height=320)
+
+    table = tiers.assign(
+        Range=[f"{a:g} – {b:g}" for a, b in zip(bins, bins[1:])],
+        AvgGPA=tiers["AvgGPA"].round(2), AvgAbsences=tiers["AvgAbsences"].round(1),
+        AvgRiskScore=tiers["AvgRiskScore"].round(1),
+    )[["RiskCategory", "Range", "Count", "AvgGPA", "AvgAbsences", "AvgRiskScore"]]
+    table.columns = ["Risk Category", "Range", "Count", "Avg GPA", "Avg Absences", "Avg Risk Score"]
+
+    return html.Div([
+        html.Div([
+            kpi_card(f"At-Risk (> {cuts[1]:g})", f"{at['count']:,}", COLORS["orange"]),
+            kpi_card("Avg GPA of At-Risk", f"{at['avg_gpa']:.2f}" if at["count"] else "–",
+                     COLORS["blue"]),
+        ], style={"display": "flex", "gap": "12px", "flexWrap": "wrap", "marginBottom": "16px"}),
+        html.Div([
+            html.Div([dcc.Graph(figure=fig)], style={"flex": "1"}),
+            html.Div([dash_table.DataTable(
+                data=table.to_dict("records"),
+                columns=[{"name": c, "id": c} for c in table.columns],
+                style_header={"backgroundColor": COLORS["blue"], "color": "#fff",
+                              "fontWeight": "bold", "textAlign": "center"},
                 style_cell={"backgroundColor": COLORS["card"], "color": COLORS["text"],
-                            "textAlign":"center","padding":"8px",
+                            "textAlign": "center", "padding": "10px",
                             "border": f"1px solid {COLORS['card_border']}"},
-                style_data_conditional=[
-                    {"if":{"filter_query":'{Risk Level} = "Critical"'},
-                     "backgroundColor":"rgba(239,83,80,0.15)","color":COLORS["red"]},
-                ],
-                page_size=10,
-            ),
-        ], style=CARD),
+            )], style={"flex": "1"}),
+        ], style={"display": "flex", "gap": "16px", "alignItems": "center"}),
+    ])
+
+@callback(Output("student-card", "children"),
+          Input("student-search", "value"), State("risk-weights", "data"),
+          State("cohort-select", "value"))
+def update_student_card(student_id, weights=None, cohorts=None):
+    if student_id is None:
+        return []
+    # O(1) from the per-version StudentID index (student_index.py).
+    info = student_index(selected_snapshot(cohorts)).lookup(int(student_id), weights)
+    if info is None:
+        return html.P(f"No student with ID {student_id}.", style={"color": COLORS["muted"]})
+
+    level = info["RiskCategory"]
+    cols = list(info["contributions"])
+    fig = go.Figure(go.Bar(
+        x=[info["contributions"][c] for c in cols], y=[FACTOR_NAMES[c] for c in cols],
+        orientation="h", marker_color=COLORS["orange"],
+        text=[f"{info['contributions'][c]:.1f} / {info['weights'][c]:g}" for c in cols],
+        textposition="auto",
+    ))
+    fig.update_layout(**chart_layout("Points per Factor (of the factor's weight)"), height=300)
+    fig.update_yaxes(autorange="reversed")
+
+    features = info["features"]
+    facts = [("Grade", features["GradeLetter"]), ("GPA", f"{features['GPA']:.2f}"),
+             ("Absences", features["Absences"]),
+             ("Study Hrs/Wk", f"{features['StudyTimeWeekly']:.1f}"),
+             ("Parental Support", features["SupportLabel"]),
+             ("Tutoring", features["TutoringLabel"]),
+             ("Parental Education", features["EducationLabel"]),
+             ("Age / Gender", f"{features['Age']} / {features['GenderLabel']}")]
+    weighted = (info["weighted_score"] != info["RiskScore"]
+                and kpi_card("Re-weighted Score", f"{info['weighted_score']:.1f}", COLORS["purple"]))
+    return html.Div([
+        html.Div([c for c in [
+            kpi_card("Risk Score", f"{info['RiskScore']:.1f}", RISK_COLORS.get(level, COLORS["text"])),
+            kpi_card("Risk Level", level or "–", RISK_COLORS.get(level, COLORS["text"])),
+            kpi_card("Percentile", f"{info['percentile']:.0f}th", COLORS["accent"]),
+            weighted,
+        ] if c], style={"display": "flex", "gap": "12px", "flexWrap": "wrap", "marginBottom": "16px"}),
+        html.Div([
+            html.Div([dcc.Graph(figure=fig)], style={"flex": "1.5"}),
+            html.Div([html.P([html.Span(f"{k}: ", style={"color": COLORS["muted"]}), str(v)],
+                             style={"color": COLORS["text"], "margin": "4px 0"})
+                      for k, v in facts], style={"flex": "1"}),
+        ], style={"display": "flex", "gap": "16px", "alignItems": "center"}),
     ])
 
 # ════════════════════════════════════════════════════════════════════════
 #  PAGE 4 – Intervention Simulator (Interactive Sliders)
 # ════════════════════════════════════════════════════════════════════════
-def page_intervention():
+STATUS_STYLE = {
+    "backgroundColor": COLORS["card"], "color": COLORS["muted"],
+    "padding": "16px", "borderRadius": "10px", "textAlign": "center",
+    "fontSize": "18px", "fontWeight": "700",
+    "border": f"2px solid {COLORS['card_border']}", "marginBottom": "16px",
+}
+
+def intervention_cohort(snap):
+    """Cohort constants the simulator projects from, computed once per data version."""
+    def build(s):
+        agg = aggregates(s)
+        # At-risk (RiskScore > 55) comes from the score histogram, not a pass over rows.
+        at = agg.hist.above(55)
+        avg_gpa_risk = float(at["avg_gpa"]) if at["count"] else None
+        return {"total": int(agg.kpis()["total"]), "fail_count": int(agg.pass_fail()["Fail"]),
+                "at_risk": at["count"], "avg_gpa_risk": avg_gpa_risk}
+    return snap.derive("intervention:cohort", build)
+
+def intervention_figure(cohort):
+    """Current vs projected bars; the browser fills in the projected values."""
+    fail_count, total = cohort["fail_count"], cohort["total"]
+    fail_rate = fail_count / total if total else 0.0
+    fig = make_subplots(rows=1, cols=2, subplot_titles=["Fail Count", "Fail Rate (%)"],
+                        specs=[[{"type":"bar"},{"type":"bar"}]])
+    fig.add_trace(go.Bar(x=["Current","Projected"], y=[fail_count, fail_count],
+                         marker_color=[COLORS["red"], COLORS["green"]],
+                         text=[fail_count, fail_count], textposition="outside"), row=1, col=1)
+    fig.add_trace(go.Bar(x=["Current","Projected"],
+                         y=[round(fail_rate*100,1), round(fail_rate*100,1)],
+                         marker_color=[COLORS["red"], COLORS["green"]],
+                         text=[f"{fail_rate*100:.1f}%"] * 2,
+                         textposition="outside"), row=1, col=2)
+    fig.update_layout(**chart_layout(""), showlegend=False, height=350)
+    return fig
+
+def page_intervention(snap):
     slider_style = {"marginBottom": "20px"}
     label_style = {"color": COLORS["text"], "fontWeight": "500", "marginBottom": "6px"}
+    cohort = intervention_cohort(snap)
 
     return html.Div([
         html.Div([
@@ -400,87 +783,104 @@ def page_intervention():
                              "borderRadius": "6px", "padding": "8px", "width": "150px"}),
         ], style={**CARD, "maxWidth": "600px"}),
 
-        html.Div(id="intervention-results"),
+        # Shipped once with the page; every slider move is projected in the browser.
+        dcc.Store(id="intervention-cohort", data=cohort),
+        html.Div([
+            html.Div([
+                kpi_card("Students Saved", "–", COLORS["green"], value_id="iv-saved"),
+                kpi_card("New Fail Rate", "–", COLORS["accent"], value_id="iv-fail-rate"),
+                kpi_card("Fail Rate Reduction", "–", COLORS["blue"], value_id="iv-reduction"),
+                kpi_card("Program Cost", "–", COLORS["orange"], value_id="iv-cost"),
+                kpi_card("Cost/Student Saved", "–", COLORS["purple"], value_id="iv-cost-saved"),
+            ], style={"display":"flex","gap":"12px","flexWrap":"wrap","marginBottom":"16px"}),
+            html.Div(id="intervention-status", style=STATUS_STYLE),
+            html.Div([dcc.Graph(id="intervention-graph", figure=intervention_figure(cohort))],
+                     style=CARD),
+        ], id="intervention-results"),
     ])
 
-@callback(
-    Output("intervention-results", "children"),
+# Same projection the server used to run per drag: GPA lift from study time and
+# attendance, students lifted past failing, tutoring cost for the at-risk share.
+app.clientside_callback(
+    """
+    function (study, absences, tutorPct, costPer, cohort, style, figure) {
+        const ns = window.dash_clientside;
+        if (!cohort || !figure) { throw ns.PreventUpdate; }
+        // Python's round(): decided on x's exact decimal value, halves to even.
+        const round = (x, digits = 0) => {
+            const exact = Math.abs(x).toFixed(digits + 25), cut = exact.indexOf(".") + 1 + digits;
+            const tail = exact.slice(cut), half = "5".padEnd(tail.length, "0");
+            let units = Number(exact.slice(0, cut).replace(".", ""));
+            if (tail > half || (tail === half && units % 2 === 1)) { units += 1; }
+            return Math.sign(x) * units / Math.pow(10, digits);
+        };
+        const total = cohort.total, fail = cohort.fail_count, avgGpa = cohort.avg_gpa_risk;
+        const failRate = total ? fail / total : 0;
+        const lift = (study || 0) * 0.04 + (absences || 0) * 0.03;
+        let saved = avgGpa !== null && avgGpa < 4 ? round(fail * (lift / (4 - avgGpa))) : 0;
+        saved = Math.min(saved, fail);
+        const newFail = Math.max(0, fail - saved);
+        const newRate = total ? newFail / total : 0;
+        const reduction = failRate - newRate;
+        const met = reduction >= failRate * 0.2;
+        const tutored = round(cohort.at_risk * (tutorPct || 0) / 100);
+        const cost = tutored * (costPer || 500);
+        const perSaved = saved > 0 ? round(cost / saved) : 0;
+
+        const pct = r => round(r * 100, 1).toFixed(1);
+        const money = v => "$" + v.toLocaleString("en-US");
+        const color = met ? COLORS.green : COLORS.red;
+        const data = figure.data.map(t => Object.assign({}, t));
+        data[0].y = [fail, newFail];
+        data[0].text = [fail, newFail];
+        data[1].y = [round(failRate * 100, 1), round(newRate * 100, 1)];
+        data[1].text = [pct(failRate) + "%", pct(newRate) + "%"];
+        return [
+            String(saved), pct(newRate) + "%", pct(reduction) + "pp",
+            money(cost), money(perSaved),
+            met ? "✅ TARGET MET — 20% Failure Reduction Achieved!"
+                : "❌ TARGET NOT MET — Increase intervention parameters",
+            Object.assign({}, style, {color: color, border: "2px solid " + color}),
+            Object.assign({}, figure, {data: data}),
+        ];
+    }
+    """.replace("COLORS.green", repr(COLORS["green"])).replace("COLORS.red", repr(COLORS["red"])),
+    Output("iv-saved", "children"),
+    Output("iv-fail-rate", "children"),
+    Output("iv-reduction", "children"),
+    Output("iv-cost", "children"),
+    Output("iv-cost-saved", "children"),
+    Output("intervention-status", "children"),
+    Output("intervention-status", "style"),
+    Output("intervention-graph", "figure"),
     Input("slider-study", "value"),
     Input("slider-absence", "value"),
     Input("slider-tutor", "value"),
     Input("input-cost", "value"),
+    State("intervention-cohort", "data"),
+    State("intervention-status", "style"),
+    State("intervention-graph", "figure"),
 )
-def update_intervention(study_inc, abs_red, tutor_pct, cost_per):
-    total = len(df)
-    fail_count = int((df["GradeClass"] == 4).sum())
-    fail_rate = fail_count / total
-    at_risk = int((df["RiskScore"] > 55).sum())
-    avg_gpa_risk = df.loc[df["RiskScore"] > 55, "GPA"].mean()
-
-    gpa_lift = study_inc * 0.04 + abs_red * 0.03
-    new_gpa = avg_gpa_risk + gpa_lift
-    saved = int(round(fail_count * (gpa_lift / (4 - avg_gpa_risk)))) if avg_gpa_risk < 4 else 0
-    saved = min(saved, fail_count)
-    new_fail = max(0, fail_count - saved)
-    new_fail_rate = new_fail / total
-    reduction = fail_rate - new_fail_rate
-    target_met = reduction >= fail_rate * 0.2
-
-    tutor_students = int(round(at_risk * tutor_pct / 100))
-    total_cost = tutor_students * (cost_per or 500)
-    cost_per_saved = int(round(total_cost / saved)) if saved > 0 else 0
-
-    # Comparison chart
-    fig = make_subplots(rows=1, cols=2, subplot_titles=["Fail Count", "Fail Rate (%)"],
-                        specs=[[{"type":"bar"},{"type":"bar"}]])
-    fig.add_trace(go.Bar(x=["Current","Projected"], y=[fail_count, new_fail],
-                         marker_color=[COLORS["red"], COLORS["green"]],
-                         text=[fail_count, new_fail], textposition="outside"), row=1, col=1)
-    fig.add_trace(go.Bar(x=["Current","Projected"],
-                         y=[round(fail_rate*100,1), round(new_fail_rate*100,1)],
-                         marker_color=[COLORS["red"], COLORS["green"]],
-                         text=[f"{fail_rate*100:.1f}%", f"{new_fail_rate*100:.1f}%"],
-                         textposition="outside"), row=1, col=2)
-    fig.update_layout(**chart_layout(""), showlegend=False, height=350)
-
-    status_color = COLORS["green"] if target_met else COLORS["red"]
-    status_text = "✅ TARGET MET — 20% Failure Reduction Achieved!" if target_met else \
-                  "❌ TARGET NOT MET — Increase intervention parameters"
-
-    return html.Div([
-        html.Div([
-            kpi_card("Students Saved", str(saved), COLORS["green"]),
-            kpi_card("New Fail Rate", f"{new_fail_rate*100:.1f}%", COLORS["accent"]),
-            kpi_card("Fail Rate Reduction", f"{reduction*100:.1f}pp", COLORS["blue"]),
-            kpi_card("Program Cost", f"${total_cost:,}", COLORS["orange"]),
-            kpi_card("Cost/Student Saved", f"${cost_per_saved:,}", COLORS["purple"]),
-        ], style={"display":"flex","gap":"12px","flexWrap":"wrap","marginBottom":"16px"}),
-        html.Div(status_text, style={
-            "backgroundColor": COLORS["card"], "color": status_color,
-            "padding": "16px", "borderRadius": "10px", "textAlign": "center",
-            "fontSize": "18px", "fontWeight": "700",
-            "border": f"2px solid {status_color}", "marginBottom": "16px",
-        }),
-        html.Div([dcc.Graph(figure=fig)], style=CARD),
-    ])
 
 # ════════════════════════════════════════════════════════════════════════
 #  PAGE 5 – Ethics & Safeguards
 # ════════════════════════════════════════════════════════════════════════
-def page_ethics():
-    # Factor weights pie
-    fig_wt = go.Figure(go.Pie(
-        labels=["GPA (35%)","Absences (25%)","Study Time (20%)",
-                "Parental Support (10%)","Grade Class (10%)"],
-        values=[35,25,20,10,10],
+def weights_figure(weights):
+    return quick_figure(go.Pie(
+        labels=[f"{FACTOR_NAMES[c]} ({w:g}%)" for c, w in weights.items()],
+        values=list(weights.values()),
         marker_colors=[COLORS["blue"], COLORS["orange"], COLORS["accent"],
                        COLORS["yellow"], COLORS["purple"]],
         hole=0.45, textinfo="label+percent",
-    ))
-    fig_wt.update_layout(**chart_layout("Risk Score Factor Weights"))
+    ), "Risk Score Factor Weights")
+
+def page_ethics(snap):
+    df = snap.df
+    # Factor weights pie
+    fig_wt = weights_figure(WEIGHTS)
 
     # Fairness: Fail rate by gender
-    fair_gender = df.groupby("GenderLabel", as_index=False).agg(
+    fair_gender = df.groupby("GenderLabel", as_index=False, observed=True).agg(
         Total=("GradeClass", "count"),
         FailCount=("GradeClass", lambda x: (x == 4).sum())
     )
@@ -529,9 +929,19 @@ def page_ethics():
         "🆔 **De-identification** — Reports use student IDs only.",
     ]
 
+    label_style = {"color": COLORS["text"], "fontWeight": "500", "marginBottom": "6px"}
+    weight_sliders = []
+    for col, w in WEIGHTS.items():
+        weight_sliders += [
+            html.Label(f"{FACTOR_NAMES[col]} weight", style=label_style),
+            dcc.Slider(id=f"weight-{col}", min=0, max=50, step=5, value=w,
+                       marks={i: str(i) for i in range(0, 51, 10)},
+                       tooltip={"placement": "bottom"}),
+        ]
+
     return html.Div([
         html.Div([
-            html.Div([dcc.Graph(figure=fig_wt)], style={**CARD,"flex":"1"}),
+            html.Div([dcc.Graph(id="weights-pie", figure=fig_wt)], style={**CARD,"flex":"1"}),
             html.Div([
                 html.H4("Labeling Transparency Matrix",
                          style={"color": COLORS["text"],"marginBottom":"10px"}),
@@ -547,6 +957,14 @@ def page_ethics():
                 ),
             ], style={**CARD,"flex":"1.5"}),
         ], style={"display":"flex","gap":"16px"}),
+        html.Div([
+            html.H4("What-if: Re-weight the Risk Index",
+                    style={"color": COLORS["accent"], "marginBottom": "6px"}),
+            html.P("Weights are rescaled to sum to 100; the whole cohort is re-scored.",
+                   style={"color": COLORS["muted"], "fontSize": "13px", "marginBottom": "16px"}),
+            *weight_sliders,
+        ], style={**CARD, "maxWidth": "600px"}),
+        html.Div(id="reweight-results"),
         html.Div([
             html.Div([dcc.Graph(figure=fig_gen)], style={**CARD,"flex":"1"}),
             html.Div([dcc.Graph(figure=fig_eth)], style={**CARD,"flex":"1"}),
@@ -559,6 +977,32 @@ def page_ethics():
         ], style=CARD),
     ])
 
+@callback(
+    Output("weights-pie", "figure"),
+    Output("reweight-results", "children"),
+    Output("risk-weights", "data"),
+    *[Input(f"weight-{col}", "value") for col in WEIGHTS],
+    State("cohort-select", "value"),
+)
+def update_weights(*values):
+    *values, cohorts = values
+    weights = {col: v or 0 for col, v in zip(WEIGHTS, values)}
+    if not any(weights.values()):
+        raise PreventUpdate
+    if weights == WEIGHTS:
+        return weights_figure(WEIGHTS), [], WEIGHTS
+    snap = selected_snapshot(cohorts)
+    # Normalised factors are built once per snapshot (on the persisted
+    # normaliser's scales, as the stored scores are); each re-weight is F @ w.
+    factors = snap.derive("factors", lambda s: load_normaliser().factors(s.df))
+    scores, codes = score_weighted(factors, weights)
+    # Grade / education / GPA totals do not depend on the weights: reuse them.
+    base = aggregates(snap)
+    agg = CohortAggregates.rescored(snap.df, scores, codes, top_k=20,
+                                    base=base if isinstance(base, CohortAggregates) else None)
+    share = dict(zip(WEIGHTS, weight_vector(weights).round(1)))
+    return weights_figure(share), risk_views(agg, " (re-weighted)"), weights
+
 # ════════════════════════════════════════════════════════════════════════
 #  MAIN LAYOUT
 # ════════════════════════════════════════════════════════════════════════
@@ -669,6 +1113,20 @@ app.layout = html.Div([
         "margin": "16px 30px 0 30px",
     }),
 
+    # Cohort selector (lists partitions under cohorts/; empty = default file)
+    # and the risk score behind the Risk Index tab
+    html.Div([
+        dcc.Dropdown(id="cohort-select", multi=True, value=[], options=[],
+                     placeholder="All students (default dataset) — select school / term cohorts",
+                     style={"color": "#000", "flex": "1"}),
+        dcc.RadioItems(id="score-method", value="heuristic", inline=True,
+                       options=[{"label": " Weighted heuristic", "value": "heuristic"},
+                                {"label": " Logistic model", "value": "model"}],
+                       style={"color": COLORS["text"], "fontSize": "14px"},
+                       inputStyle={"marginLeft": "12px"}),
+    ], style={"padding": "16px 30px 0", "display": "flex", "gap": "16px",
+              "alignItems": "center"}),
+
     # Tabs
     html.Div([
         dcc.Tabs(id="tabs", value="tab-1", children=[
@@ -688,15 +1146,39 @@ app.layout = html.Div([
     # Page content
     html.Div(id="tab-content", style={"padding": "20px 30px"}),
 
+    # Data version: re-renders the open tab after a hot reload
+    dcc.Store(id="data-version", data=STORE.version),
+    # Ethics-tab factor weights, used to explain single-student lookups
+    dcc.Store(id="risk-weights", data=WEIGHTS),
+    dcc.Interval(id="data-version-poll", interval=30_000),
+
 ], style={"backgroundColor": COLORS["bg"], "minHeight": "100vh", "fontFamily": "Segoe UI, Roboto, sans-serif"})
 
-@callback(Output("tab-content", "children"), Input("tabs", "value"))
-def render_tab(tab):
-    if tab == "tab-1": return page_academic()
-    if tab == "tab-2": return page_risk_factors()
-    if tab == "tab-3": return page_risk_index()
-    if tab == "tab-4": return page_intervention()
-    if tab == "tab-5": return page_ethics()
+@callback(Output("data-version", "data"),
+          Input("data-version-poll", "n_intervals"), State("data-version", "data"))
+def poll_data_version(_, seen):
+    if STORE.version == seen:
+        raise PreventUpdate
+    return STORE.version
+
+@callback(Output("cohort-select", "options"), Input("data-version-poll", "n_intervals"))
+def list_cohorts(_):
+    return [{"label": CATALOG.label(k), "value": k} for k in CATALOG.partitions()]
+
+@callback(Output("tab-content", "children"),
+          Input("tabs", "value"), Input("data-version", "data"),
+          Input("cohort-select", "value"), Input("score-method", "value"))
+def render_tab(tab, _version=None, cohorts=None, method="heuristic"):
+    snap = selected_snapshot(cohorts)
+    if tab == "tab-1": return PAGES.page(snap, tab, lambda: page_academic(snap))
+    if tab == "tab-2": return PAGES.page(snap, tab, lambda: page_risk_factors(snap))
+    if tab == "tab-3": return PAGES.page(snap, tab, lambda: page_risk_index(snap, method), method)
+    if tab == "tab-4": return PAGES.page(snap, tab, lambda: page_intervention(snap))
+    if tab == "tab-5": return PAGES.page(snap, tab, lambda: page_ethics(snap))
+
+@server.get("/api/page-cache")
+def page_cache_stats():
+    return PAGES.stats()
 
 # ════════════════════════════════════════════════════════════════════════
 if __name__ == "__main__":
@@ -0,0 +1,67 @@
+"""
+bench_storage.py
+pandas vs SQLite backend for the Risk Index aggregations.
+
+For each cohort size a synthetic CSV is generated (synth.py), then
+both backends answer the same questions: the Academic Overview KPIs, the risk
+summary groupby and the score histogram's at-risk tier.  Build / load time is
+reported separately from query time.
+
+    python benchmarks/bench_storage.py --rows 100000 5000000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_store import load_students                        # noqa: E402
+from sqlite_backend import SqliteStudents, build_sqlite    # noqa: E402
+from streaming import CohortAggregates                     # noqa: E402
+from synth import write_csv                                # noqa: E402
+
+
+def timed(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def bench(rows, workdir):
+    csv = os.path.join(workdir, f"students_{rows}.csv")
+    write_csv(csv, rows)
+
+    t_load, df = timed(lambda: load_students(csv, use_cache=False), repeat=1)
+    # A fresh aggregate per call, so each timing includes the pass over the rows.
+    t_pd_kpi, pd_kpis = timed(lambda: CohortAggregates.from_frame(df, 20).kpis())
+    t_pd_sum, _ = timed(lambda: CohortAggregates.from_frame(df, 20).risk_summary())
+    t_pd_at, pd_at = timed(lambda: CohortAggregates.from_frame(df, 20).hist.above(55))
+
+    db = os.path.join(workdir, f"students_{rows}.sqlite")
+    t_build, _ = timed(lambda: build_sqlite(csv, db), repeat=1)
+    t_sql_kpi, sql_kpis = timed(lambda: SqliteStudents(db).kpis())
+    t_sql_sum, _ = timed(lambda: SqliteStudents(db).risk_summary())
+    t_sql_at, sql_at = timed(lambda: SqliteStudents(db).hist.above(55))
+    assert pd_kpis["total"] == sql_kpis["total"] and pd_at["count"] == sql_at["count"]
+
+    print(f"\n{rows:,} students")
+    print(f"  {'':22s}{'pandas':>12s}{'sqlite':>12s}")
+    print(f"  {'load / build':22s}{t_load:12.3f}{t_build:12.3f}  s")
+    print(f"  {'kpis':22s}{t_pd_kpi * 1e3:12.1f}{t_sql_kpi * 1e3:12.1f}  ms")
+    print(f"  {'risk summary':22s}{t_pd_sum * 1e3:12.1f}{t_sql_sum * 1e3:12.1f}  ms")
+    print(f"  {'at-risk tier':22s}{t_pd_at * 1e3:12.1f}{t_sql_at * 1e3:12.1f}  ms")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[2])
+    ap.add_argument("--rows", type=int, nargs="+", default=[100_000, 5_000_000])
+    args = ap.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.rows:
+            bench(n, tmp)
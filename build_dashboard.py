@@ -1,5 +1,5 @@
-import pandas as pd
 import numpy as np
+import pandas as pd
 from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.chart import BarChart, PieChart, LineChart, Reference
@@ -9,24 +9,18 @@ from openpyxl.utils import get_column_letter
 from openpyxl.formatting.rule import ColorScaleRule
 import os
 
+from data_store import load_students
+from score_history import record_run
+from streaming import STREAMING, CohortAggregates, iter_prepared_chunks
+
 DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Student_performance_data _.csv")
 OUT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Student_Early_Warning_Dashboard.xlsx")
 
-df = pd.read_csv(DATA_PATH)
-N = len(df)
-DATA_END_ROW = N + 1
-
-grade_map = {0: "A", 1: "B", 2: "C", 3: "D", 4: "F"}
-df["GradeLetter"] = df["GradeClass"].map(grade_map)
-df["RiskScore"] = (
-    (1 - df["GPA"] / 4.0) * 35 +
-    (df["Absences"] / df["Absences"].max()) * 25 +
-    (1 - df["StudyTimeWeekly"] / df["StudyTimeWeekly"].max()) * 20 +
-    (1 - df["ParentalSupport"] / 4.0) * 10 +
-    (df["GradeClass"] / 4.0) * 10
-).round(2)
-df["RiskCategory"] = pd.cut(df["RiskScore"], bins=[0, 30, 55, 75, 100],
-    labels=["Low", "Medium", "High", "Critical"], include_lowest=True)
+# EWS_STREAMING=1 reads the file chunk by chunk: each chunk is written to the
+# Data sheet and folded into the aggregates, then dropped (streaming.py).
+chunks = iter_prepared_chunks(DATA_PATH) if STREAMING else [load_students(DATA_PATH)]
+agg = CohortAggregates(top_k=25)
+scored = []  # StudentID / RiskScore / RiskCategory, for the score snapshot
 
 # STYLES
 DARK_BLUE = "1B2A4A"
@@ -101,13 +95,19 @@ headers_data = ["StudentID","Age","Gender","Ethnicity","ParentalEducation",
     "GPA","GradeClass","GradeLetter","RiskScore","RiskCategory"]
 for ci, h in enumerate(headers_data, 1):
     ws_data.cell(row=1, column=ci, value=h)
-for ri, row_data in enumerate(df.itertuples(index=False), 2):
-    vals = list(row_data)
-    for ci, val in enumerate(vals, 1):
-        if isinstance(val, (np.integer,)): val = int(val)
-        elif isinstance(val, (np.floating,)): val = float(val)
-        ws_data.cell(row=ri, column=ci, value=val)
+ri = 1
+for chunk in chunks:
+    agg.update(chunk)
+    scored.append(chunk[["StudentID", "RiskScore", "RiskCategory"]])
+    for row_data in chunk[headers_data].itertuples(index=False):
+        ri += 1
+        for ci, val in enumerate(row_data, 1):
+            if isinstance(val, (np.integer,)): val = int(val)
+            elif isinstance(val, (np.floating,)): val = float(val)
+            ws_data.cell(row=ri, column=ci, value=val)
 ws_data.sheet_state = "hidden"
+N = agg.n
+DATA_END_ROW = N + 1
 
 COL = {h: get_column_letter(i+1) for i, h in enumerate(headers_data)}
 DER = DATA_END_ROW
@@ -538,17 +538,17 @@ ws3.add_chart(ch_rbar, "I21")
 # Top 25 At-Risk
 section_label(ws3, "Top 25 At-Risk Students (Highest Risk Scores)", 14, 1, 9)
 write_hdr(ws3, 15, 2, ["Rank", "Student ID", "GPA", "Grade", "Absences", "Study Hrs", "Risk Score", "Risk Level"])
-top25 = df.nlargest(25, "RiskScore")
-for idx, (_, stu) in enumerate(top25.iterrows()):
+top25 = agg.top_n(25)
+for idx, stu in enumerate(top25.itertuples(index=False)):
     r = 16 + idx
     sc(ws3, r, 2, idx+1, align=Alignment(horizontal="center"))
-    sc(ws3, r, 3, int(stu["StudentID"]), align=Alignment(horizontal="center"))
-    sc(ws3, r, 4, round(float(stu["GPA"]),2), fmt=dec_fmt, align=Alignment(horizontal="center"))
-    sc(ws3, r, 5, str(stu["GradeLetter"]), align=Alignment(horizontal="center"))
-    sc(ws3, r, 6, int(stu["Absences"]), align=Alignment(horizontal="center"))
-    sc(ws3, r, 7, round(float(stu["StudyTimeWeekly"]),1), fmt='0.0', align=Alignment(horizontal="center"))
-    sc(ws3, r, 8, round(float(stu["RiskScore"]),1), fmt='0.0', align=Alignment(horizontal="center"))
-    rcat = str(stu["RiskCategory"])
+    sc(ws3, r, 3, int(stu.StudentID), align=Alignment(horizontal="center"))
+    sc(ws3, r, 4, round(float(stu.GPA),2), fmt=dec_fmt, align=Alignment(horizontal="center"))
+    sc(ws3, r, 5, str(stu.GradeLetter), align=Alignment(horizontal="center"))
+    sc(ws3, r, 6, int(stu.Absences), align=Alignment(horizontal="center"))
+    sc(ws3, r, 7, round(float(stu.StudyTimeWeekly),1), fmt='0.0', align=Alignment(horizontal="center"))
+    sc(ws3, r, 8, round(float(stu.RiskScore),1), fmt='0.0', align=Alignment(horizontal="center"))
+    rcat = str(stu.RiskCategory)
     rf = RED_FILL if rcat == "Critical" else ORANGE_FILL
     sc(ws3, r, 9, rcat, font=bold_font, fill=PatternFill("solid", fgColor=rf), align=Alignment(horizontal="center"))
 stripe(ws3, 16, 40, 2, 9)
@@ -977,8 +977,10 @@ for ws, color in zip(sheets, tab_colors):
 
 wb.active = wb.sheetnames.index("1. Academic Overview")
 wb.save(OUT_PATH)
+run = record_run(pd.concat(scored, ignore_index=True), path=DATA_PATH)  # score snapshot for run-to-run movers
 print("=" * 60)
 print("  Dashboard saved:", OUT_PATH)
 print("  5 sheets with Excel formulas + charts")
 print("  " + str(N) + " students processed")
+print("  Score snapshot:", run or "unchanged since the last run")
 print("=" * 60)
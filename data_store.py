@@ -0,0 +1,442 @@
+"""
+data_store.py
+Shared loader for the student performance dataset.
+
+app.py, build_dashboard.py and generate_pdf_report.py all start from
+load_students() instead of calling pd.read_csv() themselves.  The first call
+parses the CSV, drops the rows that fail validation (validate.py), derives the
+label / risk columns and writes the prepared frame to a local .npz cache of
+typed arrays; later calls against the same file load the arrays straight back
+without parsing, validating or re-deriving anything.
+
+The cache is content-addressed: entries are named after the CSV's SHA-1, and a
+small index remembers (size, mtime) -> SHA-1 so an unchanged file is not
+re-hashed on every start.  The validation report and the quarantined rows are
+cached under the same SHA-1.
+
+Columns are stored with the compact SCHEMA below (int8 flags, uint8 ordinals,
+Categorical labels) since every server worker keeps its own copy of the frame.
+GPA and StudyTimeWeekly stay float64: they are the file's values, shown and
+filtered on in the roster and written back out to the workbook, so the cache
+keeps them at source precision.  `python data_store.py --memory` prints the per-student
+footprint with default dtypes vs. the compact schema.
+
+For multi-worker servers, load_students(mmap=True) instead keeps the prepared
+columns in a single memory-mapped file of fixed-width arrays (categoricals as
+int8 codes).  Each worker maps it read-only and wraps the mapped pages in
+pandas columns without copying, so the OS page cache holds one copy of the
+cohort however many workers run.  `python data_store.py --build-mmap` writes
+the file ahead of time as a deploy step.
+"""
+
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from normalise import Normaliser
+from scoring import RISK_BINS, RISK_LEVELS, assign_scores  # noqa: F401  (re-exported)
+from validate import ValidationReport, validate
+
+log = logging.getLogger(__name__)
+
+# ─── paths ────────────────────────────────────────────────────────────────────
+BASE      = os.path.dirname(os.path.abspath(__file__))
+DATA_PATH = os.path.join(BASE, "Student_performance_data _.csv")
+CACHE_DIR = os.environ.get("EWS_CACHE_DIR", os.path.join(BASE, ".cache"))
+
+# Bump whenever prepare_frame() changes so stale cache entries are ignored.
+CACHE_VERSION = 5
+
+# Absences / StudyTimeWeekly normalisation (normalise.py) and where its state lives.
+NORMALISER      = os.environ.get("EWS_NORMALISER", "cohort")
+NORMALISER_PATH = os.environ.get("EWS_NORMALISER_PATH", os.path.join(BASE, "normaliser.json"))
+
+# ─── label maps ───────────────────────────────────────────────────────────────
+grade_map    = {0: "A", 1: "B", 2: "C", 3: "D", 4: "F"}
+support_map  = {0: "None", 1: "Low", 2: "Moderate", 3: "High", 4: "Very High"}
+edu_map      = {0: "None", 1: "High School", 2: "Some College", 3: "Bachelor's", 4: "Higher"}
+tutoring_map = {0: "No Tutoring", 1: "With Tutoring"}
+gender_map   = {0: "Female", 1: "Male"}
+
+# Columns of the raw export, in file order.
+RAW_COLUMNS = ["StudentID", "Age", "Gender", "Ethnicity", "ParentalEducation",
+               "StudyTimeWeekly", "Absences", "Tutoring", "ParentalSupport",
+               "Extracurricular", "Sports", "Music", "Volunteering", "GPA", "GradeClass"]
+
+# ─── compact schema ───────────────────────────────────────────────────────────
+FLAG_COLUMNS    = ["Gender", "Tutoring", "Extracurricular", "Sports", "Music", "Volunteering"]
+ORDINAL_COLUMNS = ["Age", "Ethnicity", "ParentalEducation", "Absences",
+                   "ParentalSupport", "GradeClass"]
+
+SCHEMA = {
+    "StudentID": "int32",
+    **{c: "int8" for c in FLAG_COLUMNS},
+    **{c: "uint8" for c in ORDINAL_COLUMNS},
+    "StudyTimeWeekly": "float64",
+    "GPA": "float64",
+    "RiskScore": "float64",
+}
+
+# Label column -> (source code column, label dictionary).  Every label column is
+# a Categorical whose categories come from this one table, so codes stay int8
+# and no per-row strings are kept.
+LABEL_SOURCES = {
+    "GradeLetter":    ("GradeClass", grade_map),
+    "SupportLabel":   ("ParentalSupport", support_map),
+    "EducationLabel": ("ParentalEducation", edu_map),
+    "PassFail":       ("GradeClass", {0: "Pass", 1: "Fail"}),
+    "TutoringLabel":  ("Tutoring", tutoring_map),
+    "GenderLabel":    ("Gender", gender_map),
+}
+LABEL_DTYPES = {col: pd.CategoricalDtype(list(labels.values()))
+                for col, (_, labels) in LABEL_SOURCES.items()}
+
+
+# ─── derivation ───────────────────────────────────────────────────────────────
+def _label_codes(values, n):
+    codes = np.asarray(values)
+    return np.where((codes >= 0) & (codes < n), codes, -1).astype(np.int8)
+
+
+def prepare_frame(df, compact=True, max_abs=None, max_study=None, normaliser=None):
+    """Add the label, RiskScore and RiskCategory columns to a raw frame.
+
+    With compact=False the labels are plain strings and the numeric columns
+    keep pandas' default dtypes (used for the memory report baseline).
+    max_abs / max_study default to this frame's maxima; chunked readers pass
+    the whole-file values so every chunk is scored on the same scale.  A
+    Normaliser, if given, supplies the scales instead.
+    """
+    df.columns = df.columns.str.strip()
+    if compact:
+        # Narrow first so every score is derived from the stored values, and a
+        # row rescored later (delta ingest) gets exactly the same result.
+        df = apply_schema(df)
+        for col, (src, labels) in LABEL_SOURCES.items():
+            codes = df[src] == 4 if col == "PassFail" else df[src]
+            df[col] = pd.Categorical.from_codes(_label_codes(codes, len(labels)),
+                                                dtype=LABEL_DTYPES[col])
+    else:
+        df["GradeLetter"] = df["GradeClass"].map(grade_map)
+        df["SupportLabel"] = df["ParentalSupport"].map(support_map)
+        df["EducationLabel"] = df["ParentalEducation"].map(edu_map)
+        df["PassFail"] = np.where(df["GradeClass"] == 4, "Fail", "Pass")
+        df["TutoringLabel"] = df["Tutoring"].map(tutoring_map)
+        df["GenderLabel"] = df["Gender"].map(gender_map)
+
+    if normaliser is not None:
+        return normaliser.assign(df)
+    return assign_scores(df, max_abs, max_study)
+
+
+def load_normaliser(strategy=None):
+    """The persisted Normaliser for *strategy* (default EWS_NORMALISER)."""
+    return Normaliser.load(NORMALISER_PATH, strategy or NORMALISER)
+
+
+def apply_schema(df):
+    return df.astype({c: t for c, t in SCHEMA.items() if c in df.columns})
+
+
+def memory_report(path=DATA_PATH):
+    """Return bytes per student for the default-dtype and compact frames."""
+    default = prepare_frame(pd.read_csv(path), compact=False)
+    compact = prepare_frame(pd.read_csv(path))
+    n = max(len(default), 1)
+    before = default.memory_usage(deep=True, index=False)
+    after = compact.memory_usage(deep=True, index=False)
+    table = pd.DataFrame({"default": before / n, "compact": after / n,
+                          "default_dtype": default.dtypes.astype(str),
+                          "compact_dtype": compact.dtypes.astype(str)})
+    return {"rows": len(default), "before": before.sum() / n,
+            "after": after.sum() / n, "columns": table}
+
+
+# ─── fingerprinting ───────────────────────────────────────────────────────────
+def file_sha1(path, block=1 << 20):
+    h = hashlib.sha1()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(block), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _index_path():
+    return os.path.join(CACHE_DIR, "index.json")
+
+
+def _read_index():
+    try:
+        with open(_index_path()) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def fingerprint(path):
+    """Return (size, mtime_ns, sha1) for *path*, re-hashing only when stat changed."""
+    st = os.stat(path)
+    key = os.path.abspath(path)
+    entry = _read_index().get(key)
+    if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+        return st.st_size, st.st_mtime_ns, entry["sha1"]
+
+    sha1 = file_sha1(path)
+    index = _read_index()
+    index[key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha1": sha1}
+    try:
+        _atomic_write(_index_path(), json.dumps(index, indent=1).encode())
+    except OSError:
+        pass  # read-only deploys (e.g. Vercel) simply skip the cache
+    return st.st_size, st.st_mtime_ns, sha1
+
+
+# ─── cache I/O ────────────────────────────────────────────────────────────────
+def _atomic_write(path, payload):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(payload)
+    os.replace(tmp, path)
+
+
+def cache_path(sha1, norm_key=""):
+    tag = f"-{norm_key}" if norm_key else ""
+    return os.path.join(CACHE_DIR, f"students-v{CACHE_VERSION}-{sha1[:16]}{tag}.npz")
+
+
+# ─── validation ───────────────────────────────────────────────────────────────
+def validation_path(sha1):
+    return os.path.join(CACHE_DIR, f"validation-v{CACHE_VERSION}-{sha1[:16]}.json")
+
+
+def quarantine_path(sha1):
+    return os.path.join(CACHE_DIR, f"quarantine-{sha1[:16]}.csv")
+
+
+def read_raw(path):
+    df = pd.read_csv(path)
+    df.columns = df.columns.str.strip()
+    return df
+
+
+def validation_report(path=DATA_PATH, df=None, sha1=None):
+    """Validate *path* once per file hash; bad rows are written to quarantine_path()."""
+    if sha1 is None:
+        _, _, sha1 = fingerprint(path)
+    cached = validation_path(sha1)
+    try:
+        with open(cached, "rb") as fh:
+            return ValidationReport.from_json(fh.read())
+    except (OSError, ValueError, KeyError):
+        pass
+
+    if df is None:
+        df = read_raw(path)
+    report = validate(df)
+    if not report.ok:
+        log.warning("%d of %d rows in %s failed validation (quarantined to %s)",
+                    len(report.bad_rows), report.rows, path, quarantine_path(sha1))
+    try:
+        if not report.ok:
+            _atomic_write(quarantine_path(sha1),
+                          report.quarantine(df).to_csv(index=False).encode())
+        _atomic_write(cached, report.to_json())
+    except OSError:
+        pass
+    return report
+
+
+def read_validated(path=DATA_PATH, sha1=None):
+    """Raw frame of *path* with the rows that fail validation dropped."""
+    df = read_raw(path)
+    return validation_report(path, df, sha1).clean(df)
+
+
+def save_frame(df, path):
+    """Write *df* as one typed array per column (no pickled objects)."""
+    arrays = {"__columns__": np.array(df.columns, dtype=str)}
+    for i, col in enumerate(df.columns):
+        s = df[col]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            arrays[f"c{i}.codes"] = s.cat.codes.to_numpy()
+            arrays[f"c{i}.categories"] = np.asarray(s.cat.categories, dtype=str)
+            arrays[f"c{i}.ordered"] = np.array(s.cat.ordered)
+        elif s.dtype.kind in "biuf":
+            arrays[f"c{i}"] = s.to_numpy()
+        else:
+            arrays[f"c{i}"] = s.to_numpy(dtype=str)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as fh:
+        np.savez(fh, **arrays)
+    os.replace(tmp, path)
+
+
+def load_frame(path):
+    with np.load(path, allow_pickle=False) as npz:
+        data = {}
+        for i, col in enumerate(npz["__columns__"]):
+            if f"c{i}.codes" in npz.files:
+                data[col] = pd.Categorical.from_codes(npz[f"c{i}.codes"],
+                                                      categories=npz[f"c{i}.categories"],
+                                                      ordered=bool(npz[f"c{i}.ordered"]))
+            else:
+                data[col] = npz[f"c{i}"]
+    return pd.DataFrame(data, copy=False)
+
+
+# ─── shared memory-mapped store ───────────────────────────────────────────────
+# Layout: b"EWSMMAP1" | uint64 header length | JSON header | column blocks.
+# Every block starts on a 64-byte boundary; header offsets are relative to the
+# first block.
+MMAP_MAGIC = b"EWSMMAP1"
+MMAP_ALIGN = 64
+
+
+def _align(n):
+    return -(-n // MMAP_ALIGN) * MMAP_ALIGN
+
+
+def mmap_path(sha1, norm_key=""):
+    tag = f"-{norm_key}" if norm_key else ""
+    return os.path.join(CACHE_DIR, f"students-v{CACHE_VERSION}-{sha1[:16]}{tag}.mmap")
+
+
+def save_mmap(df, path):
+    specs, blocks, offset = [], [], 0
+    for col in df.columns:
+        s = df[col]
+        spec = {"name": col}
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            arr = s.cat.codes.to_numpy()
+            spec["categories"] = [str(c) for c in s.cat.categories]
+            spec["ordered"] = bool(s.cat.ordered)
+        elif s.dtype.kind in "biuf":
+            arr = s.to_numpy()
+        else:
+            raise TypeError(f"column {col!r} has no fixed-width representation ({s.dtype})")
+        arr = np.ascontiguousarray(arr)
+        spec.update(dtype=arr.dtype.str, offset=offset, nbytes=arr.nbytes)
+        specs.append(spec)
+        blocks.append((offset, arr))
+        offset = _align(offset + arr.nbytes)
+
+    header = json.dumps({"rows": len(df), "columns": specs}).encode()
+    base = _align(16 + len(header))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(MMAP_MAGIC + np.uint64(len(header)).tobytes() + header)
+        for off, arr in blocks:
+            fh.seek(base + off)
+            fh.write(arr.tobytes())
+        fh.truncate(base + offset)
+    os.replace(tmp, path)
+
+
+def open_mmap(path):
+    """Map *path* read-only and return a frame whose columns are views of it."""
+    raw = np.asarray(np.memmap(path, mode="r", dtype=np.uint8))
+    if bytes(raw[:8]) != MMAP_MAGIC:
+        raise ValueError(f"{path} is not a student mmap store")
+    hlen = int(raw[8:16].view("<u8")[0])
+    header = json.loads(bytes(raw[16:16 + hlen]))
+    base = _align(16 + hlen)
+
+    data = {}
+    for spec in header["columns"]:
+        start = base + spec["offset"]
+        arr = raw[start:start + spec["nbytes"]].view(np.dtype(spec["dtype"]))
+        if "categories" in spec:
+            # The codes stay a view of the map; save_mmap wrote them in range,
+            # so the per-worker bounds scan is skipped.
+            dtype = pd.CategoricalDtype(spec["categories"], ordered=spec["ordered"])
+            data[spec["name"]] = pd.Categorical.from_codes(arr, dtype=dtype, validate=False)
+        else:
+            data[spec["name"]] = arr
+    return pd.DataFrame(data, copy=False)
+
+
+# ─── public entry point ───────────────────────────────────────────────────────
+def load_students(path=DATA_PATH, use_cache=True, mmap=False, normaliser=None):
+    """Return the prepared student frame for *path*.
+
+    Uses the .npz cache by default, or the shared read-only mmap store with
+    mmap=True.  Either cache is (re)built on a miss.  Scores use *normaliser*
+    (default load_normaliser()); a file it has not seen yet is observed first.
+    """
+    norm = normaliser or load_normaliser()
+    if norm.strategy == "cohort":
+        norm = None
+    if not use_cache:
+        df = read_raw(path)
+        df = validate(df).clean(df)
+        if norm is not None:
+            norm.observe(df)
+        return prepare_frame(df, normaliser=norm)
+
+    _, _, sha1 = fingerprint(path)
+    raw = None
+    if norm is not None and not norm.seen(sha1):
+        raw = read_validated(path, sha1)
+        norm.observe(raw, source=sha1)
+        try:
+            norm.save()
+        except OSError:
+            pass
+    key = norm.key if norm is not None else ""
+    if mmap:
+        cached, read, write = mmap_path(sha1, key), open_mmap, save_mmap
+    else:
+        cached, read, write = cache_path(sha1, key), load_frame, save_frame
+    if os.path.exists(cached):
+        try:
+            return read(cached)
+        except (OSError, ValueError, KeyError):
+            pass  # corrupt / partial entry: rebuild below
+
+    df = prepare_frame(raw if raw is not None else read_validated(path, sha1), normaliser=norm)
+    try:
+        write(df, cached)
+    except OSError:
+        return df
+    return read(cached) if mmap else df
+
+
+def build_mmap_store(path=DATA_PATH):
+    """Deploy step: write the mmap store for *path* and return its location."""
+    norm = load_normaliser()
+    load_students(path, mmap=True, normaliser=norm)
+    return mmap_path(fingerprint(path)[2], norm.key)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[2])
+    ap.add_argument("path", nargs="?", default=DATA_PATH)
+    ap.add_argument("--memory", action="store_true",
+                    help="print bytes per student before/after the compact schema")
+    ap.add_argument("--build-mmap", action="store_true",
+                    help="write the shared memory-mapped store for server workers")
+    args = ap.parse_args()
+
+    if args.memory:
+        rep = memory_report(args.path)
+        print(rep["columns"].round(2).to_string())
+        print(f"\n{rep['rows']:,} students: {rep['before']:.1f} B/student (default) -> "
+              f"{rep['after']:.1f} B/student (compact), "
+              f"{rep['before'] / rep['after']:.1f}x smaller")
+    elif args.build_mmap:
+        print("Wrote", build_mmap_store(args.path))
+    else:
+        t0 = time.perf_counter()
+        frame = load_students(args.path)
+        print(f"Loaded {len(frame):,} students in {time.perf_counter() - t0:.3f}s")
@@ -0,0 +1,347 @@
+"""
+delta.py
+Incremental ingest of new, changed and removed students.
+
+A delta file is a CSV keyed by StudentID with an optional Op column:
+
+    U (default)  insert the student, or overwrite the columns given for them
+    D            remove the student
+
+Blank cells in an update keep the student's current value; inserts must carry
+every raw column.  If a StudentID appears twice, the last row wins.  The
+resulting rows go through validate.py, and a delta with any bad row is
+rejected whole.
+
+DeltaState keeps the prepared rows in preallocated, append-only column
+arrays with a tombstone mask, a StudentID -> row map, the current Absences /
+StudyTimeWeekly normalisers and a CohortAggregates.  apply() touches only the
+affected rows: their old values are subtracted from
+the aggregates, the new rows are scored and folded back in.  Only when a delta
+moves one of the normalisers (a new maximum, or the student holding the
+maximum is changed / removed) does every score change; then the cohort is
+rescored in one vectorised pass and the aggregates rebuilt, still without
+re-reading the CSV.  With a persisted normaliser (normalise.py) the scales come
+from it instead: "fixed" and "quantile" never rescore on a delta, "running"
+only when a delta brings a new maximum.
+
+apply_to_store() publishes each applied delta as a new snapshot without
+copying: the frame is a view of the stored rows, and the aggregates, roster,
+student index and score histogram are carried over, updated for just the
+changed rows.  With EWS_DELTA_API=1 the dashboard accepts deltas on
+POST /api/delta (score_api.py).
+
+    python delta.py changes.csv --out "Student_performance_data _.csv"
+"""
+
+import functools
+import hashlib
+import threading
+
+import numpy as np
+import pandas as pd
+
+from data_store import DATA_PATH, RAW_COLUMNS, load_normaliser, load_students, prepare_frame
+from normalise import Normaliser
+from roster import Roster
+from scoring import assign_scores
+from streaming import CohortAggregates
+from student_index import StudentIndex
+from topk import TOP_LIMIT
+from validate import validate
+
+OPS = {"U", "D"}
+MIN_SPARE = 1024  # appendable rows kept free past the stored ones
+_apply_lock = threading.Lock()  # one delta at a time: DeltaState is not thread-safe
+
+
+class DeltaResult:
+    __slots__ = ("inserted", "updated", "deleted", "missing", "rescored", "version")
+
+    def __init__(self, inserted, updated, deleted, missing, rescored, version=None):
+        self.inserted = inserted
+        self.updated = updated
+        self.deleted = deleted
+        self.missing = missing
+        self.rescored = rescored
+        self.version = version  # data version published with it (apply_to_store)
+
+    def __repr__(self):
+        return (f"DeltaResult(inserted={self.inserted}, updated={self.updated}, "
+                f"deleted={self.deleted}, missing={self.missing}, rescored={self.rescored})")
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def read_delta(delta):
+    """Normalise a delta (path or frame) to one row per StudentID with an Op column."""
+    df = pd.read_csv(delta) if isinstance(delta, str) else delta.copy()
+    df.columns = df.columns.str.strip()
+    if "StudentID" not in df.columns:
+        raise ValueError("delta has no StudentID column")
+    unknown = set(df.columns) - set(RAW_COLUMNS) - {"Op"}
+    if unknown:
+        raise ValueError(f"delta has unknown columns: {sorted(unknown)}")
+    if "Op" not in df.columns:
+        df["Op"] = "U"
+    df["Op"] = df["Op"].fillna("U").astype(str).str.strip().str.upper()
+    bad = ~df["Op"].isin(OPS)
+    if bad.any():
+        raise ValueError(f"unknown Op values: {sorted(df.loc[bad, 'Op'].unique())}")
+    return df.drop_duplicates("StudentID", keep="last").reset_index(drop=True)
+
+
+class DeltaState:
+    """Mutable working copy of a cohort that absorbs deltas incrementally."""
+
+    def __init__(self, df, top_k=TOP_LIMIT, normaliser=None):
+        self.top_k = top_k
+        self.max_abs = df["Absences"].max()
+        self.max_study = df["StudyTimeWeekly"].max()
+        norm = normaliser or load_normaliser()
+        self.normaliser = None if norm.strategy == "cohort" else norm
+        self.agg = CohortAggregates.from_frame(df, top_k)
+        self._agg_shared = False  # handed to a snapshot: copy before changing it
+        self._published = None    # (epoch, roster, index) handed out last
+        self.epoch = 0
+        self._reset(df)
+
+    @classmethod
+    def from_csv(cls, path=DATA_PATH, top_k=TOP_LIMIT):
+        return cls(load_students(path), top_k)
+
+    # ── storage ──────────────────────────────────────────────────────────
+    def _reset(self, df):
+        """Store *df*'s rows, all live, in fresh arrays with room to append."""
+        n = len(df)
+        capacity = n + max(n // 4, MIN_SPARE)
+        self.dtypes = {c: df[c].dtype for c in df.columns
+                       if isinstance(df[c].dtype, pd.CategoricalDtype)}
+        self.store = {}
+        for c in df.columns:
+            values = df[c].cat.codes.to_numpy() if c in self.dtypes else df[c].to_numpy()
+            self.store[c] = np.empty(capacity, dtype=values.dtype)
+            self.store[c][:n] = values
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.alive[:n] = True
+        self.n = n
+        self.n_dead = 0
+        self.rows = dict(zip(df["StudentID"].tolist(), range(n)))
+        self.epoch += 1       # row positions start over
+        self._mark = n        # rows from here on are new since the last publish
+        self._removed = []    # row positions tombstoned since the last publish
+
+    def _grow(self, need):
+        capacity = max(need, 2 * len(self.alive))
+        for c, arr in self.store.items():
+            self.store[c] = np.empty(capacity, dtype=arr.dtype)
+            self.store[c][:self.n] = arr[:self.n]
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:self.n] = self.alive[:self.n]
+        self.alive = alive
+
+    def _append(self, rows):
+        start, k = self.n, len(rows)
+        if start + k > len(self.alive):
+            self._grow(start + k)
+        for c, arr in self.store.items():
+            s = rows[c]
+            arr[start:start + k] = s.cat.codes.to_numpy() if c in self.dtypes else s.to_numpy()
+        self.alive[start:start + k] = True
+        self.n += k
+        self.rows.update(zip(rows["StudentID"].tolist(), range(start, start + k)))
+
+    def _view(self):
+        """Rows 0..n-1, tombstones included, as a frame of read-only views (no copy)."""
+        data = {}
+        for c, arr in self.store.items():
+            values = arr[:self.n]
+            values.flags.writeable = False
+            data[c] = (pd.Categorical.from_codes(values, dtype=self.dtypes[c], validate=False)
+                       if c in self.dtypes else values)
+        return pd.DataFrame(data, copy=False)
+
+    def frame(self):
+        """Live rows only: the storage itself while no row has been removed."""
+        return _live(self._view(), self.alive[:self.n] if self.n_dead else None)
+
+    # ── applying ─────────────────────────────────────────────────────────
+    def apply(self, delta):
+        delta = read_delta(delta)
+        view = self._view()
+        pos = np.array([self.rows.get(i, -1) for i in delta["StudentID"].tolist()],
+                       dtype=np.int64)
+        deleting = (delta["Op"] == "D").to_numpy()
+        existing = pos >= 0
+        upd = existing & ~deleting
+        ins = ~existing & ~deleting
+        dele = existing & deleting
+
+        touched = pos[existing]
+        old = view.iloc[touched]
+
+        # New raw rows: updates overlay the delta on the current values.
+        patch_cols = [c for c in RAW_COLUMNS if c in delta.columns]
+        current = view.iloc[pos[upd]][RAW_COLUMNS].reset_index(drop=True)
+        patch = delta.loc[upd, patch_cols].reset_index(drop=True)
+        updates = pd.DataFrame({c: np.where(patch[c].isna().to_numpy(), current[c].to_numpy(),
+                                            patch[c].to_numpy())
+                                if c in patch else current[c].to_numpy() for c in RAW_COLUMNS})
+        inserts = delta.loc[ins, patch_cols].reset_index(drop=True)
+        missing_cols = [c for c in RAW_COLUMNS if c not in inserts.columns or inserts[c].isna().any()]
+        if len(inserts) and missing_cols:
+            raise ValueError(f"inserted students are missing values for {missing_cols}")
+        new_raw = pd.concat([updates, inserts[RAW_COLUMNS] if len(inserts) else inserts],
+                            ignore_index=True)
+        report = validate(new_raw)
+        if not report.ok:
+            raise ValueError("delta rows fail validation:\n"
+                             + report.summary().to_string(index=False))
+
+        if self.normaliser is not None:
+            rescore = self.normaliser.observe(new_raw)
+            prepared = prepare_frame(new_raw, normaliser=self.normaliser)
+        else:
+            rescore, prepared = self._cohort_scores(old, touched, new_raw)
+        prepared = prepared[list(self.store)]
+
+        if self._agg_shared:  # the published snapshot keeps the aggregates it was given
+            self.agg = self.agg.copy()
+            self._agg_shared = False
+        if not rescore:
+            self.agg.remove(old)
+
+        # Rows are never rewritten, since published snapshots still read them:
+        # changed and deleted rows become tombstones and the new rows are appended.
+        self.alive[touched] = False
+        self.n_dead += len(touched)
+        self._removed.extend(touched.tolist())
+        for sid in delta.loc[dele, "StudentID"].tolist():
+            del self.rows[sid]
+        self._append(prepared)
+
+        if rescore:
+            df = self.frame()
+            if self.normaliser is not None:
+                self.normaliser.assign(df)
+                try:
+                    self.normaliser.save()
+                except OSError:
+                    pass
+            else:
+                assign_scores(df, self.max_abs, self.max_study)
+            self._reset(df)
+            self.agg = CohortAggregates.from_frame(df, self.top_k)
+        else:
+            self.agg.update(prepared)
+            if self.agg.top_stale:
+                self.agg.rebuild_top(self.frame())
+            if self.n_dead * 10 >= self.n:
+                self._reset(self.frame())  # compact once a tenth is tombstones
+
+        return DeltaResult(inserted=int(ins.sum()), updated=int(upd.sum()),
+                           deleted=int(dele.sum()),
+                           missing=int((deleting & ~existing).sum()),
+                           rescored=bool(rescore))
+
+    def _cohort_scores(self, old, touched, new_raw):
+        # Normalisers: only a vectorised max over live rows if the old max left.
+        self.alive[touched] = False
+        max_abs, max_study = self.max_abs, self.max_study
+        live = self.alive[:self.n]
+        if (old["Absences"] == max_abs).any():
+            max_abs = self.store["Absences"][:self.n][live].max(initial=0)
+        if (old["StudyTimeWeekly"] == max_study).any():
+            max_study = self.store["StudyTimeWeekly"][:self.n][live].max(initial=0)
+        self.alive[touched] = True
+        if len(new_raw):
+            max_abs = max(max_abs, new_raw["Absences"].max())
+            max_study = max(max_study, new_raw["StudyTimeWeekly"].max())
+        rescore = (max_abs, max_study) != (self.max_abs, self.max_study)
+        self.max_abs, self.max_study = max_abs, max_study
+        return rescore, prepare_frame(new_raw, max_abs=max_abs, max_study=max_study)
+
+    # ── publishing ───────────────────────────────────────────────────────
+    def reference(self):
+        """Fixed normaliser at the scales the current scores were computed with."""
+        caps = self.normaliser.caps if self.normaliser is not None else None
+        return Normaliser("fixed", caps=dict(caps or {"Absences": float(self.max_abs),
+                                                      "StudyTimeWeekly": float(self.max_study)}))
+
+    def published(self, prev=None):
+        """(frame, derived values) for SnapshotStore.publish(frame, change, **derived).
+
+        Nothing is copied.  The frame is a function that gathers the live rows
+        on first use.  The aggregates are handed over as they are (apply()
+        copies them before changing them again).  The roster and student
+        index are the last published ones, or *prev*'s (the snapshot this
+        state was built from), updated for the rows removed and appended
+        since; after a compaction or rescore they are built afresh.
+        """
+        view = self._view()
+        alive = self.alive[:self.n].copy() if self.n_dead else None
+        added = np.arange(self._mark, self.n)
+        if alive is not None:
+            added = added[alive[added]]
+        removed = [r for r in self._removed if r < self._mark]  # not added meanwhile
+        norm = self.reference()
+        if self._published is not None and self._published[0] == self.epoch:
+            _, roster, index = self._published
+        elif self.epoch == 1 and prev is not None:
+            roster, index = prev.cached("roster"), prev.cached("student_index")
+        else:
+            roster = index = None
+        roster = (roster.updated(view, alive, removed, added) if roster is not None
+                  else Roster(view, alive=alive))
+        index = (index.updated(view, alive, removed, added, norm, self.agg.hist)
+                 if index is not None else StudentIndex(view, norm, alive, self.agg.hist))
+
+        self._published = (self.epoch, roster, index)
+        self._mark, self._removed = self.n, []
+        self._agg_shared = True
+        derived = {"agg": self.agg, "roster": roster, "student_index": index,
+                   "normaliser": norm, "delta": self}
+        return functools.partial(_live, view, alive), derived
+
+
+def _live(view, alive):
+    return view if alive is None else view.iloc[np.flatnonzero(alive)].reset_index(drop=True)
+
+
+def apply_to_store(store, delta, top_k=TOP_LIMIT):
+    """Apply *delta* to the store's current snapshot and publish the result.
+
+    Snapshots already handed to callbacks never change underneath them: the
+    new version only appends to the shared storage.  Concurrent calls are
+    applied and published one after another.
+    """
+    delta = read_delta(delta)
+    with _apply_lock:
+        old = store.current()
+        state = old.derive("delta", lambda s: DeltaState(s.df, top_k))
+        result = state.apply(delta)
+        frame, derived = state.published(old)
+        result.version = store.publish(frame, delta_digest(delta), **derived).version
+    return result
+
+
+def delta_digest(delta):
+    """Content hash of a normalised delta frame (feeds the published version)."""
+    hashed = pd.util.hash_pandas_object(delta[sorted(delta.columns)], index=False)
+    return hashlib.sha1(hashed.to_numpy().tobytes()).hexdigest()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Apply a StudentID-keyed delta file.")
+    ap.add_argument("delta")
+    ap.add_argument("--base", default=DATA_PATH)
+    ap.add_argument("--out", help="write the updated raw cohort to this CSV")
+    args = ap.parse_args()
+
+    state = DeltaState.from_csv(args.base)
+    print(state.apply(args.delta))
+    if args.out:
+        state.frame()[RAW_COLUMNS].to_csv(args.out, index=False)
+        print("Wrote", args.out)
@@ -0,0 +1,176 @@
+"""
+figure_store.py
+Static dashboard figures, encoded once per data version and served as bytes.
+
+A figure that depends only on the data (grade distribution, pass / fail pie,
+correlation bars, ...) is registered by name with @figure(name).  The first
+request for it on a snapshot builds the go.Figure, lets Plotly validate and
+JSON-encode it, and keeps the bytes, plus a gzip copy and an ETag, in the
+snapshot memo.  The same bytes then go to every client:
+
+    GET /api/figure/<data version>/<name>?cohort=<key>&...
+
+The version is a content hash (snapshot.py) and the cohort keys say which
+selection it belongs to, so any worker can answer: a worker that has not
+seen the snapshot rebuilds it from the keys with the resolver given to
+register(), and serves the figure if the rebuilt version matches.  A
+mismatch (the data changed since the page was built) is a 404.
+
+A page places the figure with graph(snap, name).  That gives an empty
+dcc.Graph and a dcc.Store holding the URL.  One clientside callback fetches
+the URL and hands the parsed JSON to the graph, so neither the page callback
+nor Dash ever re-validates or re-encodes the figure.  The browser revalidates
+with If-None-Match and gets a 304 while the data is unchanged.
+
+A figure registered with zoom=True is built as build(snap, window) and can
+be drawn at lower detail (lod.py).  When the user zooms, the same callback
+fetches ?x0=&x1=&y0=&y1= and gets the figure rebuilt for that window only.
+Windowed figures are encoded per request, not kept.  Double-click (autorange)
+goes back to the stored overview.
+"""
+
+import gzip
+import hashlib
+import weakref
+from urllib.parse import urlencode
+
+from dash import MATCH, Input, Output, dcc, html
+from flask import Blueprint, Response, request
+from plotly.io.json import to_json_plotly
+
+GRAPH = "static-figure"
+SOURCE = "static-figure-url"
+# Transparent, axis-free frame shown until the figure arrives.
+PLACEHOLDER = {"data": [], "layout": {"paper_bgcolor": "rgba(0,0,0,0)",
+                                      "plot_bgcolor": "rgba(0,0,0,0)",
+                                      "xaxis": {"visible": False},
+                                      "yaxis": {"visible": False}}}
+
+FIGURES = {}                             # name -> build(snap) -> go.Figure
+ZOOMABLE = set()                         # names whose build also takes a window
+_snapshots = weakref.WeakValueDictionary()  # data version -> live Snapshot
+_resolve = None                          # cohort keys -> Snapshot, set by register()
+
+figures = Blueprint("figure_store", __name__)
+
+
+def figure(name, zoom=False):
+    """Register build(snap) -> go.Figure as the static figure *name*.
+
+    With zoom=True, build(snap, window) is also called with a zoom window
+    (x0, x1, y0, y1) to re-draw the visible region in full detail.
+    """
+    def register(build):
+        FIGURES[name] = build
+        if zoom:
+            ZOOMABLE.add(name)
+        return build
+    return register
+
+
+class EncodedFigure:
+    __slots__ = ("body", "gzipped", "etag")
+
+    def __init__(self, fig):
+        self.body = to_json_plotly(fig).encode()
+        self.gzipped = gzip.compress(self.body, 6)
+        self.etag = hashlib.sha1(self.body).hexdigest()[:16]
+
+
+def encoded(snap, name):
+    return snap.derive(f"figure:{name}", lambda s: EncodedFigure(FIGURES[name](s)))
+
+
+def graph(snap, name, **props):
+    """dcc.Graph for the static figure *name* on *snap*, filled in by the browser."""
+    if name not in FIGURES:
+        raise KeyError(f"no figure registered as {name!r}")
+    _snapshots[snap.version] = snap
+    url = f"/api/figure/{snap.version}/{name}"
+    if snap.cohorts:
+        url += "?" + urlencode([("cohort", k) for k in snap.cohorts])
+    return html.Div([
+        dcc.Graph(id={"type": GRAPH, "name": name}, figure=PLACEHOLDER, **props),
+        dcc.Store(id={"type": SOURCE, "name": name},
+                  data={"url": url, "zoom": name in ZOOMABLE}),
+    ])
+
+
+def register(app, resolve=None):
+    """Mount the figure endpoint and the fetching callback on a Dash *app*.
+
+    resolve(cohort keys) -> Snapshot rebuilds a snapshot this process has not
+    served yet ([] meaning the main dataset).
+    """
+    global _resolve
+    _resolve = resolve
+    app.server.register_blueprint(figures)
+    app.clientside_callback(
+        """
+        async function (source, relayout) {
+            const ns = window.dash_clientside;
+            if (!source) { return ns.no_update; }
+            const url = new URL(source.url, window.location.href);
+            const zoomed = ns.callback_context.triggered.some(
+                t => t.prop_id.endsWith(".relayoutData"));
+            if (zoomed) {
+                if (!source.zoom || !relayout) { return ns.no_update; }
+                let windowed = false;
+                for (const axis of ["x", "y"]) {
+                    const range = relayout[axis + "axis.range"] || [
+                        relayout[axis + "axis.range[0]"], relayout[axis + "axis.range[1]"]];
+                    if (range[0] !== undefined) {
+                        url.searchParams.set(axis + "0", range[0]);
+                        url.searchParams.set(axis + "1", range[1]);
+                        windowed = true;
+                    }
+                }
+                const reset = relayout["xaxis.autorange"] || relayout["yaxis.autorange"];
+                if (!windowed && !reset) { return ns.no_update; }
+            }
+            const response = await fetch(url);
+            if (!response.ok) { return ns.no_update; }
+            return response.json();
+        }
+        """,
+        Output({"type": GRAPH, "name": MATCH}, "figure"),
+        Input({"type": SOURCE, "name": MATCH}, "data"),
+        Input({"type": GRAPH, "name": MATCH}, "relayoutData"),
+    )
+
+
+@figures.get("/api/figure/<version>/<name>")
+def serve(version, name):
+    if name not in FIGURES:
+        return Response(status=404)
+    snap = _snapshots.get(version)
+    if snap is None and _resolve is not None:
+        # Another worker built the page: rebuild the snapshot from its content key.
+        try:
+            snap = _resolve(request.args.getlist("cohort"))
+        except (OSError, ValueError, KeyError):
+            snap = None
+        if snap is not None and snap.version == version:
+            _snapshots[version] = snap
+    if snap is None or snap.version != version:
+        return Response(status=404)
+    try:
+        window = tuple(_bound(k) for k in ("x0", "x1", "y0", "y1"))
+    except ValueError:
+        return Response(status=400)
+    if name in ZOOMABLE and any(b is not None for b in window):
+        fig = EncodedFigure(FIGURES[name](snap, window))
+    else:
+        fig = encoded(snap, name)
+    headers = {"ETag": f'"{fig.etag}"', "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if fig.etag in request.if_none_match:
+        return Response(status=304, headers=headers)
+    if "gzip" in request.accept_encodings:
+        headers["Content-Encoding"] = "gzip"
+        return Response(fig.gzipped, mimetype="application/json", headers=headers)
+    return Response(fig.body, mimetype="application/json", headers=headers)
+
+
+def _bound(key):
+    value = request.args.get(key)
+    return None if value in (None, "") else float(value)
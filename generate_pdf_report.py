@@ -13,7 +13,7 @@ Structure:
   (Appendix row-count table may add a short 8th page if content overflows)
 """
 
-import os, pandas as pd, numpy as np
+import os, numpy as np
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
 from reportlab.lib.units import cm
@@ -26,6 +26,9 @@ from reportlab.platypus import (
 from reportlab.platypus.flowables import Flowable
 from reportlab.pdfgen import canvas
 
+from data_store import load_students
+from score_history import record_run
+
 # ─── paths ────────────────────────────────────────────────────────────────────
 BASE   = os.path.dirname(os.path.abspath(__file__))
 CSV    = os.path.join(BASE, "Student_performance_data _.csv")
@@ -50,8 +53,7 @@ LIGHT_GRAY = colors.HexColor("#F2F2F2")
 MID_GRAY   = colors.HexColor("#CCCCCC")
 
 # ─── load & compute stats ─────────────────────────────────────────────────────
-df = pd.read_csv(CSV)
-df.columns = df.columns.str.strip()
+df = load_students(CSV)
 
 total      = len(df)
 avg_gpa    = df["GPA"].mean()
@@ -79,16 +81,12 @@ notutor_fail  = df[(df["Tutoring"] == 0) & (df["GradeClass"] == 0)].shape[0]
 notutor_total = df[df["Tutoring"] == 0].shape[0]
 notutor_fail_r = notutor_fail / notutor_total * 100 if notutor_total > 0 else 0
 
-# risk score
-df["RiskScore"] = (
-    (df["Absences"] / df["Absences"].max() * 40) +
-    ((1 - df["GPA"] / df["GPA"].max()) * 40) +
-    ((1 - df["StudyTimeWeekly"] / df["StudyTimeWeekly"].max()) * 20)
-)
-low_risk      = int((df["RiskScore"] <  30).sum())
-medium_risk   = int(((df["RiskScore"] >= 30) & (df["RiskScore"] < 55)).sum())
-high_risk     = int(((df["RiskScore"] >= 55) & (df["RiskScore"] < 75)).sum())
-critical_risk = int((df["RiskScore"] >= 75).sum())
+# risk score (scored by load_students via scoring.py, same as the dashboard)
+risk_counts   = df["RiskCategory"].value_counts()
+low_risk      = int(risk_counts["Low"])
+medium_risk   = int(risk_counts["Medium"])
+high_risk     = int(risk_counts["High"])
+critical_risk = int(risk_counts["Critical"])
 
 parent_high_gpa = df[df["ParentalSupport"] >= 3]["GPA"].mean()
 parent_low_gpa  = df[df["ParentalSupport"] <  3]["GPA"].mean()
@@ -446,14 +444,15 @@ kpis = [
      "Mean Grade Point Average across all students",
      "AVERAGE(GPA)  [scale 0–4]"],
     ["Risk Index Score",
-     "Composite score (0–100) combining Absences (40%), inverse GPA (40%), inverse StudyTime (20%)",
-     "(Abs/MaxAbs×40) + ((1−GPA/MaxGPA)×40) + ((1−Study/MaxStudy)×20)"],
+     "Composite score (0–100) combining inverse GPA (35%), Absences (25%), inverse StudyTime (20%), "
+     "inverse Parental Support (10%) and GradeClass (10%)",
+     "((1−GPA/4)×35) + (Abs/MaxAbs×25) + ((1−Study/MaxStudy)×20) + ((1−Support/4)×10) + (Grade/4×10)"],
     ["At-Risk Count",
-     "Students with Risk Index ≥ 55",
-     "COUNTIF(RiskScore ≥ 55)"],
+     "Students with Risk Index > 55",
+     "COUNTIF(RiskScore > 55)"],
     ["Critical Risk",
-     "Students with Risk Index ≥ 75 — immediate intervention needed",
-     "COUNTIF(RiskScore ≥ 75)"],
+     "Students with Risk Index > 75 — immediate intervention needed",
+     "COUNTIF(RiskScore > 75)"],
     ["Attendance Impact",
      "Pearson correlation between Absences and GPA",
      "CORREL(Absences, GPA)"],
@@ -514,7 +513,7 @@ story.append(insight_card(3,
     f"Low (<b>{low_risk:,}</b>), Medium (<b>{medium_risk:,}</b>), "
     f"High (<b>{high_risk:,}</b>), Critical (<b>{critical_risk:,}</b>). "
     f"The <b>{critical_risk:,} critical-risk students ({critical_risk/total*100:.1f}%)</b> "
-    f"have a risk score ≥ 75, combining high absences, very low GPA, and minimal study time. "
+    f"have a risk score above 75, combining high absences, very low GPA, and minimal study time. "
     f"Without intervention, virtually all will fail."))
 
 story.append(insight_card(4,
@@ -606,7 +605,7 @@ recs = [
      "High"),
     ("Redirect Tutoring to Risk-Stratified Students",
      f"Currently {tutor_fail_r:.1f}% of tutored students still fail, suggesting inefficient "
-     "targeting. Restructure tutoring assignment to prioritise students with Risk Index ≥ 55. "
+     "targeting. Restructure tutoring assignment to prioritise students with Risk Index > 55. "
      f"Focus the most intensive support on the {critical_risk:,} critical-risk students. "
      "Estimated impact: 20–30% improvement in tutoring ROI.",
      "High"),
@@ -704,7 +703,8 @@ limitations = [
      "Randomised controlled trials or difference-in-differences analysis are needed "
      "to establish causality."),
     ("Risk Score Weights are Heuristic",
-     "The 40/40/20 weighting of the Risk Index (Absences / GPA / StudyTime) was chosen "
+     "The 35/25/20/10/10 weighting of the Risk Index (GPA / Absences / StudyTime / "
+     "Parental Support / GradeClass) was chosen "
      "based on correlation magnitudes but not validated against held-out outcome data. "
      "A logistic regression or gradient-boosting model trained on labelled outcomes "
      "would produce more defensible weights."),
@@ -765,13 +765,13 @@ story.append(Spacer(1, 0.4*cm))
 story.append(Paragraph("<b>A2. Risk Index Tier Summary</b>", h2))
 risk_data = [
     ["Risk Tier",    "Score Range", "Count", "% of Total", "Description"],
-    ["Low",          "0 – 29",  f"{low_risk:,}",    f"{low_risk/total*100:.1f}%",
+    ["Low",          "0 – 30",  f"{low_risk:,}",    f"{low_risk/total*100:.1f}%",
      "Monitor via standard reporting"],
-    ["Medium",       "30 – 54", f"{medium_risk:,}", f"{medium_risk/total*100:.1f}%",
+    ["Medium",       "30.01 – 55", f"{medium_risk:,}", f"{medium_risk/total*100:.1f}%",
      "Academic advisor check-in recommended"],
-    ["High",         "55 – 74", f"{high_risk:,}",   f"{high_risk/total*100:.1f}%",
+    ["High",         "55.01 – 75", f"{high_risk:,}",   f"{high_risk/total*100:.1f}%",
      "Tutoring + attendance intervention"],
-    ["Critical",     "75 – 100",f"{critical_risk:,}",f"{critical_risk/total*100:.1f}%",
+    ["Critical",     "75.01 – 100",f"{critical_risk:,}",f"{critical_risk/total*100:.1f}%",
      "Immediate multi-faceted intervention"],
     ["Total",        "—",       f"{total:,}",        "100%", ""],
 ]
@@ -878,4 +878,7 @@ doc = SimpleDocTemplate(
     subject="Student Performance Analysis",
 )
 doc.build(story, canvasmaker=NumberedCanvas)
+run = record_run(df, path=CSV)  # score snapshot for run-to-run movers
 print(f"✅  PDF saved → {OUT}")
+if run:
+    print(f"   Score snapshot → {run}")
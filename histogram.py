@@ -0,0 +1,124 @@
+"""
+histogram.py
+Fine-grained RiskScore histogram for re-bucketing without a pass over rows.
+
+RiskScore is rounded to 2 dp and lies in 0..100, so one bucket per 0.01 point
+(10,001 buckets) holds every distinct score.  Next to the student count each
+bucket keeps the GPA, absence and score sums.  Prefix sums over the buckets then
+answer, for any cut points, the per-tier counts and averages (summary) and the
+count / averages above a threshold (above).  The cost is O(buckets) once and
+O(cuts) per query, whatever the cohort size.
+
+Tiers follow pd.cut(..., include_lowest=True): right-closed, with the lowest
+edge included.
+"""
+
+import numpy as np
+import pandas as pd
+
+from scoring import RISK_BINS, RISK_LEVELS
+
+RESOLUTION = 0.01
+SCALE = round(1 / RESOLUTION)
+N_BUCKETS = 100 * SCALE + 1
+
+
+def _bucket_edge(cut):
+    # Largest bucket whose score is <= cut (scores are exact multiples of 0.01).
+    return int(np.clip(np.floor(cut * SCALE + 1e-6), -1, N_BUCKETS - 1))
+
+
+def _first_bucket(cut):
+    # Smallest bucket whose score is >= cut.
+    return int(np.clip(np.ceil(cut * SCALE - 1e-6), 0, N_BUCKETS))
+
+
+class ScoreHistogram:
+    FIELDS = ("counts", "gpa_sum", "abs_sum", "score_sum")
+
+    def __init__(self):
+        self.counts = np.zeros(N_BUCKETS, dtype=np.int64)
+        self.gpa_sum = np.zeros(N_BUCKETS)
+        self.abs_sum = np.zeros(N_BUCKETS)
+        self.score_sum = np.zeros(N_BUCKETS)
+        self._cum = None
+
+    def fold(self, scores, gpa, absences, sign=1):
+        """Add (sign=1) or subtract (sign=-1) students; scores outside 0..100 are ignored."""
+        b = np.rint(np.asarray(scores, dtype=np.float64) * SCALE)
+        ok = (b >= 0) & (b < N_BUCKETS)
+        if not ok.all():
+            b, scores, gpa, absences = b[ok], scores[ok], gpa[ok], absences[ok]
+        b = b.astype(np.intp)
+        self.counts += sign * np.bincount(b, minlength=N_BUCKETS)
+        self.gpa_sum += sign * np.bincount(b, weights=gpa, minlength=N_BUCKETS)
+        self.abs_sum += sign * np.bincount(b, weights=absences, minlength=N_BUCKETS)
+        self.score_sum += sign * np.bincount(b, weights=scores, minlength=N_BUCKETS)
+        self._cum = None
+        return self
+
+    def copy(self):
+        hist = ScoreHistogram.__new__(ScoreHistogram)
+        for name in self.FIELDS:
+            setattr(hist, name, getattr(self, name).copy())
+        hist._cum = self._cum  # replaced, never changed in place
+        return hist
+
+    def merge(self, other):
+        for name in self.FIELDS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self._cum = None
+        return self
+
+    def _prefix(self):
+        # Row k = totals over buckets < k, so a range is one subtraction.
+        if self._cum is None:
+            stacked = np.vstack([getattr(self, name) for name in self.FIELDS]).astype(np.float64)
+            self._cum = np.hstack([np.zeros((len(self.FIELDS), 1)), np.cumsum(stacked, axis=1)])
+        return self._cum
+
+    def _totals(self, lo, hi):
+        """Totals over buckets lo..hi inclusive."""
+        cum = self._prefix()
+        return cum[:, hi + 1] - cum[:, lo]
+
+    # ── queries ──────────────────────────────────────────────────────────
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    def summary(self, cuts=RISK_BINS, labels=None):
+        """Per-tier Count / AvgGPA / AvgAbsences / AvgRiskScore for any cut points."""
+        cuts = list(cuts)
+        labels = labels or (RISK_LEVELS if cuts == RISK_BINS else
+                            [f"{a:g}-{b:g}" for a, b in zip(cuts, cuts[1:])])
+        n, gpa, absences, score = self.tier_totals(cuts)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return pd.DataFrame({
+                "RiskCategory": labels,
+                "Count": n.astype(np.int64),
+                "AvgGPA": gpa / n,
+                "AvgAbsences": absences / n,
+                "AvgRiskScore": score / n,
+            })
+
+    def tier_totals(self, cuts=RISK_BINS):
+        """(counts, GPA sums, absence sums, score sums) per tier between *cuts*."""
+        edges = [_bucket_edge(c) for c in cuts]
+        rows = []
+        for i, (lo, hi) in enumerate(zip(edges, edges[1:])):
+            start = lo + 1 if i else _first_bucket(cuts[0])
+            rows.append(self._totals(start, hi) if hi >= start else np.zeros(len(self.FIELDS)))
+        n, gpa, absences, score = np.array(rows).reshape(-1, len(self.FIELDS)).T
+        return np.rint(n).astype(np.int64), gpa, absences, score
+
+    def rank(self, score):
+        """Number of students with RiskScore <= *score*."""
+        return int(self._prefix()[0, _bucket_edge(score) + 1])
+
+    def above(self, threshold):
+        """Count and averages of students with RiskScore > threshold."""
+        n, gpa, absences, score = self._totals(_bucket_edge(threshold) + 1, N_BUCKETS - 1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return {"count": int(n), "avg_gpa": gpa / n, "avg_abs": absences / n,
+                    "avg_score": score / n}
@@ -0,0 +1,95 @@
+"""
+lod.py
+Level-of-detail scatter traces for large cohorts.
+
+One SVG marker per student freezes the browser and bloats the payload well
+before a district-sized cohort.  scatter_traces() draws each group (grade,
+risk level, ...) with at most POINT_BUDGET markers:
+
+  - every occupied cell of a coarse grid over the view keeps one random
+    point, so sparse regions and outliers never disappear;
+  - the rest of the budget is a uniform random sample of the remaining
+    points, so dense regions stay visibly dense.
+
+The sample is seeded, so a figure is the same on every request.  Above the
+budget the traces are WebGL (Scattergl); cohorts that fit stay SVG, unless
+EWS_SCATTER_MODE (auto | svg | webgl) says otherwise.
+
+With a window (x0, x1, y0, y1) only the points inside it are considered, so
+zooming in re-fetches full detail for the visible region (figure_store.py).
+No frame copy or string conversion is made: groups are split on category
+codes.
+"""
+
+import os
+
+import numpy as np
+import plotly.graph_objects as go
+
+POINT_BUDGET = int(os.environ.get("EWS_POINT_BUDGET", "5000"))
+SCATTER_MODE = os.environ.get("EWS_SCATTER_MODE", "auto")
+SEED = 0
+
+
+def _grid(budget):
+    # About a quarter of the budget goes on coverage cells, 2:1 wide.
+    rows = max(int(np.sqrt(budget / 8)), 1)
+    return 2 * rows, rows
+
+
+def window_mask(x, y, window):
+    """Points inside window = (x0, x1, y0, y1); None bounds are open."""
+    x0, x1, y0, y1 = window
+    mask = np.ones(len(x), dtype=bool)
+    for values, lo, hi in ((x, x0, x1), (y, y0, y1)):
+        if lo is not None:
+            mask &= values >= lo
+        if hi is not None:
+            mask &= values <= hi
+    return mask
+
+
+def downsample(x, y, budget=POINT_BUDGET, seed=SEED):
+    """Positions of at most *budget* points keeping coverage, outliers and density."""
+    n = len(x)
+    if n <= budget:
+        return np.arange(n)
+    rng = np.random.default_rng(seed)
+    perm = rng.permutation(n)
+    gx, gy = _grid(budget)
+    xs, ys = x[perm].astype(np.float64), y[perm].astype(np.float64)
+    span_x = float(xs.max() - xs.min()) or 1.0
+    span_y = float(ys.max() - ys.min()) or 1.0
+    cx = np.minimum(((xs - xs.min()) / span_x * gx).astype(np.int64), gx - 1)
+    cy = np.minimum(((ys - ys.min()) / span_y * gy).astype(np.int64), gy - 1)
+    _, first = np.unique(cx * gy + cy, return_index=True)  # one random point per cell
+    if len(first) >= budget:
+        keep = perm[rng.choice(first, budget, replace=False)]
+    else:
+        taken = np.zeros(n, dtype=bool)
+        taken[first] = True
+        extra = np.flatnonzero(~taken)[:budget - len(first)]  # permutation prefix: uniform
+        keep = perm[np.concatenate([first, extra])]
+    return np.sort(keep)
+
+
+def scatter_traces(df, x, y, by, colors, window=None, budget=POINT_BUDGET,
+                   mode=SCATTER_MODE, **marker):
+    """(traces, points shown, points in view) for *df* grouped by categorical *by*."""
+    xv, yv = df[x].to_numpy(), df[y].to_numpy()
+    codes = df[by].cat.codes.to_numpy()
+    if window is not None:
+        inside = np.flatnonzero(window_mask(xv, yv, window))
+        xv, yv, codes = xv[inside], yv[inside], codes[inside]
+    webgl = mode == "webgl" or (mode == "auto" and len(xv) > budget)
+    trace = go.Scattergl if webgl else go.Scatter
+    traces, shown = [], 0
+    for code, label in enumerate(df[by].cat.categories):
+        rows = np.flatnonzero(codes == code)
+        if not len(rows):
+            continue
+        rows = rows[downsample(xv[rows], yv[rows], budget)]
+        shown += len(rows)
+        traces.append(trace(x=xv[rows], y=yv[rows], mode="markers", name=str(label),
+                            marker=dict(color=colors.get(str(label), "#888"), **marker)))
+    return traces, shown, int((codes >= 0).sum())
@@ -0,0 +1,53 @@
+"""
+lru.py
+Thread-safe least-recently-used cache bounded by total bytes.
+
+LRUCache maps keys to values built on first use, get(key, build).  Each entry
+is sized once, when it is stored, by the size_of function the cache was made
+with (frame memory for partitions.py, encoded page size for page_cache.py).
+Once the total passes max_bytes the coldest entries are evicted, but never
+the entry just requested, even if it alone is over budget.  Hit / miss
+counters are kept for monitoring (stats()).
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    def __init__(self, max_bytes, size_of):
+        self.max_bytes = max_bytes
+        self.size_of = size_of
+        self.nbytes = 0
+        self.hits = self.misses = 0
+        self._items = OrderedDict()  # key -> (value, nbytes)
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        with self._lock:
+            if key in self._items:
+                self.hits += 1
+                self._items.move_to_end(key)
+                return self._items[key][0]
+            self.misses += 1
+        value = build()
+        size = self.size_of(value)
+        with self._lock:
+            if key not in self._items:
+                self._items[key] = (value, size)
+                self.nbytes += size
+            self._items.move_to_end(key)
+            while self.nbytes > self.max_bytes and len(self._items) > 1:
+                _, (_, evicted) = self._items.popitem(last=False)
+                self.nbytes -= evicted
+            return self._items[key][0]
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._items), "bytes": self.nbytes,
+                    "max_bytes": self.max_bytes, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,209 @@
+"""
+model.py
+Logistic-regression risk model, as an alternative to the hand-weighted score.
+
+The model estimates P(GradeClass == 4), the probability of failing, from the
+behavioural and background predictors only.  GPA and GradeClass are left out
+because they are the outcome itself.  Its RiskScore is 100 x that probability,
+binned at the same RISK_BINS as the heuristic.
+
+fit() is plain NumPy: Newton-Raphson (IRLS) on standardised predictors with a
+small ridge penalty, which converges in a handful of iterations.  The
+coefficients are folded back to the raw column scale and written as JSON to
+the cache directory, keyed by a SHA-1 of the training columns, so each dataset
+is trained once.  A holdout AUC for the model and for the heuristic RiskScore
+on the same rows is stored with them.
+
+predict() is built to be no slower than the heuristic.  The small code and
+flag columns (5 x 5 x 2^5 combinations) are packed into one uint16 index
+into a precomputed table of their summed logit terms.  The remaining
+predictors add one in-place multiply-add each, and the sigmoid runs in place
+in float32.
+
+    python model.py                 # train / load and show the coefficients
+    python model.py --bench 1000000
+"""
+
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_store import CACHE_DIR, _atomic_write
+from scoring import risk_codes
+from validate import RULES
+
+log = logging.getLogger(__name__)
+
+MODEL_VERSION = 1
+PREDICTORS = ["StudyTimeWeekly", "Absences", "ParentalSupport", "ParentalEducation",
+              "Tutoring", "Extracurricular", "Sports", "Music", "Volunteering"]
+FAIL_CLASS = 4
+RIDGE = 1e-3
+HOLDOUT = 0.2
+# Code / flag predictors with a 0..hi domain small enough for the lookup table.
+TABLE_COLUMNS = [c for c in PREDICTORS if RULES[c][0] and RULES[c][1] == 0 and RULES[c][2] < 8]
+LINEAR_COLUMNS = [c for c in PREDICTORS if c not in TABLE_COLUMNS]
+
+
+def data_hash(df):
+    """SHA-1 over the predictor and outcome columns of *df*."""
+    h = hashlib.sha1(f"v{MODEL_VERSION}".encode())
+    for col in PREDICTORS + ["GradeClass"]:
+        h.update(np.ascontiguousarray(df[col].to_numpy()).tobytes())
+    return h.hexdigest()
+
+
+def model_path(sha1):
+    return os.path.join(CACHE_DIR, f"model-v{MODEL_VERSION}-{sha1[:16]}.json")
+
+
+def auc(y, scores):
+    """Area under the ROC curve (rank formulation; ties share ranks)."""
+    y = np.asarray(y, dtype=bool)
+    pos, neg = int(y.sum()), int((~y).sum())
+    if not pos or not neg:
+        return None
+    ranks = pd.Series(scores).rank().to_numpy()
+    return float((ranks[y].sum() - pos * (pos + 1) / 2) / (pos * neg))
+
+
+# ─── training ─────────────────────────────────────────────────────────────────
+def _irls(X, y, ridge=RIDGE, max_iter=25, tol=1e-8):
+    """Ridge-penalised logistic regression by Newton-Raphson; X has an intercept column."""
+    w = np.zeros(X.shape[1])
+    penalty = np.full(X.shape[1], ridge * len(y))
+    penalty[0] = 0.0
+    for _ in range(max_iter):
+        p = 1.0 / (1.0 + np.exp(-(X @ w)))
+        grad = X.T @ (p - y) + penalty * w
+        hess = (X * (p * (1 - p))[:, None]).T @ X + np.diag(penalty)
+        step = np.linalg.solve(hess, grad)
+        w -= step
+        if np.abs(step).max() < tol:
+            break
+    return w
+
+
+def _fit_raw(df, rows):
+    cols = np.column_stack([df[c].to_numpy(dtype=np.float64)[rows] for c in PREDICTORS])
+    y = (df["GradeClass"].to_numpy()[rows] == FAIL_CLASS).astype(np.float64)
+    mean, std = cols.mean(axis=0), cols.std(axis=0)
+    std[std == 0] = 1.0
+    w = _irls(np.column_stack([np.ones(len(y)), (cols - mean) / std]), y)
+    coef = w[1:] / std
+    return float(w[0] - coef @ mean), coef
+
+
+class RiskModel:
+    def __init__(self, intercept, coef, metrics=None):
+        self.intercept = float(intercept)
+        self.coef = dict(zip(PREDICTORS, map(float, coef)))
+        self.metrics = metrics or {}
+        radix = [RULES[c][2] + 1 for c in TABLE_COLUMNS]
+        grids = np.meshgrid(*[np.arange(r) for r in radix], indexing="ij")
+        terms = sum(g * self.coef[c] for g, c in zip(grids, TABLE_COLUMNS))
+        self._radix = radix
+        self._table = (self.intercept + terms).ravel().astype(np.float32)
+
+    @classmethod
+    def fit(cls, df, seed=0):
+        """Train on *df*; holdout AUCs are measured first on a HOLDOUT split."""
+        order = np.random.default_rng(seed).permutation(len(df))
+        n_test = int(len(df) * HOLDOUT)
+        test, train = order[:n_test], order[n_test:]
+        metrics = {"rows": len(df), "fail_rate": float((df["GradeClass"] == FAIL_CLASS).mean())}
+        if n_test:
+            y = df["GradeClass"].to_numpy()[test] == FAIL_CLASS
+            holdout = cls(*_fit_raw(df, train))
+            metrics["auc_model"] = auc(y, holdout.predict(df.iloc[test]))
+            if "RiskScore" in df.columns:
+                metrics["auc_heuristic"] = auc(y, df["RiskScore"].to_numpy()[test])
+        return cls(*_fit_raw(df, np.arange(len(df))), metrics)
+
+    @classmethod
+    def for_frame(cls, df):
+        """The model for *df*, trained once per data hash and then read from disk."""
+        path = model_path(data_hash(df))
+        try:
+            with open(path, "rb") as fh:
+                return cls.from_json(fh.read())
+        except (OSError, ValueError, KeyError):
+            pass
+        model = cls.fit(df)
+        log.info("trained risk model on %d rows (%s)", len(df), path)
+        try:
+            _atomic_write(path, model.to_json())
+        except OSError:
+            pass
+        return model
+
+    # ── inference ────────────────────────────────────────────────────────
+    def predict(self, columns):
+        """P(fail) for a mapping of PREDICTORS -> arrays (frame or dict)."""
+        n = len(columns[PREDICTORS[0]])
+        code = np.zeros(n, dtype=np.uint16)
+        for col, radix in zip(TABLE_COLUMNS, self._radix):
+            code *= radix
+            np.add(code, np.asarray(columns[col]).astype(np.uint8, copy=False), out=code)
+        out = self._table[code]
+        tmp = np.empty(n, dtype=np.float32)
+        for col in LINEAR_COLUMNS:
+            np.multiply(np.asarray(columns[col]), np.float32(self.coef[col]), out=tmp,
+                        dtype=np.float32)
+            out += tmp
+        np.negative(out, out=out)
+        np.exp(out, out=out)
+        out += 1.0
+        np.reciprocal(out, out=out)
+        return out
+
+    def score(self, columns):
+        """(scores, level codes) on the RiskScore scale: 100 x P(fail), 2 dp."""
+        scores = np.multiply(self.predict(columns), 100.0, dtype=np.float64)
+        np.round(scores, 2, out=scores)
+        return scores, risk_codes(scores)
+
+    # ── persistence ──────────────────────────────────────────────────────
+    def to_json(self):
+        return json.dumps({"intercept": self.intercept, "coef": self.coef,
+                           "metrics": self.metrics}, indent=1).encode()
+
+    @classmethod
+    def from_json(cls, payload):
+        data = json.loads(payload)
+        return cls(data["intercept"], [data["coef"][c] for c in PREDICTORS], data["metrics"])
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    from data_store import load_students
+    from scoring import score_arrays
+
+    ap = argparse.ArgumentParser(description="Train the logistic risk model and time it.")
+    ap.add_argument("--bench", type=int, metavar="ROWS")
+    args = ap.parse_args()
+
+    model = RiskModel.for_frame(load_students())
+    print(f"intercept {model.intercept:+.4f}")
+    for col, b in model.coef.items():
+        print(f"  {col:<18} {b:+.4f}")
+    print({k: round(v, 4) if isinstance(v, float) else v for k, v in model.metrics.items()})
+
+    if args.bench:
+        from synth import fit_profile, generate_chunk
+        from data_store import apply_schema
+
+        cols = apply_schema(generate_chunk(fit_profile(), args.bench))
+        for name, fn in (("heuristic", score_arrays), ("model", model.score)):
+            best = float("inf")
+            for _ in range(5):
+                t0 = time.perf_counter()
+                fn(cols)
+                best = min(best, time.perf_counter() - t0)
+            print(f"{name:<9} {args.bench:,} students in {best * 1e3:.1f} ms")
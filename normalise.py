@@ -0,0 +1,248 @@
+"""
+normalise.py
+Normalisation of Absences and StudyTimeWeekly for RiskScore.
+
+The score divides absences and study time by a scale.  By default ("cohort")
+that is the maximum of the rows being scored, which needs a full pass before
+the first row can be scored and lets one outlier rescale everyone.  A
+Normaliser holds the scale with one of four strategies:
+
+    cohort    maxima of the frame being scored (the original behaviour)
+    fixed     constant domain caps (FIXED_CAPS, or any caps given)
+    running   the largest value seen so far; it only grows, and only
+              a new maximum rescales anyone
+    quantile  the QUANTILE point of a streaming quantile sketch, fitted from
+              the first data seen and then frozen until refit()
+
+With any strategy but cohort, values above a cap are clipped to it, so a
+factor never contributes more than its weight.  Below the caps the scores are
+bit-identical to scoring.score_arrays() with the same scales.
+
+Both measures have bounded domains (validate.RULES), so the sketch is a
+fixed-bin histogram over each domain: one bin per absence, 0.01 h for study
+time.  It is mergeable, small, and exact to the bin width.
+
+The strategy and its parameters (caps, sketch counts, the SHA-1s of the files
+already observed) persist as JSON at data_store.NORMALISER_PATH.  Once a file
+has been observed, scoring one student or one chunk needs no pass over the
+cohort and gives the same result every time.
+
+    EWS_NORMALISER=quantile python normalise.py fit
+    python normalise.py show
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from scoring import FACTOR_COLUMNS, RISK_DTYPE, factor_matrix, score_arrays
+from validate import RULES
+
+STRATEGIES = ("cohort", "fixed", "running", "quantile")
+NORM_COLUMNS = ("Absences", "StudyTimeWeekly")
+FIXED_CAPS = {"Absences": 30.0, "StudyTimeWeekly": 20.0}
+QUANTILE = float(os.environ.get("EWS_NORM_QUANTILE", "0.99"))
+SKETCH_RESOLUTION = {"Absences": 1.0, "StudyTimeWeekly": 0.01}
+
+
+class QuantileSketch:
+    """Fixed-bin histogram over [lo, hi] answering quantiles to within one bin."""
+
+    def __init__(self, lo, hi, width, counts=None):
+        self.lo, self.hi, self.width = float(lo), float(hi), float(width)
+        n = int(round((self.hi - self.lo) / self.width)) + 1
+        self.counts = (np.zeros(n, dtype=np.int64) if counts is None
+                       else np.asarray(counts, dtype=np.int64))
+
+    @classmethod
+    def for_column(cls, col):
+        _, lo, hi = RULES[col]
+        return cls(lo, hi, SKETCH_RESOLUTION[col])
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    def add(self, values):
+        v = np.asarray(values, dtype=np.float64)
+        b = np.clip(np.rint((v - self.lo) / self.width), 0, len(self.counts) - 1)
+        self.counts += np.bincount(b.astype(np.intp), minlength=len(self.counts))
+        return self
+
+    def merge(self, other):
+        self.counts += other.counts
+        return self
+
+    def quantile(self, q):
+        """Smallest bin value with at least a q share of the values at or below it."""
+        total = self.total
+        if not total:
+            return None
+        k = int(np.searchsorted(np.cumsum(self.counts), q * total, side="left"))
+        return self.lo + min(k, len(self.counts) - 1) * self.width
+
+
+class Normaliser:
+    def __init__(self, strategy="cohort", caps=None, sketches=None, sources=(),
+                 quantile=QUANTILE, path=None):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"unknown normaliser strategy {strategy!r}; use one of {STRATEGIES}")
+        self.strategy = strategy
+        self.quantile = quantile
+        self.caps = dict(caps) if caps else (dict(FIXED_CAPS) if strategy == "fixed" else None)
+        self.sketches = sketches or ({c: QuantileSketch.for_column(c) for c in NORM_COLUMNS}
+                                     if strategy == "quantile" else None)
+        self.sources = list(sources)  # SHA-1 prefixes of files already observed
+        self.path = path
+
+    def __repr__(self):
+        return f"Normaliser({self.strategy!r}, caps={self.caps})"
+
+    @property
+    def key(self):
+        """Short tag for cache names: '' for cohort, else a hash of the caps."""
+        if self.strategy == "cohort":
+            return ""
+        blob = json.dumps([self.strategy, self.caps], sort_keys=True).encode()
+        return hashlib.sha1(blob).hexdigest()[:8]
+
+    # ── learning the scales ──────────────────────────────────────────────
+    def seen(self, sha1):
+        return sha1[:16] in self.sources
+
+    def observe(self, columns, source=None):
+        """Learn from raw rows; True if the caps changed (scores must be redone)."""
+        if source is not None:
+            if self.seen(source):
+                return False
+            self.sources.append(source[:16])
+        if self.strategy in ("cohort", "fixed") or not len(columns[NORM_COLUMNS[0]]):
+            return False
+        if self.strategy == "running":
+            grown = {c: max((self.caps or {}).get(c, 0.0), float(np.max(columns[c])))
+                     for c in NORM_COLUMNS}
+            changed = grown != self.caps
+            self.caps = grown
+            return changed
+        for c in NORM_COLUMNS:
+            self.sketches[c].add(columns[c])
+        if self.caps is None:
+            return self.refit()
+        return False
+
+    def refit(self):
+        """Re-read the quantile caps from the sketch; True if they changed."""
+        if self.strategy != "quantile":
+            return False
+        caps = {c: self.sketches[c].quantile(self.quantile) for c in NORM_COLUMNS}
+        if any(v is None for v in caps.values()):
+            return False
+        caps = {c: max(v, SKETCH_RESOLUTION[c]) for c, v in caps.items()}  # never 0
+        changed = caps != self.caps
+        self.caps = caps
+        return changed
+
+    # ── scoring ──────────────────────────────────────────────────────────
+    def inputs(self, columns):
+        """(columns with the measures clipped to the caps, max_abs, max_study)."""
+        if self.strategy == "cohort" or self.caps is None:
+            return (columns, np.asarray(columns["Absences"]).max(initial=0),
+                    np.asarray(columns["StudyTimeWeekly"]).max(initial=0))
+        out = columns
+        for c in NORM_COLUMNS:
+            values = np.asarray(columns[c])
+            cap = values.dtype.type(self.caps[c]) if values.dtype.kind == "f" else self.caps[c]
+            if values.size and values.max() > cap:
+                if out is columns:
+                    out = {k: columns[k] for k in FACTOR_COLUMNS}
+                out[c] = np.minimum(values, cap)
+        return out, self.caps["Absences"], self.caps["StudyTimeWeekly"]
+
+    def frozen(self, columns):
+        """This normaliser, or for cohort a fixed one at the maxima of *columns*.
+
+        Used to score single students or chunks against a reference cohort.
+        """
+        if self.strategy != "cohort" and self.caps is not None:
+            return self
+        caps = {c: float(np.asarray(columns[c]).max(initial=0)) for c in NORM_COLUMNS}
+        return Normaliser("fixed", caps=caps)
+
+    def score(self, columns):
+        return score_arrays(*self.inputs(columns))
+
+    def assign(self, df):
+        """Set df's RiskScore / RiskCategory columns under this normaliser."""
+        scores, codes = self.score(df)
+        df["RiskScore"] = scores
+        df["RiskCategory"] = pd.Categorical.from_codes(codes, dtype=RISK_DTYPE)
+        return df
+
+    def factors(self, columns):
+        """scoring.factor_matrix() under this normaliser (for re-weighting)."""
+        return factor_matrix(*self.inputs(columns))
+
+    # ── persistence ──────────────────────────────────────────────────────
+    def to_json(self):
+        data = {"strategy": self.strategy, "quantile": self.quantile, "caps": self.caps,
+                "sources": self.sources}
+        if self.sketches:
+            data["sketches"] = {c: {"lo": s.lo, "hi": s.hi, "width": s.width,
+                                    "counts": s.counts.tolist()}
+                                for c, s in self.sketches.items()}
+        return json.dumps(data).encode()
+
+    @classmethod
+    def from_json(cls, payload, path=None):
+        data = json.loads(payload)
+        sketches = data.get("sketches")
+        if sketches:
+            sketches = {c: QuantileSketch(s["lo"], s["hi"], s["width"], s["counts"])
+                        for c, s in sketches.items()}
+        return cls(data["strategy"], data.get("caps"), sketches, data.get("sources", ()),
+                   data.get("quantile", QUANTILE), path)
+
+    @classmethod
+    def load(cls, path, strategy="cohort"):
+        """The normaliser saved at *path*, or a fresh one if it is missing or of another strategy."""
+        if strategy != "cohort":
+            try:
+                with open(path, "rb") as fh:
+                    norm = cls.from_json(fh.read(), path)
+                if norm.strategy == strategy:
+                    return norm
+            except (OSError, ValueError, KeyError):
+                pass
+        return cls(strategy, path=path)
+
+    def save(self):
+        if self.path is None or self.strategy == "cohort":
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as fh:
+            fh.write(self.to_json())
+        os.replace(tmp, self.path)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from data_store import DATA_PATH, fingerprint, load_normaliser, read_validated
+
+    ap = argparse.ArgumentParser(description="Fit or show the persisted score normaliser.")
+    ap.add_argument("command", choices=["fit", "show"])
+    ap.add_argument("paths", nargs="*", default=[DATA_PATH])
+    ap.add_argument("--strategy", choices=STRATEGIES)
+    args = ap.parse_args()
+
+    norm = load_normaliser(args.strategy) if args.strategy else load_normaliser()
+    if args.command == "fit":
+        for p in args.paths:
+            norm.observe(read_validated(p), source=fingerprint(p)[2])
+        norm.refit()
+        norm.save()
+    print(norm, f"({len(norm.sources)} files observed, saved at {norm.path})")
@@ -0,0 +1,39 @@
+"""
+page_cache.py
+Memoised dashboard pages, keyed by data version and tab.
+
+render_tab() used to rebuild every groupby, figure and DataTable of a page on
+each tab click.  PageCache keeps the built component tree of each page under
+(snapshot version, tab, options), so switching back to a tab is a dictionary
+lookup.  A new data version is a new key, and app.py clears the cache when the
+dataset reloads.
+
+Entries are sized by their Dash JSON encoding (what the page costs on the
+wire and, roughly, in memory) and evicted least recently used first once the
+total passes PAGE_CACHE_MB.  Hit / miss counters are served at
+/api/page-cache for monitoring.
+"""
+
+import os
+
+from plotly.io.json import to_json_plotly
+
+from lru import LRUCache
+
+PAGE_CACHE_BYTES = int(os.environ.get("EWS_PAGE_CACHE_MB", "64")) << 20
+
+
+def encoded_size(page):
+    return len(to_json_plotly(page))
+
+
+class PageCache(LRUCache):
+    """LRU of page component trees bounded by their encoded size."""
+
+    def __init__(self, max_bytes=PAGE_CACHE_BYTES):
+        super().__init__(max_bytes, encoded_size)
+
+    def page(self, snap, tab, build, *options):
+        """build() for *tab* on *snap*, built once per data version and options."""
+        version = snap.version if snap is not None else None
+        return self.get((version, tab) + options, build)
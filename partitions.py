@@ -0,0 +1,149 @@
+"""
+partitions.py
+Per-cohort partitioned storage with lazy, memory-bounded loading.
+
+Extracts live under PARTITION_ROOT as one file per school and term:
+
+    cohorts/school=<School>/term=<Term>/students.csv
+
+and are addressed by the key "<School>/<Term>".  Nothing is read until a
+cohort is selected in the dashboard.  Each partition goes through
+load_students() (so it gets its own cached / memory-mapped store), and the
+loaded partitions plus the combined frame for each multi-partition selection
+sit in one LRU cache (lru.py) with a byte ceiling.  Cold entries are evicted
+first.  A single-partition selection is the partition's own entry, so its
+frame is counted once.
+
+A selection of several partitions is rescored on the combined Absences /
+StudyTimeWeekly maxima, so a student's score is relative to the cohort being
+viewed, exactly as for the single-file dataset.  A persisted normaliser other
+than "cohort" (normalise.py) scores every selection on the same fixed scales.
+
+A selection's snapshot is versioned by a hash of its partitions' sha1s, so
+the same selection has the same version in every worker, and building one
+never moves the store's reload version.
+
+    python partitions.py split big_extract.csv --by School Term
+    python partitions.py add term_extract.csv --school North --term 2024-T1
+    python partitions.py list
+"""
+
+import glob
+import hashlib
+import os
+import shutil
+
+import pandas as pd
+
+from data_store import BASE, RAW_COLUMNS, fingerprint, load_normaliser, load_students
+from lru import LRUCache
+from snapshot import Snapshot, content_version
+
+PARTITION_ROOT = os.environ.get("EWS_PARTITION_ROOT", os.path.join(BASE, "cohorts"))
+MEMORY_CEILING = int(os.environ.get("EWS_PARTITION_MEMORY_MB", "512")) << 20
+PARTITION_FILE = "students.csv"
+
+
+def partition_path(key, root=PARTITION_ROOT):
+    school, term = key.split("/", 1)
+    return os.path.join(root, f"school={school}", f"term={term}", PARTITION_FILE)
+
+
+def frame_bytes(value):
+    """Memory held by a frame or a Snapshot's frame."""
+    df = value.df if isinstance(value, Snapshot) else value
+    return int(df.memory_usage(deep=True, index=False).sum())
+
+
+class PartitionCatalog:
+    def __init__(self, root=PARTITION_ROOT, max_bytes=MEMORY_CEILING):
+        self.root = root
+        self.cache = LRUCache(max_bytes, frame_bytes)
+
+    def partitions(self):
+        found = glob.glob(os.path.join(self.root, "school=*", "term=*", PARTITION_FILE))
+        keys = []
+        for path in found:
+            term_dir = os.path.dirname(path)
+            school = os.path.basename(os.path.dirname(term_dir)).split("=", 1)[1]
+            term = os.path.basename(term_dir).split("=", 1)[1]
+            keys.append(f"{school}/{term}")
+        return sorted(keys)
+
+    @staticmethod
+    def label(key):
+        school, term = key.split("/", 1)
+        return f"{school} · {term}"
+
+    def load(self, key):
+        return self.snapshot([key]).df
+
+    def snapshot(self, keys):
+        """Snapshot of the selected partitions, loading only what is not cached."""
+        keys = sorted(set(keys))
+        shas = [fingerprint(partition_path(k, self.root))[2] for k in keys]
+        sel = hashlib.sha1("|".join(shas).encode()).hexdigest()
+
+        if len(keys) == 1:
+            # One partition is its own selection: a single entry, counted once.
+            path = partition_path(keys[0], self.root)
+            return self.cache.get(("part", keys[0], shas[0]), lambda: Snapshot(
+                content_version(sel), self.root, sel, load_students(path, mmap=True), keys))
+
+        def build():
+            frames = [self.load(k) for k in keys]
+            df = load_normaliser().assign(pd.concat(frames, ignore_index=True))
+            return Snapshot(content_version(sel), self.root, sel, df, keys)
+
+        return self.cache.get(("sel", sel), build)
+
+
+# ─── writing partitions ───────────────────────────────────────────────────────
+def add_partition(src, school, term, root=PARTITION_ROOT):
+    dest = partition_path(f"{school}/{term}", root)
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    shutil.copyfile(src, dest)
+    return dest
+
+
+def split_extract(src, by=("School", "Term"), root=PARTITION_ROOT, chunksize=250_000):
+    """Split one extract with school / term columns into partitions."""
+    school_col, term_col = by
+    written = set()
+    for chunk in pd.read_csv(src, chunksize=chunksize):
+        chunk.columns = chunk.columns.str.strip()
+        for (school, term), rows in chunk.groupby([school_col, term_col], sort=False):
+            dest = partition_path(f"{school}/{term}", root)
+            first = dest not in written
+            if first:
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                written.add(dest)
+            rows[RAW_COLUMNS].to_csv(dest, mode="w" if first else "a",
+                                     header=first, index=False)
+    return sorted(written)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Manage per-cohort student partitions.")
+    ap.add_argument("--root", default=PARTITION_ROOT)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("split")
+    p.add_argument("src")
+    p.add_argument("--by", nargs=2, default=["School", "Term"])
+    p = sub.add_parser("add")
+    p.add_argument("src")
+    p.add_argument("--school", required=True)
+    p.add_argument("--term", required=True)
+    sub.add_parser("list")
+    args = ap.parse_args()
+
+    if args.cmd == "split":
+        for path in split_extract(args.src, args.by, args.root):
+            print("Wrote", path)
+    elif args.cmd == "add":
+        print("Wrote", add_partition(args.src, args.school, args.term, args.root))
+    else:
+        for key in PartitionCatalog(args.root).partitions():
+            print(key)
@@ -0,0 +1,219 @@
+"""
+roster.py
+The full ranked cohort, paged, sorted and filtered on the server.
+
+The Risk Index tab's at-risk table used to ship its rows to the browser and
+paginate there, which only works for a Top 20.  Roster answers the
+DataTable's custom paging instead (page_current, page_size, sort_by,
+filter_query), so only the visible page travels over the wire.
+
+A Roster is built once per data version and scoring method.  It holds the
+display columns as arrays and the ranked order (RiskScore descending, ties by
+StudentID, as in topk.py).  The ascending order of any other column is argsorted
+the first time it is sorted on and then kept.  A request is therefore:
+
+  - no filter: slice the order, O(page size);
+  - filter: one vectorised mask per condition, then order[mask[order]];
+    the last filtered order is kept, so paging through it is a slice again.
+
+After a delta (delta.py) the next version's roster is derived from this one
+with updated(): rows are never moved or reused, so the ranked and ascending
+orders drop the removed rows and merge the appended ones in by binary search
+instead of being sorted again.
+
+Filters use the DataTable filter syntax, conditions joined by "&&":
+{Risk Score} >= 70, {Risk Level} = Critical, {Grade} != F,
+{Risk Level} contains "Hi".  Categorical columns compare by level order, so
+{Risk Level} > Medium means High or Critical.  GPA, study hours and score
+compare at the precision the table shows them.
+
+    python roster.py --sort GPA --filter "{Risk Level} = Critical" --page 3
+"""
+
+import bisect
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Display name -> frame column, in table order.
+COLUMNS = {"Student ID": "StudentID", "GPA": "GPA", "Grade": "GradeLetter",
+           "Absences": "Absences", "Study Hrs/Wk": "StudyTimeWeekly",
+           "Risk Score": "RiskScore", "Risk Level": "RiskCategory"}
+ROUND = {"GPA": 2, "Study Hrs/Wk": 1, "Risk Score": 2}
+# Filter operator -> NumPy comparison (DataTable writes both forms).
+OPERATORS = {"=": np.equal, "eq": np.equal, "!=": np.not_equal, "ne": np.not_equal,
+             "<": np.less, "lt": np.less, "<=": np.less_equal, "le": np.less_equal,
+             ">": np.greater, "gt": np.greater, ">=": np.greater_equal, "ge": np.greater_equal,
+             "contains": None}
+_CONDITION = re.compile(r"^\{(?P<col>[^}]+)\}\s+s?(?P<op>[a-z]+|[<>!=]=?)\s+(?P<value>.+)$")
+
+
+class Roster:
+    def __init__(self, df, scores=None, codes=None, alive=None):
+        """Roster of *df*'s rows, or only those where the bool mask *alive* is set."""
+        self._columns(df, scores, codes, alive)
+        # Ranked: highest score first, ties by StudentID.
+        ranked = np.lexsort((self.values["Student ID"], -self.values["Risk Score"]))
+        self.ranked = ranked if alive is None else ranked[alive[ranked]]
+        self._ascending = {}
+
+    def _columns(self, df, scores, codes, alive):
+        self.values = {}
+        self.categories = {}
+        for name, col in COLUMNS.items():
+            if col == "RiskScore" and scores is not None:
+                self.values[name] = np.asarray(scores)
+            elif col == "RiskCategory" and codes is not None:
+                self.values[name] = np.asarray(codes)
+                self.categories[name] = df[col].cat.categories
+            elif isinstance(df[col].dtype, pd.CategoricalDtype):
+                self.values[name] = np.asarray(df[col].array.codes)  # no copy
+                self.categories[name] = df[col].cat.categories
+            else:
+                self.values[name] = df[col].to_numpy()
+        self.alive = alive
+        self._filtered = (None, None)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.ranked)
+
+    # ── ordering ─────────────────────────────────────────────────────────
+    def order(self, sort_by=None):
+        """Row positions in display order for a DataTable sort_by list."""
+        if not sort_by:
+            return self.ranked
+        name, direction = sort_by[0]["column_id"], sort_by[0]["direction"]
+        if name not in self.values:
+            raise ValueError(f"unknown column {name!r}")
+        asc = self._ascending.get(name)
+        if asc is None:
+            asc = np.argsort(self.values[name], kind="stable")
+            if self.alive is not None:
+                asc = asc[self.alive[asc]]
+            self._ascending[name] = asc
+        return asc if direction == "asc" else asc[::-1]
+
+    # ── filtering ────────────────────────────────────────────────────────
+    def mask(self, filter_query):
+        """Boolean row mask for a DataTable filter_query, or None for no filter."""
+        mask = None
+        for part in filter_query.split(" && ") if filter_query else ():
+            m = _CONDITION.match(part.strip())
+            if not m or m["op"] not in OPERATORS or m["col"] not in self.values:
+                raise ValueError(f"cannot filter on {part!r}")
+            cond = self._condition(m["col"], m["op"], m["value"].strip().strip("\"'`"))
+            mask = cond if mask is None else mask & cond
+        return mask
+
+    def _condition(self, name, op, value):
+        values, compare = self.values[name], OPERATORS[op]
+        if name in self.categories:
+            labels = [str(c) for c in self.categories[name]]
+            if compare is None:
+                hits = [i for i, c in enumerate(labels) if value.lower() in c.lower()]
+                return np.isin(values, hits)
+            if value not in labels:
+                return np.full(len(values), compare is np.not_equal)
+            # Level codes follow the category order; -1 (no level) never matches.
+            return compare(values, labels.index(value)) & ((values >= 0) | (compare is np.not_equal))
+        if compare is None:
+            return np.char.find(values.astype(str), value) >= 0
+        try:
+            target = float(value)
+        except ValueError:
+            raise ValueError(f"{name} needs a number, not {value!r}") from None
+        if name in ROUND:
+            # Compare what the table shows, so {GPA} = 2.93 matches a 2.9292.
+            values = values.astype(np.float64).round(ROUND[name])
+        return compare(values, target)
+
+    # ── paging ───────────────────────────────────────────────────────────
+    def page(self, page_current=0, page_size=10, sort_by=None, filter_query=""):
+        """(records for one page, matching row count)."""
+        key = (filter_query or "", tuple((s["column_id"], s["direction"]) for s in sort_by or ()))
+        with self._lock:
+            cached_key, order = self._filtered
+        if cached_key != key:
+            order = self.order(sort_by)
+            mask = self.mask(filter_query)
+            if mask is not None:
+                order = order[mask[order]]
+            with self._lock:
+                self._filtered = (key, order)
+        start = max(int(page_current or 0), 0) * page_size
+        rows = order[start:start + page_size]
+        return self.records(rows), len(order)
+
+    def records(self, rows):
+        out = {}
+        for name, values in self.values.items():
+            col = values[rows]
+            if name in self.categories:
+                labels = np.asarray([str(c) for c in self.categories[name]] + [None], dtype=object)
+                col = labels[col]
+            elif name in ROUND:
+                col = col.astype(np.float64).round(ROUND[name])
+            out[name] = col.tolist()
+        return [dict(zip(out, r)) for r in zip(*out.values())]
+
+    # ── after a delta ────────────────────────────────────────────────────
+    def updated(self, df, alive, removed, added):
+        """Roster of *df* without the row positions *removed*, with those *added*.
+
+        *df* holds this roster's rows at the same positions and the new ones
+        after them; *alive* masks the rows still current.  A row that changed
+        is removed and added again under a new position.
+        """
+        if len(removed) + len(added) > len(self.ranked) // 4:
+            return Roster(df, alive=alive)  # a large delta: sorting again is cheaper
+        new = Roster.__new__(Roster)
+        new._columns(df, None, None, alive)
+        sid, score = new.values["Student ID"], new.values["Risk Score"]
+        new.ranked = _merge(self.ranked, removed, added, lambda r: (-score[r], sid[r], r))
+        # Ascending orders are stable sorts: ties in row order, so new rows go last.
+        new._ascending = {name: _merge(asc, removed, added,
+                                       lambda r, v=new.values[name]: (v[r], r))
+                          for name, asc in dict(self._ascending).items()}
+        return new
+
+
+def _merge(order, removed, added, key):
+    """*order*, sorted by key(row), without the rows *removed* and with *added*.
+
+    key() is unique per row, so each row is found by binary search and the
+    order is only copied, never sorted again.
+    """
+    if len(removed):
+        order = np.delete(order, [bisect.bisect_left(order, key(r), key=key) for r in removed])
+    if len(added):
+        added = sorted(added, key=key)
+        order = np.insert(order, [bisect.bisect_left(order, key(r), key=key) for r in added],
+                          added)
+    return order
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    from data_store import load_students
+
+    ap = argparse.ArgumentParser(description="Page through the ranked cohort.")
+    ap.add_argument("--sort", help="column to sort on, e.g. GPA")
+    ap.add_argument("--desc", action="store_true")
+    ap.add_argument("--filter", default="")
+    ap.add_argument("--page", type=int, default=0)
+    ap.add_argument("--size", type=int, default=10)
+    args = ap.parse_args()
+
+    r = Roster(load_students())
+    sort_by = ([{"column_id": args.sort, "direction": "desc" if args.desc else "asc"}]
+               if args.sort else None)
+    t0 = time.perf_counter()
+    rows, total = r.page(args.page, args.size, sort_by, args.filter)
+    took = time.perf_counter() - t0
+    print(pd.DataFrame(rows).to_string(index=False))
+    print(f"{total:,} of {len(r):,} students match; page {args.page} in {took * 1e3:.1f} ms")
@@ -0,0 +1,285 @@
+"""
+score_api.py
+Scoring endpoints on the dashboard's Flask server.
+
+    GET /api/student/<StudentID>?Absences=35&...
+        one student's features, RiskScore, category, per-factor contributions
+        under the given weights (default scoring.WEIGHTS) and percentile rank,
+        from the per-version StudentIndex (student_index.py); 404 if unknown,
+        400 for a negative or non-numeric weight
+
+    POST /api/score
+        body     CSV (text/csv) or Arrow IPC stream
+                 (application/vnd.apache.arrow.stream), optionally
+                 Content-Encoding: gzip
+        columns  StudentID + the scoring.py FACTOR_COLUMNS; others are ignored
+        returns  StudentID, RiskScore, RiskCategory in the same row order, as
+                 CSV or Arrow (Accept header, default: the request's format),
+                 gzip-compressed when Accept-Encoding allows it
+
+    POST /api/delta
+        body     a delta CSV (delta.py), optionally Content-Encoding: gzip
+        returns  JSON counts of inserted / updated / deleted / missing
+                 students, whether the cohort was rescored, and the data
+                 version published with it; 400 for a rejected delta, 403
+                 unless EWS_DELTA_API=1
+
+The bulk body is read, validated (validate.py), scored with score_arrays() and
+written back one chunk of CHUNK_ROWS at a time, so memory stays flat however
+many students are sent.  Rows that fail validation come back with an empty
+RiskScore and RiskCategory.
+
+A stream cannot be read twice for its own maxima, so Absences and
+StudyTimeWeekly are normalised by the persisted normaliser (normalise.py), or
+with the default "cohort" strategy by the current dashboard cohort's maxima;
+?max_abs= / ?max_study= pin other caps.  Values above a cap are clipped to it,
+so every score stays within 0-100.  Arrow needs pyarrow.
+
+    curl --data-binary @students.csv.gz -H "Content-Encoding: gzip" \\
+         -H "Content-Type: text/csv" -H "Accept-Encoding: gzip" \\
+         http://localhost:8050/api/score -o scores.csv.gz
+"""
+
+import gzip
+import io
+import logging
+import os
+import zlib
+
+import numpy as np
+import pandas as pd
+from flask import Blueprint, Response, current_app, jsonify, request
+
+from data_store import SCHEMA, load_normaliser
+from delta import apply_to_store
+from normalise import Normaliser
+from scoring import FACTOR_COLUMNS, RISK_LEVELS, WEIGHTS
+from student_index import student_index
+from validate import validate
+
+log = logging.getLogger(__name__)
+
+CHUNK_ROWS = int(os.environ.get("EWS_SCORE_CHUNK_ROWS", "100000"))
+DELTA_API = os.environ.get("EWS_DELTA_API", "0") == "1"  # writes to the cohort: opt in
+CSV_TYPE = "text/csv"
+ARROW_TYPE = "application/vnd.apache.arrow.stream"
+INPUT_COLUMNS = ["StudentID"] + FACTOR_COLUMNS
+OUTPUT_COLUMNS = ["StudentID", "RiskScore", "RiskCategory"]
+
+api = Blueprint("score_api", __name__)
+
+
+def register(server, current_snapshot, store=None):
+    """Mount the endpoints on *server*; current_snapshot() gives the reference cohort.
+
+    Deltas are published to *store* (a SnapshotStore); without one /api/delta
+    is a 403.
+    """
+    server.extensions["ews_snapshot"] = current_snapshot
+    server.extensions["ews_store"] = store
+    server.register_blueprint(api)
+
+
+def reference_normaliser(snap):
+    """The Normaliser streamed rows are scored with, for *snap* as the reference cohort."""
+    return snap.derive("normaliser", lambda s: load_normaliser().frozen(s.df))
+
+
+# ─── reading ──────────────────────────────────────────────────────────────────
+def _csv_chunks(body, chunk_rows):
+    wanted = set(INPUT_COLUMNS)
+    try:
+        reader = pd.read_csv(body, chunksize=chunk_rows, usecols=lambda c: c.strip() in wanted)
+    except pd.errors.EmptyDataError:
+        return  # empty body: no rows, the response is the header alone
+    for chunk in reader:
+        chunk.columns = chunk.columns.str.strip()
+        yield chunk
+
+
+def _arrow_chunks(body, chunk_rows):
+    import pyarrow as pa
+
+    for batch in pa.ipc.open_stream(body):
+        for start in range(0, batch.num_rows, chunk_rows):
+            yield batch.slice(start, chunk_rows).to_pandas()
+
+
+# ─── scoring ──────────────────────────────────────────────────────────────────
+def score_chunk(chunk, normaliser):
+    """StudentID / RiskScore / RiskCategory for one raw chunk; invalid rows get NaN / None."""
+    report = validate(chunk, INPUT_COLUMNS)
+    good = np.ones(len(chunk), dtype=bool)
+    good[report.bad_rows] = False
+
+    # Same stored dtypes as the dashboard, so a student scores identically here.
+    clean = report.clean(chunk[INPUT_COLUMNS]).astype({c: SCHEMA[c] for c in INPUT_COLUMNS})
+    scores, codes = normaliser.score(clean)
+
+    sid = pd.to_numeric(chunk["StudentID"], errors="coerce").astype("Int64")
+    risk = np.full(len(chunk), np.nan)
+    risk[good] = scores
+    level = np.full(len(chunk), -1, dtype=np.int8)
+    level[good] = codes
+    return pd.DataFrame({
+        "StudentID": sid.array,
+        "RiskScore": risk,
+        "RiskCategory": pd.Categorical.from_codes(level, categories=RISK_LEVELS),
+    })
+
+
+# ─── writing ──────────────────────────────────────────────────────────────────
+class _Spool(io.RawIOBase):
+    """Write-only sink whose bytes are drained after every Arrow batch."""
+
+    def __init__(self):
+        self.parts, self.pos = [], 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.parts.append(bytes(b))
+        self.pos += len(b)
+        return len(b)
+
+    def tell(self):
+        return self.pos
+
+    def drain(self):
+        out, self.parts = b"".join(self.parts), []
+        return out
+
+
+def _csv_body(frames):
+    header = True
+    for out in frames:
+        yield out.to_csv(index=False, header=header).encode()
+        header = False
+    if header:  # empty request: still send the header row
+        yield (",".join(OUTPUT_COLUMNS) + "\n").encode()
+
+
+def _arrow_body(frames):
+    import pyarrow as pa
+
+    schema = pa.schema([("StudentID", pa.int64()), ("RiskScore", pa.float64()),
+                        ("RiskCategory", pa.string())])
+    sink = _Spool()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for out in frames:
+            out["RiskCategory"] = out["RiskCategory"].astype(object)
+            writer.write_batch(pa.RecordBatch.from_pandas(out, schema=schema,
+                                                          preserve_index=False))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def _gzipped(blocks):
+    z = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for block in blocks:
+        data = z.compress(block)
+        if data:
+            yield data
+    yield z.flush()
+
+
+def _error(status, message):
+    response = jsonify(error=message)
+    response.status_code = status
+    return response
+
+
+# ─── endpoints ────────────────────────────────────────────────────────────────
+@api.get("/api/student/<int:student_id>")
+def student(student_id):
+    try:
+        given = {c: float(request.args[c]) for c in FACTOR_COLUMNS if c in request.args}
+        index = student_index(current_app.extensions["ews_snapshot"]())
+        result = index.lookup(student_id, {**WEIGHTS, **given} if given else None)
+    except ValueError as exc:
+        return _error(400, str(exc))
+    if result is None:
+        return _error(404, f"no student {student_id}")
+    return jsonify(result)
+
+
+@api.post("/api/score")
+def score():
+    in_type = request.mimetype or CSV_TYPE
+    if in_type not in (CSV_TYPE, ARROW_TYPE):
+        return _error(415, f"send {CSV_TYPE} or {ARROW_TYPE}")
+    out_type = (request.accept_mimetypes.best_match([in_type, CSV_TYPE, ARROW_TYPE])
+                or in_type)
+    if ARROW_TYPE in (in_type, out_type):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            return _error(415, "Arrow IPC needs pyarrow on the server")
+
+    try:
+        chunk_rows = int(request.args.get("chunk_rows", CHUNK_ROWS))
+        norm = reference_normaliser(current_app.extensions["ews_snapshot"]())
+        caps = {"Absences": float(request.args.get("max_abs", norm.caps["Absences"])),
+                "StudyTimeWeekly": float(request.args.get("max_study",
+                                                          norm.caps["StudyTimeWeekly"]))}
+    except ValueError:
+        return _error(400, "chunk_rows, max_abs and max_study must be numbers")
+    if chunk_rows <= 0 or min(caps.values()) <= 0:
+        return _error(400, "chunk_rows, max_abs and max_study must be positive")
+    if caps != norm.caps:
+        norm = Normaliser("fixed", caps=caps)
+
+    body = request.stream
+    encoding = request.content_encoding
+    if encoding == "gzip":
+        body = gzip.GzipFile(fileobj=body, mode="rb")
+    elif encoding not in (None, "", "identity"):
+        return _error(415, f"unsupported Content-Encoding {encoding!r}")
+
+    chunks = (_csv_chunks if in_type == CSV_TYPE else _arrow_chunks)(body, chunk_rows)
+    # Score the first chunk before answering, so schema errors still get a 400.
+    try:
+        first = [score_chunk(next(chunks), norm)]
+    except StopIteration:
+        first = []
+    except (ValueError, OSError, EOFError) as exc:
+        return _error(400, str(exc))
+
+    def frames():
+        yield from first
+        try:
+            for chunk in chunks:
+                yield score_chunk(chunk, norm)
+        except (ValueError, OSError, EOFError):
+            # Headers are gone by now; log it and end the body early.
+            log.exception("bulk scoring stopped mid-stream")
+
+    blocks = (_csv_body if out_type == CSV_TYPE else _arrow_body)(frames())
+    headers = {"Vary": "Accept-Encoding"}
+    if "gzip" in request.accept_encodings:
+        blocks = _gzipped(blocks)
+        headers["Content-Encoding"] = "gzip"
+    return Response(blocks, mimetype=out_type, headers=headers)
+
+
+@api.post("/api/delta")
+def delta():
+    store = current_app.extensions.get("ews_store")
+    if not DELTA_API or store is None:
+        return _error(403, "delta ingest is off (EWS_DELTA_API=1 turns it on)")
+    if (request.mimetype or CSV_TYPE) != CSV_TYPE:
+        return _error(415, f"send {CSV_TYPE}")
+    body = request.stream
+    encoding = request.content_encoding
+    if encoding == "gzip":
+        body = gzip.GzipFile(fileobj=body, mode="rb")
+    elif encoding not in (None, "", "identity"):
+        return _error(415, f"unsupported Content-Encoding {encoding!r}")
+    try:
+        result = apply_to_store(store, pd.read_csv(body))
+    except pd.errors.EmptyDataError:
+        return _error(400, "empty delta")
+    except (ValueError, OSError, EOFError) as exc:
+        return _error(400, str(exc))
+    return jsonify(result.as_dict())
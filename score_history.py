@@ -0,0 +1,206 @@
+"""
+score_history.py
+Versioned RiskScore snapshots and run-to-run diffs.
+
+Every pipeline run (build_dashboard.py, generate_pdf_report.py, or
+`python score_history.py record`) appends one compact snapshot under
+HISTORY_DIR:
+
+    history/scores-<UTC time>-<data sha1>.ewsmap
+
+in the data_store.py mmap layout with three columns: StudentID sorted
+ascending (int32), RiskScore (float32) and RiskCategory (int8 codes, -1 for
+none).  That is 9 bytes per student.  Snapshots are opened memory-mapped.
+A run whose data hash equals the latest snapshot's is not recorded again.
+
+diff() merge-joins two snapshots on StudentID.  Both ID arrays are already
+sorted, so one stable sort of their concatenation is a single timsort merge of
+two runs, which is linear.  The result holds the category transition matrix
+(with "New" / "Removed" for students present on one side only) and the list of
+students whose category changed.  The Risk Index tab shows it as "Movers since
+the last run".
+
+    python score_history.py record
+    python score_history.py list
+    python score_history.py diff            # latest run vs the current data
+"""
+
+import glob
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_store import BASE, DATA_PATH, fingerprint, load_students, open_mmap, save_mmap
+from scoring import RISK_DTYPE, RISK_LEVELS
+
+HISTORY_DIR = os.environ.get("EWS_HISTORY_DIR", os.path.join(BASE, "history"))
+NEW, REMOVED = "New", "Removed"
+
+
+class ScoreRun:
+    """One scoring of a cohort: StudentIDs ascending, float32 scores, int8 level codes."""
+
+    __slots__ = ("ids", "scores", "codes", "label")
+
+    def __init__(self, ids, scores, codes, label=""):
+        self.ids = ids
+        self.scores = scores
+        self.codes = codes
+        self.label = label
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_frame(cls, df, label="current"):
+        ids = df["StudentID"].to_numpy()
+        order = slice(None) if (np.diff(ids) > 0).all() else np.argsort(ids, kind="stable")
+        return cls(ids[order].astype(np.int32),
+                   df["RiskScore"].to_numpy(dtype=np.float32)[order],
+                   df["RiskCategory"].cat.codes.to_numpy()[order], label)
+
+    @classmethod
+    def load(cls, path):
+        df = open_mmap(path)
+        return cls(df["StudentID"].to_numpy(), df["RiskScore"].to_numpy(),
+                   df["RiskCategory"].cat.codes.to_numpy(), run_label(path))
+
+    def save(self, path):
+        save_mmap(pd.DataFrame({
+            "StudentID": self.ids,
+            "RiskScore": self.scores,
+            "RiskCategory": pd.Categorical.from_codes(self.codes, dtype=RISK_DTYPE),
+        }), path)
+        return path
+
+
+# ─── run files ────────────────────────────────────────────────────────────────
+def run_label(path):
+    """'2026-10-18 14:03 UTC' from a run file name."""
+    stamp = os.path.basename(path).split("-")[1]
+    return time.strftime("%Y-%m-%d %H:%M UTC", time.strptime(stamp, "%Y%m%dT%H%M%SZ"))
+
+
+def run_sha(path):
+    return os.path.splitext(os.path.basename(path))[0].split("-")[2]
+
+
+def list_runs(root=HISTORY_DIR):
+    """Run files, oldest first."""
+    return sorted(glob.glob(os.path.join(root, "scores-*.ewsmap")))
+
+
+def record_run(df=None, sha1=None, root=HISTORY_DIR, path=DATA_PATH):
+    """Append a snapshot of *df* (default: the prepared *path*); None if unchanged."""
+    if sha1 is None:
+        _, _, sha1 = fingerprint(path)
+    runs = list_runs(root)
+    if runs and run_sha(runs[-1]) == sha1[:12]:
+        return None
+    if df is None:
+        df = load_students(path)
+    stamp = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+    return ScoreRun.from_frame(df).save(os.path.join(root, f"scores-{stamp}-{sha1[:12]}.ewsmap"))
+
+
+def baseline_run(sha1, root=HISTORY_DIR):
+    """The latest run of different data than *sha1*, or None."""
+    for path in reversed(list_runs(root)):
+        if run_sha(path) != sha1[:12]:
+            return ScoreRun.load(path)
+    return None
+
+
+# ─── diff ─────────────────────────────────────────────────────────────────────
+class ScoreDiff:
+    __slots__ = ("old", "new", "transitions", "movers")
+
+    def __init__(self, old, new, transitions, movers):
+        self.old = old
+        self.new = new
+        self.transitions = transitions  # old level x new level counts
+        self.movers = movers            # students whose level changed
+
+    @property
+    def moved(self):
+        return len(self.movers)
+
+    def escalated(self):
+        return self.movers[self.movers["Change"] > 0]
+
+
+def diff(old, new):
+    """Merge-join two ScoreRuns on StudentID and compare their risk levels."""
+    ids = np.concatenate([old.ids, new.ids])
+    side = np.concatenate([np.zeros(len(old), np.int8), np.ones(len(new), np.int8)])
+    order = np.argsort(ids, kind="stable")  # merge of two sorted runs: linear
+    ids, side, pos = ids[order], side[order], order
+    pair = ids[1:] == ids[:-1]               # (old, new) of one student sit side by side
+    first = np.flatnonzero(pair)
+    in_both = np.zeros(len(ids), dtype=bool)
+    in_both[first] = in_both[first + 1] = True
+
+    o_pos = pos[first]
+    n_pos = pos[first + 1] - len(old)
+    levels = RISK_LEVELS + [NEW, REMOVED]
+    none = len(RISK_LEVELS)  # codes -1 (no category) land with New / Removed below
+    o_code = old.codes[o_pos].astype(np.intp)
+    n_code = new.codes[n_pos].astype(np.intp)
+    o_code[o_code < 0] = none
+    n_code[n_code < 0] = none + 1
+
+    k = len(levels)
+    counts = np.bincount(o_code * k + n_code, minlength=k * k).reshape(k, k)
+    only_new = np.flatnonzero(~in_both & (side == 1))
+    only_old = np.flatnonzero(~in_both & (side == 0))
+    new_codes = new.codes[pos[only_new] - len(old)].astype(np.intp)
+    old_codes = old.codes[pos[only_old]].astype(np.intp)
+    counts[none] += np.bincount(new_codes[new_codes >= 0], minlength=k)
+    counts[:, none + 1] += np.bincount(old_codes[old_codes >= 0], minlength=k)
+    transitions = pd.DataFrame(counts[:none + 1, :none], index=RISK_LEVELS + [NEW],
+                               columns=RISK_LEVELS)
+    transitions[REMOVED] = counts[:none + 1, none + 1]
+
+    changed = (o_code != n_code) & (o_code < none) & (n_code < none)
+    o_pos, n_pos = o_pos[changed], n_pos[changed]
+    movers = pd.DataFrame({
+        "StudentID": new.ids[n_pos],
+        "OldScore": old.scores[o_pos].astype(np.float64).round(2),
+        "NewScore": new.scores[n_pos].astype(np.float64).round(2),
+        "OldLevel": pd.Categorical.from_codes(old.codes[o_pos], dtype=RISK_DTYPE),
+        "NewLevel": pd.Categorical.from_codes(new.codes[n_pos], dtype=RISK_DTYPE),
+        "Change": new.codes[n_pos].astype(np.int8) - old.codes[o_pos].astype(np.int8),
+    })
+    # Biggest jumps first (either way), then by new score.
+    rank = np.lexsort((-movers["NewScore"].to_numpy(), -np.abs(movers["Change"].to_numpy())))
+    return ScoreDiff(old, new, transitions, movers.iloc[rank].reset_index(drop=True))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Record and compare RiskScore snapshots.")
+    ap.add_argument("command", choices=["record", "list", "diff"])
+    ap.add_argument("--path", default=DATA_PATH)
+    ap.add_argument("--root", default=HISTORY_DIR)
+    args = ap.parse_args()
+
+    if args.command == "record":
+        out = record_run(root=args.root, path=args.path)
+        print(f"Recorded {out}" if out else "Data unchanged since the last run; nothing recorded")
+    elif args.command == "list":
+        for p in list_runs(args.root):
+            print(run_label(p), run_sha(p), f"{len(open_mmap(p)):,} students")
+    else:
+        _, _, sha = fingerprint(args.path)
+        base = baseline_run(sha, args.root)
+        if base is None:
+            raise SystemExit("No earlier run of different data to compare with")
+        t0 = time.perf_counter()
+        d = diff(base, ScoreRun.from_frame(load_students(args.path)))
+        print(f"Since {base.label}: {d.moved:,} students changed level "
+              f"({time.perf_counter() - t0:.3f}s)")
+        print(d.transitions.to_string())
+        print(d.movers.head(20).to_string(index=False))
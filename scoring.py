@@ -0,0 +1,185 @@
+"""
+scoring.py
+The one RiskScore implementation used by the dashboard, workbook and report.
+
+    Risk = (1 - GPA/4)*35 + (Absences/MaxAbs)*25 + (1 - StudyTime/MaxStudy)*20
+         + (1 - Support/4)*10 + (GradeClass/4)*10
+
+rounded to 2 dp, then binned into RISK_LEVELS at RISK_BINS.  MaxAbs / MaxStudy
+are the maxima of the cohort being scored.
+
+score_arrays() is the batch API: it takes plain column arrays (a whole frame or
+one streamed chunk) and returns the float64 scores and int8 level codes.  All
+the arithmetic runs in place in two float64 buffers, in the same order as the
+formula above, so a score is bit-identical however it is computed.
+score_student() is the scalar API for a single student, and
+factor_contributions() splits one student's score into per-factor points.
+
+Because the score is linear in the weights, re-weighting only needs the
+normalised factors once: factor_matrix() holds them as an (n, 5) matrix and
+score_weighted() rescores the cohort for any weights with one matrix-vector
+product.
+
+    python scoring.py --bench 1000000
+"""
+
+import bisect
+
+import numpy as np
+import pandas as pd
+
+RISK_BINS   = [0, 30, 55, 75, 100]
+RISK_LEVELS = ["Low", "Medium", "High", "Critical"]
+RISK_DTYPE  = pd.CategoricalDtype(RISK_LEVELS, ordered=True)
+
+# (column, weight, inverse?, scale).  A scale of None means the cohort maximum.
+FACTORS = [
+    ("GPA",             35, True,  4.0),
+    ("Absences",        25, False, None),
+    ("StudyTimeWeekly", 20, True,  None),
+    ("ParentalSupport", 10, True,  4.0),
+    ("GradeClass",      10, False, 4.0),
+]
+FACTOR_COLUMNS = [f[0] for f in FACTORS]
+WEIGHTS = {col: w for col, w, _, _ in FACTORS}
+
+
+def _scales(max_abs, max_study):
+    cohort = {"Absences": max_abs, "StudyTimeWeekly": max_study}
+    return [scale if scale is not None else cohort[col] for col, _, _, scale in FACTORS]
+
+
+def risk_codes(scores):
+    """int8 RISK_LEVELS codes for *scores* (-1 outside 0..100), as pd.cut would bin them."""
+    codes = np.zeros(len(scores), dtype=np.int8)
+    for edge in RISK_BINS[1:-1]:
+        codes += scores > edge
+    codes[~((scores >= RISK_BINS[0]) & (scores <= RISK_BINS[-1]))] = -1
+    return codes
+
+
+def score_arrays(columns, max_abs=None, max_study=None):
+    """Batch API: (scores, level codes) for a mapping of FACTOR_COLUMNS -> arrays.
+
+    *columns* may be a DataFrame or a dict of arrays.  max_abs / max_study
+    default to the maxima of these rows.
+    """
+    arrays = [np.asarray(columns[col]) for col in FACTOR_COLUMNS]
+    if max_abs is None:
+        max_abs = arrays[1].max(initial=0)
+    if max_study is None:
+        max_study = arrays[2].max(initial=0)
+
+    n = len(arrays[0])
+    out = np.empty(n, dtype=np.float64)
+    tmp = np.empty(n, dtype=np.float64)
+    for i, ((_, weight, inverse, _), scale, values) in enumerate(
+            zip(FACTORS, _scales(max_abs, max_study), arrays)):
+        dst = out if i == 0 else tmp
+        np.divide(values, scale, out=dst, dtype=np.float64)
+        if inverse:
+            np.subtract(1.0, dst, out=dst)
+        dst *= weight
+        if i:
+            out += tmp
+    np.round(out, 2, out=out)
+    return out, risk_codes(out)
+
+
+def score_student(gpa, absences, study, support, grade, max_abs, max_study):
+    """Scalar API: (score, level) for one student on a cohort's normalisers."""
+    total = 0.0
+    for (_, weight, inverse, _), scale, value in zip(
+            FACTORS, _scales(max_abs, max_study), (gpa, absences, study, support, grade)):
+        part = float(value) / float(scale)
+        if inverse:
+            part = 1.0 - part
+        total += part * weight
+    score = float(np.round(total, 2))
+    if not RISK_BINS[0] <= score <= RISK_BINS[-1]:
+        return score, None
+    return score, RISK_LEVELS[bisect.bisect_left(RISK_BINS[1:-1], score)]
+
+
+def factor_matrix(columns, max_abs=None, max_study=None):
+    """(n, len(FACTORS)) float64 matrix of the normalised, unweighted factors."""
+    arrays = [np.asarray(columns[col]) for col in FACTOR_COLUMNS]
+    if max_abs is None:
+        max_abs = arrays[1].max(initial=0)
+    if max_study is None:
+        max_study = arrays[2].max(initial=0)
+    out = np.empty((len(arrays[0]), len(FACTORS)), dtype=np.float64)
+    for j, ((_, _, inverse, _), scale, values) in enumerate(
+            zip(FACTORS, _scales(max_abs, max_study), arrays)):
+        col = out[:, j]
+        np.divide(values, scale, out=col, dtype=np.float64)
+        if inverse:
+            np.subtract(1.0, col, out=col)
+    return out
+
+
+def weight_vector(weights=None):
+    """FACTOR_COLUMNS-ordered weights (a dict, default WEIGHTS) rescaled to sum to 100."""
+    w = np.array([(weights or WEIGHTS).get(col, 0) for col in FACTOR_COLUMNS], dtype=np.float64)
+    if not np.isfinite(w).all() or (w < 0).any():
+        raise ValueError("factor weights must be non-negative numbers")
+    total = w.sum()
+    if total <= 0:
+        raise ValueError("at least one factor weight must be positive")
+    return w * (100.0 / total)
+
+
+def score_weighted(factors, weights=None):
+    """(scores, level codes) for a factor_matrix() under *weights*."""
+    scores = factors @ weight_vector(weights)
+    np.round(scores, 2, out=scores)
+    return scores, risk_codes(scores)
+
+
+def factor_contributions(values, max_abs, max_study, weights=None):
+    """Points each factor adds to one student's score under *weights* (default WEIGHTS)."""
+    w = weight_vector(weights)
+    out = {}
+    for j, ((col, _, inverse, _), scale) in enumerate(zip(FACTORS, _scales(max_abs, max_study))):
+        part = float(values[col]) / float(scale)
+        out[col] = (1.0 - part if inverse else part) * w[j]
+    return out
+
+
+def assign_scores(df, max_abs=None, max_study=None):
+    """Set df's RiskScore / RiskCategory columns from one score_arrays() pass."""
+    scores, codes = score_arrays(df, max_abs, max_study)
+    df["RiskScore"] = scores
+    df["RiskCategory"] = pd.Categorical.from_codes(codes, dtype=RISK_DTYPE)
+    return df
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    ap = argparse.ArgumentParser(description="Time the batch scorer and a re-weight.")
+    ap.add_argument("--bench", type=int, default=1_000_000, metavar="ROWS")
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    n = args.bench
+    cols = {"GPA": rng.uniform(0, 4, n),
+            "Absences": rng.integers(0, 30, n).astype(np.uint8),
+            "StudyTimeWeekly": rng.uniform(0, 20, n),
+            "ParentalSupport": rng.integers(0, 5, n).astype(np.uint8),
+            "GradeClass": rng.integers(0, 5, n).astype(np.uint8)}
+    best = float("inf")
+    for _ in range(5):
+        t0 = time.perf_counter()
+        score_arrays(cols)
+        best = min(best, time.perf_counter() - t0)
+    print(f"{n:,} students scored in {best * 1e3:.1f} ms ({best / n * 1e9:.1f} ns/student)")
+
+    factors = factor_matrix(cols)
+    best = float("inf")
+    for _ in range(5):
+        t0 = time.perf_counter()
+        score_weighted(factors, {**WEIGHTS, "Absences": 35})
+        best = min(best, time.perf_counter() - t0)
+    print(f"{n:,} students re-weighted in {best * 1e3:.1f} ms")
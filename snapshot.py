@@ -0,0 +1,172 @@
+"""
+snapshot.py
+Versioned, hot-reloadable view of the student dataset.
+
+A SnapshotStore owns the current Snapshot: an immutable bundle of the prepared
+frame, the file fingerprint it came from and a data version derived from that
+content.  A daemon thread polls the data file; when it changes (and has stopped
+changing, so half-written exports are skipped) the new frame is built in the
+background and swapped in with a single reference assignment.
+
+Callbacks grab `snap = STORE.current()` once and read only from it, so a
+request that started before a reload finishes on the old data.  Anything
+derived from the frame (aggregates, figures, indexes) is memoised on the
+snapshot with snap.derive(), which makes the data version the cache key:
+a reload starts from an empty memo and the old one is dropped with the old
+snapshot.
+
+Versions are content hashes, not counters, so every worker process that has
+loaded the same file reports the same version; a browser polling through a
+load balancer only sees the version change when the data does.
+
+A published snapshot (delta ingest, delta.py) may carry a function instead of
+a frame.  The frame is then built on first use of snap.df, so a version whose
+pages are all answered from pre-seeded derived values never pays for it.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+
+from data_store import fingerprint, load_students
+
+log = logging.getLogger(__name__)
+
+def content_version(*parts):
+    """Data version for content identified by *parts* (sha1s, delta digests)."""
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()[:16]
+
+
+class Snapshot:
+    """One immutable generation of the dataset.  Do not mutate .df."""
+
+    __slots__ = ("version", "path", "sha1", "_df", "cohorts", "_derived", "_lock",
+                 "__weakref__")
+
+    def __init__(self, version, path, sha1, df, cohorts=()):
+        self.version = version
+        self.path = path
+        self.sha1 = sha1
+        self._df = df  # the frame, or a function building it on first use
+        self.cohorts = tuple(cohorts)  # partition keys; () for the store's file
+        self._derived = {}
+        self._lock = threading.RLock()  # a build may derive() other keys
+
+    @property
+    def df(self):
+        if callable(self._df):
+            with self._lock:
+                if callable(self._df):
+                    self._df = self._df()
+        return self._df
+
+    def cached(self, key):
+        """The value derived under *key* so far, or None (never builds it)."""
+        return self._derived.get(key)
+
+    def derive(self, key, build):
+        """Return build(self) computed once per snapshot and cached under *key*."""
+        try:
+            return self._derived[key]
+        except KeyError:
+            pass
+        with self._lock:
+            if key not in self._derived:
+                self._derived[key] = build(self)
+            return self._derived[key]
+
+
+class SnapshotStore:
+    def __init__(self, path, loader=None, interval=5.0):
+        self.path = path
+        self.loader = loader or (lambda p: load_students(p, mmap=True))
+        self.interval = interval
+        self._listeners = []
+        self._swap_lock = threading.Lock()
+        self._stat = self._stat_key()
+        self._current = self._build()
+        self._thread = None
+
+    # ── reading ──────────────────────────────────────────────────────────
+    def current(self):
+        return self._current
+
+    @property
+    def version(self):
+        return self._current.version
+
+    def subscribe(self, fn):
+        """Call fn(snapshot) after every swap (e.g. to drop external caches)."""
+        self._listeners.append(fn)
+
+    # ── reloading ────────────────────────────────────────────────────────
+    def _stat_key(self):
+        st = os.stat(self.path)
+        return st.st_size, st.st_mtime_ns
+
+    def _build(self, sha1=None):
+        if sha1 is None:
+            _, _, sha1 = fingerprint(self.path)
+        return Snapshot(content_version(sha1), self.path, sha1, self.loader(self.path))
+
+    def reload(self, force=False):
+        """Rebuild from disk and swap in; returns True if the version changed."""
+        with self._swap_lock:
+            old = self._current
+            self._stat = self._stat_key()
+            _, _, sha1 = fingerprint(self.path)
+            if sha1 == old.sha1 and not force:
+                return False  # touched but identical content
+            new = self._build(sha1)
+            self._current = new
+        log.info("student data reloaded: version %s (%s)", new.version, new.sha1[:12])
+        for fn in self._listeners:
+            fn(new)
+        return True
+
+    def publish(self, df, change, **derived):
+        """Swap in an in-memory frame (e.g. after a delta) as the next version.
+
+        *df* is the frame or a function building it on first use.  *change*
+        identifies what was applied (e.g. a digest of the delta); the new
+        version hashes it onto the current one.  *derived* pre-seeds the new
+        snapshot's memo (e.g. agg=...) with values that were maintained
+        incrementally.  The data file stays the source of truth: the next
+        change on disk replaces this snapshot.
+        """
+        with self._swap_lock:
+            old = self._current
+            new = Snapshot(content_version(old.version, change), self.path, old.sha1, df)
+            new._derived.update(derived)
+            self._current = new
+        for fn in self._listeners:
+            fn(new)
+        return new
+
+    def _watch(self):
+        pending = None
+        while True:
+            time.sleep(self.interval)
+            try:
+                stat = self._stat_key()
+            except OSError:
+                continue  # file briefly missing while the export is replaced
+            if stat == self._stat:
+                pending = None
+            elif stat != pending:
+                pending = stat  # changed: wait one more tick for it to settle
+            else:
+                pending = None
+                try:
+                    self.reload()
+                except Exception:  # keep serving the old snapshot
+                    log.exception("reload of %s failed", self.path)
+
+    def start_watcher(self):
+        if self._thread is None and self.interval > 0:
+            self._thread = threading.Thread(target=self._watch, name="data-watcher",
+                                            daemon=True)
+            self._thread.start()
+        return self
@@ -0,0 +1,168 @@
+"""
+sqlite_backend.py
+Optional SQLite backend for the cohort summary cards.
+
+build_sqlite() streams the CSV chunk by chunk (streaming.py) into a local
+SQLite file next to the other caches, keyed by the CSV's content hash, and
+indexes GradeClass.  SqliteStudents answers the summary questions of
+streaming.CohortAggregates (KPIs, grade / risk distributions, GPA by parental
+education, the risk summary and the score histogram) with SQL, so the
+Academic Overview and Risk Index cards can use either.
+
+Only those cards move to SQL.  The dashboard still loads the prepared frame
+for the roster, the Ethics tab, the figures and delta ingest, so this is not a
+way to serve a cohort larger than memory.
+
+pandas stays the default; set EWS_BACKEND=sqlite to push the aggregates down.
+"""
+
+import os
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from data_store import (CACHE_DIR, CACHE_VERSION, DATA_PATH, RAW_COLUMNS, RISK_LEVELS,
+                        edu_map, fingerprint, grade_map, load_normaliser)
+from histogram import SCALE, ScoreHistogram
+from streaming import iter_prepared_chunks
+
+BACKEND = os.environ.get("EWS_BACKEND", "pandas")
+
+COLUMNS = RAW_COLUMNS + ["RiskScore", "RiskLevel"]
+INDEXES = {
+    "ix_students_grade": "GradeClass",
+}
+
+_SQL_TYPES = {"StudentID": "INTEGER PRIMARY KEY", "StudyTimeWeekly": "REAL",
+              "GPA": "REAL", "RiskScore": "REAL"}
+
+
+def sqlite_path(sha1, norm_key=""):
+    tag = f"-{norm_key}" if norm_key else ""
+    return os.path.join(CACHE_DIR, f"students-v{CACHE_VERSION}-{sha1[:16]}{tag}.sqlite")
+
+
+def build_sqlite(path=DATA_PATH, db_path=None, chunksize=250_000):
+    """Load *path* into an indexed SQLite file (skipped if it already exists)."""
+    norm = load_normaliser()
+    if db_path is None:
+        db_path = sqlite_path(fingerprint(path)[2], norm.key)
+    if os.path.exists(db_path):
+        return db_path
+
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    tmp = f"{db_path}.{os.getpid()}.tmp"
+    con = sqlite3.connect(tmp)
+    try:
+        con.execute("PRAGMA journal_mode=OFF")
+        con.execute("PRAGMA synchronous=OFF")
+        cols = ", ".join(f"{c} {_SQL_TYPES.get(c, 'INTEGER')}" for c in COLUMNS)
+        con.execute(f"CREATE TABLE students ({cols})")
+        insert = f"INSERT INTO students VALUES ({', '.join('?' * len(COLUMNS))})"
+        for chunk in iter_prepared_chunks(path, chunksize, norm):
+            out = chunk[RAW_COLUMNS].astype(object)
+            out["RiskScore"] = chunk["RiskScore"].astype(float)
+            out["RiskLevel"] = chunk["RiskCategory"].cat.codes.astype(int)
+            # astype(object) turns numpy scalars into Python ints/floats for sqlite3
+            con.executemany(insert, out.itertuples(index=False, name=None))
+        for name, expr in INDEXES.items():
+            con.execute(f"CREATE INDEX {name} ON students ({expr})")
+        con.execute("ANALYZE")
+        con.commit()
+    finally:
+        con.close()
+    os.replace(tmp, db_path)
+    return db_path
+
+
+class SqliteStudents:
+    """Read-only SQL views over a built database (one connection per thread)."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._hist = None
+
+    @classmethod
+    def for_csv(cls, path=DATA_PATH):
+        return cls(build_sqlite(path))
+
+    @property
+    def con(self):
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+            self._local.con = con
+        return con
+
+    def query(self, sql, params=()):
+        return self.con.execute(sql, params).fetchall()
+
+    # ── CohortAggregates-compatible views ────────────────────────────────
+    def kpis(self):
+        n, gpa, fails, study, absences = self.query(
+            "SELECT COUNT(*), AVG(GPA), SUM(GradeClass = 4), AVG(StudyTimeWeekly), "
+            "AVG(Absences) FROM students")[0]
+        n1 = max(n, 1)
+        fails = fails or 0
+        return {"total": n, "avg_gpa": gpa or 0.0, "pass_rate": (n - fails) / n1,
+                "fail_rate": fails / n1, "avg_study": study or 0.0,
+                "avg_abs": absences or 0.0}
+
+    def _counts_by(self, column, labels, value="COUNT(*)"):
+        out = pd.Series(np.nan if value != "COUNT(*)" else 0, index=list(labels.values()))
+        for code, v in self.query(f"SELECT {column}, {value} FROM students GROUP BY {column}"):
+            if code in labels:
+                out[labels[code]] = v
+        return out
+
+    def grade_distribution(self):
+        return self._counts_by("GradeClass", grade_map)
+
+    def pass_fail(self):
+        fails = self.query("SELECT COUNT(*) FROM students WHERE GradeClass = 4")[0][0]
+        total = self.query("SELECT COUNT(*) FROM students")[0][0]
+        return pd.Series({"Pass": total - fails, "Fail": fails})
+
+    def gpa_by_education(self):
+        return self._counts_by("ParentalEducation", edu_map, "AVG(GPA)")
+
+    def risk_distribution(self):
+        return self._counts_by("RiskLevel", dict(enumerate(RISK_LEVELS)))
+
+    def risk_summary(self):
+        rows = {r[0]: r[1:] for r in self.query(
+            "SELECT RiskLevel, COUNT(*), AVG(GPA), AVG(Absences), AVG(RiskScore) "
+            "FROM students GROUP BY RiskLevel")}
+        empty = (0, np.nan, np.nan, np.nan)
+        data = [rows.get(i, empty) for i in range(len(RISK_LEVELS))]
+        out = pd.DataFrame(data, columns=["Count", "AvgGPA", "AvgAbsences", "AvgRiskScore"])
+        out.insert(0, "RiskCategory", RISK_LEVELS)
+        return out
+
+    @property
+    def hist(self):
+        """ScoreHistogram of the stored scores from one GROUP BY (cached)."""
+        if self._hist is None:
+            hist = ScoreHistogram()
+            rows = np.array(self.query(
+                f"SELECT CAST(ROUND(RiskScore * {SCALE}) AS INTEGER) AS b, COUNT(*), "
+                "SUM(GPA), SUM(Absences), SUM(RiskScore) FROM students GROUP BY b"), dtype=float)
+            if len(rows):
+                b = rows[:, 0].astype(np.intp)
+                for j, name in enumerate(ScoreHistogram.FIELDS, 1):
+                    getattr(hist, name)[b] = rows[:, j]
+            self._hist = hist
+        return self._hist
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Build the indexed SQLite store for a student file.")
+    ap.add_argument("path", nargs="?", default=DATA_PATH)
+    ap.add_argument("--db")
+    args = ap.parse_args()
+    print("Wrote", build_sqlite(args.path, args.db))
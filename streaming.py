@@ -0,0 +1,293 @@
+"""
+streaming.py
+Chunked ingestion of the student file into mergeable aggregates.
+
+stream_aggregates() reads the CSV in fixed-size chunks and folds each one into
+a CohortAggregates: counts per GradeClass, GPA / study / absence sums, per-risk
+category counts and sums, GPA by parental education, a 0.01-point RiskScore
+histogram for re-bucketing at any cut points (histogram.py), and the top-K
+index of students by RiskScore (topk.py).  Two aggregates built from different chunks (or files) combine with
+merge(), and the Academic Overview KPIs, the risk summary table and the Top-N
+list all render from an aggregate, so a district-wide file never has to be held
+in memory at once.
+
+With the default "cohort" normaliser, RiskScore divides absences and study
+time by the whole-file maximum, so the stream makes one pass for those two
+maxima before scoring.  Any other normaliser (normalise.py) scores each chunk
+as it arrives, in a single pass, and learns from the chunks as it goes.  A file
+it has already learned from (by content hash) is scored without learning
+again.  Every pass drops rows that fail validation (validate.py).
+
+Set EWS_STREAMING=1 to have the entry points use the stream: the dashboard's
+aggregates() folds the file chunk by chunk instead of summarising the loaded
+frame, and build_dashboard.py writes the workbook's Data sheet and Top-25 from
+the same chunks without loading the whole cohort.
+
+    python streaming.py big_cohort.csv --chunksize 500000
+"""
+
+import copy
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_store import (DATA_PATH, RISK_LEVELS, edu_map, fingerprint, grade_map,
+                        load_normaliser, prepare_frame)
+from histogram import ScoreHistogram
+from topk import TOP_COLUMNS, TOP_LIMIT, TopK  # noqa: F401  (TOP_COLUMNS re-exported)
+from validate import validate
+
+STREAMING = os.environ.get("EWS_STREAMING", "0") == "1"
+
+N_GRADES = len(grade_map)
+N_LEVELS = len(RISK_LEVELS)
+N_EDU    = len(edu_map)
+# Totals that do not depend on RiskScore (shared by re-scored aggregates).
+UNSCORED = ("n", "gpa_sum", "study_sum", "abs_sum",
+            "grade_counts", "grade_gpa_sum", "edu_counts", "edu_gpa_sum")
+
+
+def _binned(codes, n, *weights):
+    """Count and weighted sums per code 0..n-1; out-of-range codes are ignored."""
+    codes = codes.astype(np.intp)
+    ok = (codes >= 0) & (codes < n)
+    if not ok.all():  # masking copies every array, so only do it when needed
+        codes = codes[ok]
+        weights = [w[ok] for w in weights]
+    return [np.bincount(codes, minlength=n)] + [np.bincount(codes, weights=w, minlength=n)
+                                                for w in weights]
+
+
+class CohortAggregates:
+    """Mergeable summary of a prepared student frame."""
+
+    def __init__(self, top_k=TOP_LIMIT):
+        self.top_k = top_k
+        self.n = 0
+        self.gpa_sum = 0.0
+        self.study_sum = 0.0
+        self.abs_sum = 0.0
+        self.grade_counts = np.zeros(N_GRADES, dtype=np.int64)
+        self.grade_gpa_sum = np.zeros(N_GRADES)
+        self.edu_counts = np.zeros(N_EDU, dtype=np.int64)
+        self.edu_gpa_sum = np.zeros(N_EDU)
+        self.risk_counts = np.zeros(N_LEVELS, dtype=np.int64)
+        self.risk_gpa_sum = np.zeros(N_LEVELS)
+        self.risk_abs_sum = np.zeros(N_LEVELS)
+        self.risk_score_sum = np.zeros(N_LEVELS)
+        self.hist = ScoreHistogram()
+        self.top = TopK(top_k)
+
+    @classmethod
+    def from_frame(cls, df, top_k=TOP_LIMIT):
+        agg = cls(top_k)
+        agg.update(df)
+        return agg
+
+    @classmethod
+    def rescored(cls, df, scores, codes, top_k=TOP_LIMIT, base=None):
+        """Aggregate of *df* as if scored (scores, level codes), e.g. re-weighted.
+
+        *base*, an aggregate of the same rows, supplies the totals that do not
+        depend on the scores.  Then only the histogram and the top-K take a
+        pass over the rows, and the risk tiers are read off the histogram.
+        """
+        agg = cls(top_k)
+        if base is None:
+            agg._fold(df, 1, scores, codes)
+        else:
+            for name in UNSCORED:
+                value = getattr(base, name)
+                setattr(agg, name, value.copy() if isinstance(value, np.ndarray) else value)
+            agg.hist.fold(scores, df["GPA"].to_numpy(dtype=np.float64),
+                          df["Absences"].to_numpy(dtype=np.float64))
+            (agg.risk_counts, agg.risk_gpa_sum,
+             agg.risk_abs_sum, agg.risk_score_sum) = agg.hist.tier_totals()
+        agg.top = TopK.build(df, scores, codes, top_k)
+        return agg
+
+    # ── folding ──────────────────────────────────────────────────────────
+    def update(self, chunk):
+        """Fold one prepared chunk (output of prepare_frame) into the totals."""
+        self._fold(chunk, 1)
+        self.top.offer(chunk)
+        return self
+
+    def remove(self, rows):
+        """Subtract rows previously folded in (delta ingest).
+
+        Sums and counts are exact.  The students leave the top-K index; if too
+        few are left to serve top_k rows it needs a rebuild (see top_stale).
+        """
+        self._fold(rows, -1)
+        self.top.discard(rows["StudentID"].tolist())
+        return self
+
+    @property
+    def top_stale(self):
+        return self.top.stale
+
+    def rebuild_top(self, df):
+        self.top = TopK.build(df, limit=self.top_k)
+        return self
+
+    def _fold(self, chunk, sign, score=None, risk=None):
+        gpa = chunk["GPA"].to_numpy(dtype=np.float64)
+        absences = chunk["Absences"].to_numpy(dtype=np.float64)
+        if score is None:
+            score = chunk["RiskScore"].to_numpy(dtype=np.float64)
+            risk = chunk["RiskCategory"].cat.codes.to_numpy()
+
+        self.n += sign * len(chunk)
+        self.gpa_sum += sign * gpa.sum()
+        self.study_sum += sign * chunk["StudyTimeWeekly"].to_numpy(dtype=np.float64).sum()
+        self.abs_sum += sign * absences.sum()
+
+        counts, gpa_sum = _binned(chunk["GradeClass"].to_numpy(), N_GRADES, gpa)
+        self.grade_counts += sign * counts
+        self.grade_gpa_sum += sign * gpa_sum
+
+        counts, gpa_sum = _binned(chunk["ParentalEducation"].to_numpy(), N_EDU, gpa)
+        self.edu_counts += sign * counts
+        self.edu_gpa_sum += sign * gpa_sum
+
+        counts, gpa_sum, abs_sum, score_sum = _binned(risk, N_LEVELS, gpa, absences, score)
+        self.risk_counts += sign * counts
+        self.risk_gpa_sum += sign * gpa_sum
+        self.risk_abs_sum += sign * abs_sum
+        self.risk_score_sum += sign * score_sum
+        self.hist.fold(score, gpa, absences, sign)
+
+    def copy(self):
+        """Independent copy, cheap next to a pass over the rows (delta.py)."""
+        agg = copy.copy(self)
+        for name, value in vars(self).items():
+            if isinstance(value, np.ndarray):
+                setattr(agg, name, value.copy())
+        agg.hist, agg.top = self.hist.copy(), self.top.copy()
+        return agg
+
+    def merge(self, other):
+        """Combine another aggregate (built from later rows) into this one."""
+        self.n += other.n
+        for name in ("gpa_sum", "study_sum", "abs_sum",
+                     "grade_counts", "grade_gpa_sum", "edu_counts", "edu_gpa_sum",
+                     "risk_counts", "risk_gpa_sum", "risk_abs_sum", "risk_score_sum"):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.hist.merge(other.hist)
+        self.top.merge(other.top)
+        return self
+
+    # ── views ────────────────────────────────────────────────────────────
+    def kpis(self):
+        n = max(self.n, 1)
+        fails = self.grade_counts[N_GRADES - 1]
+        return {
+            "total": self.n,
+            "avg_gpa": float(self.gpa_sum / n),
+            "pass_rate": float((self.n - fails) / n),
+            "fail_rate": float(fails / n),
+            "avg_study": float(self.study_sum / n),
+            "avg_abs": float(self.abs_sum / n),
+        }
+
+    def grade_distribution(self):
+        return pd.Series(self.grade_counts, index=list(grade_map.values()))
+
+    def pass_fail(self):
+        fails = int(self.grade_counts[N_GRADES - 1])
+        return pd.Series({"Pass": self.n - fails, "Fail": fails})
+
+    def gpa_by_education(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return pd.Series(self.edu_gpa_sum / self.edu_counts, index=list(edu_map.values()))
+
+    def risk_distribution(self):
+        return pd.Series(self.risk_counts, index=RISK_LEVELS)
+
+    def risk_summary(self):
+        """Per-category Count / AvgGPA / AvgAbsences / AvgRiskScore, in level order."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return pd.DataFrame({
+                "RiskCategory": RISK_LEVELS,
+                "Count": self.risk_counts,
+                "AvgGPA": self.risk_gpa_sum / self.risk_counts,
+                "AvgAbsences": self.risk_abs_sum / self.risk_counts,
+                "AvgRiskScore": self.risk_score_sum / self.risk_counts,
+            })
+
+    def top_n(self, n=None):
+        return self.top.top(n)
+
+
+# ─── chunked reader ───────────────────────────────────────────────────────────
+def _valid_chunks(path, chunksize):
+    # Rows are validated chunk by chunk, so a StudentID repeated in two
+    # different chunks is not caught here (load_students() checks the whole file).
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        chunk.columns = chunk.columns.str.strip()
+        yield validate(chunk).clean(chunk)
+
+
+def column_maxima(path, chunksize=500_000):
+    """One pass for the Absences / StudyTimeWeekly score normalisers (valid rows only)."""
+    max_abs, max_study = 0, 0.0
+    for chunk in _valid_chunks(path, chunksize):
+        max_abs = max(max_abs, chunk["Absences"].max())
+        max_study = max(max_study, chunk["StudyTimeWeekly"].max())
+    return max_abs, max_study
+
+
+def iter_prepared_chunks(path=DATA_PATH, chunksize=250_000, normaliser=None):
+    norm = normaliser or load_normaliser()
+    if norm.strategy == "cohort":
+        max_abs, max_study = column_maxima(path)
+        for chunk in _valid_chunks(path, chunksize):
+            yield prepare_frame(chunk, max_abs=max_abs, max_study=max_study)
+        return
+    # A file the normaliser has already learned from is only scored, so
+    # streaming it again never re-adds its rows to the scales.
+    _, _, sha1 = fingerprint(path)
+    learn = not norm.seen(sha1)
+    source = sha1
+    for chunk in _valid_chunks(path, chunksize):
+        if learn:
+            norm.observe(chunk, source=source)
+            source = None  # the file is recorded once, with its first chunk
+        yield prepare_frame(chunk, normaliser=norm)
+    if learn:
+        try:
+            norm.save()
+        except OSError:
+            pass
+
+
+def stream_aggregates(path=DATA_PATH, chunksize=250_000, top_k=TOP_LIMIT, normaliser=None):
+    agg = CohortAggregates(top_k)
+    for chunk in iter_prepared_chunks(path, chunksize, normaliser):
+        agg.update(chunk)
+    return agg
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from normalise import STRATEGIES
+
+    ap = argparse.ArgumentParser(description="Summarise a student file chunk by chunk.")
+    ap.add_argument("path", nargs="?", default=DATA_PATH)
+    ap.add_argument("--chunksize", type=int, default=250_000)
+    ap.add_argument("--top", type=int, default=25)
+    ap.add_argument("--normaliser", choices=STRATEGIES)
+    args = ap.parse_args()
+
+    norm = load_normaliser(args.normaliser)
+    agg = stream_aggregates(args.path, args.chunksize, args.top, norm)
+    k = agg.kpis()
+    print(f"Students {k['total']:,}  Avg GPA {k['avg_gpa']:.2f}  "
+          f"Pass {k['pass_rate'] * 100:.1f}%  Fail {k['fail_rate'] * 100:.1f}%  "
+          f"Study {k['avg_study']:.1f} h/wk  Absences {k['avg_abs']:.1f}")
+    print("\nGrade distribution\n" + agg.grade_distribution().to_string())
+    print("\nRisk summary\n" + agg.risk_summary().round(2).to_string(index=False))
+    print(f"\nTop {args.top} at-risk\n" + agg.top_n().to_string(index=False))
@@ -0,0 +1,166 @@
+"""
+student_index.py
+StudentID -> row index for single-student lookups and risk explanations.
+
+StudentIndex is built once per data version (student_index(snap) memoises it
+on the snapshot).  StudentIDs are issued in a dense block, so the index is a
+direct-address table: slot[StudentID - first id] holds the row position, -1
+for an unused ID.  A sparse ID range falls back to pandas' hash index.  Either
+way a lookup does not depend on the cohort size.  The same goes for the
+percentile rank, which is read from the prefix sums of a 0.01-point score
+histogram (histogram.py).
+
+lookup() returns the student's features, RiskScore and category, the points
+each factor contributes under the given weights (scoring.factor_contributions)
+and the percentile rank of their RiskScore in the cohort.  Contributions use
+the same Absences / StudyTimeWeekly scales as the stored scores: the persisted
+normaliser (normalise.py), or the cohort maxima by default.
+
+After a delta (delta.py) updated() patches a copy of the slot table for the
+students removed and added, and takes the delta's score histogram, instead of
+indexing the whole cohort again.
+
+    python student_index.py 1001 --weights Absences=35
+"""
+
+import numpy as np
+import pandas as pd
+
+from data_store import load_normaliser
+from histogram import ScoreHistogram
+from scoring import FACTOR_COLUMNS, WEIGHTS, factor_contributions, weight_vector
+
+# Direct addressing is used while the ID range is at most this many times the row count.
+MAX_SPREAD = 4
+FEATURE_COLUMNS = ["Age", "GenderLabel", "EducationLabel", "TutoringLabel", "SupportLabel",
+                   "StudyTimeWeekly", "Absences", "GPA", "GradeLetter", "ParentalSupport",
+                   "GradeClass"]
+
+
+class StudentIndex:
+    def __init__(self, df, normaliser=None, alive=None, hist=None):
+        """Index of *df*'s rows, or only those where the bool mask *alive* is set.
+
+        *hist*, the score histogram of the same rows, saves a pass if given.
+        """
+        rows = np.arange(len(df)) if alive is None else np.flatnonzero(alive)
+        self._columns(df, normaliser)
+        ids = self.columns["StudentID"].to_numpy(dtype=np.int64)[rows]
+        self.size = len(rows)
+        self.first = int(ids.min()) if len(ids) else 0
+        span = int(ids.max()) - self.first + 1 if len(ids) else 0
+        if span <= MAX_SPREAD * len(ids) + 1024:
+            self.slot = np.full(span, -1, dtype=np.int64)
+            self.slot[ids - self.first] = rows
+            self.hashed = None
+        else:
+            self.slot = None
+            self.hashed = pd.Series(rows, index=ids)
+        if hist is None:
+            live = df.iloc[rows] if alive is not None else df
+            hist = ScoreHistogram().fold(live["RiskScore"].to_numpy(), live["GPA"].to_numpy(),
+                                         live["Absences"].to_numpy())
+        self.hist = hist
+
+    def _columns(self, df, normaliser):
+        self.df = df
+        # Column arrays, so a lookup reads single cells instead of building a row.
+        self.columns = {c: df[c].array for c in
+                        dict.fromkeys(["StudentID", "RiskScore", "RiskCategory"]
+                                      + FEATURE_COLUMNS + FACTOR_COLUMNS) if c in df.columns}
+        self.norm = (normaliser or load_normaliser()).frozen(df)
+
+    def __len__(self):
+        return self.size
+
+    def position(self, student_id):
+        """Row position of *student_id*, or None."""
+        if self.slot is not None:
+            k = student_id - self.first
+            pos = int(self.slot[k]) if 0 <= k < len(self.slot) else -1
+            return pos if pos >= 0 else None
+        pos = self.hashed.get(student_id)
+        return None if pos is None else int(pos)
+
+    def lookup(self, student_id, weights=None):
+        """Features, score, factor contributions and percentile of one student, or None."""
+        pos = self.position(student_id)
+        if pos is None:
+            return None
+        row = {c: arr[pos] for c, arr in self.columns.items()}
+        score = float(row["RiskScore"])
+        category = row["RiskCategory"]
+        points = factor_contributions(*self.norm.inputs(row), weights)
+        total = self.hist.total
+        return {
+            "StudentID": int(row["StudentID"]),
+            "features": {c: _plain(row[c]) for c in FEATURE_COLUMNS if c in row},
+            "RiskScore": score,
+            "RiskCategory": None if pd.isna(category) else str(category),
+            "weights": dict(zip(FACTOR_COLUMNS, weight_vector(weights).round(2).tolist())),
+            "contributions": {c: round(p, 2) for c, p in points.items()},
+            "weighted_score": round(sum(points.values()), 2),
+            "percentile": 100.0 * self.hist.rank(score) / total if total else None,
+        }
+
+    # ── after a delta ────────────────────────────────────────────────────
+    def updated(self, df, alive, removed, added, normaliser, hist):
+        """Index of *df* without the row positions *removed*, with those *added*.
+
+        *df* holds the indexed rows at the same positions and the new ones after
+        them; *hist* is the score histogram of the rows where *alive* is set.
+        """
+        sid = df["StudentID"].to_numpy()
+        ids = sid[added].astype(np.int64)
+        size = len(df) if alive is None else int(np.count_nonzero(alive))
+        span = int(ids.max()) - self.first + 1 if len(ids) else 0
+        if (self.slot is None or len(ids) and ids.min() < self.first
+                or span > MAX_SPREAD * size + 1024):
+            return StudentIndex(df, normaliser, alive, hist)  # off the table: rebuild
+        new = StudentIndex.__new__(StudentIndex)
+        new._columns(df, normaliser)
+        new.first, new.hashed, new.hist, new.size = self.first, None, hist, size
+        if span > len(self.slot):
+            # New IDs past the end: grow by a quarter, so appends rarely copy.
+            new.slot = np.full(max(span, len(self.slot) * 5 // 4), -1, dtype=np.int64)
+            new.slot[:len(self.slot)] = self.slot
+        else:
+            new.slot = self.slot.copy()
+        new.slot[sid[removed].astype(np.int64) - self.first] = -1
+        new.slot[ids - self.first] = added
+        return new
+
+
+def _plain(value):
+    # JSON-friendly scalar from a NumPy / pandas cell.
+    if pd.isna(value):
+        return None
+    if isinstance(value, (np.floating, float)):
+        return round(float(value), 4)
+    return value.item() if hasattr(value, "item") else str(value)
+
+
+def student_index(snap):
+    return snap.derive("student_index", lambda s: StudentIndex(s.df))
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import time
+
+    from data_store import load_students
+
+    ap = argparse.ArgumentParser(description="Look up and explain one student's RiskScore.")
+    ap.add_argument("student_id", type=int)
+    ap.add_argument("--weights", nargs="*", default=[], metavar="COLUMN=WEIGHT")
+    args = ap.parse_args()
+
+    index = StudentIndex(load_students())
+    given = {c: float(w) for c, w in (kv.split("=") for kv in args.weights)}
+    weights = {**WEIGHTS, **given} if given else None
+    t0 = time.perf_counter()
+    result = index.lookup(args.student_id, weights)
+    took = time.perf_counter() - t0
+    print(json.dumps(result, indent=2))
+    print(f"lookup took {took * 1e6:.0f} us")
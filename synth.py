@@ -0,0 +1,188 @@
+"""
+synth.py
+Synthetic student cohorts of any size for load and scale testing.
+
+fit_profile() learns from the bundled export:
+
+  - the marginal distribution of every column (categorical frequencies for the
+    codes and flags, the empirical quantile curve for StudyTimeWeekly and the
+    Absences frequencies),
+  - a linear model of GPA on study time, absences, tutoring, parental support
+    and the activity flags, plus its residual spread,
+  - P(GradeClass | GPA band), so grade classes follow GPA with the same amount
+    of disagreement as the real data.
+
+generate_chunk() draws one block of rows from that profile with vectorised
+NumPy.  Every chunk is seeded by (seed, chunk number), so a cohort is
+reproducible whatever the number of worker processes.  Chunks are generated in
+a process pool and written in order either as CSV or in the columnar mmap
+layout of data_store.py (raw columns, compact dtypes), which each worker fills
+in place so rows never pass through the parent process.
+
+    python synth.py 1000000 -o students_1m.csv
+    python synth.py 50000000 -o students_50m.ewsmap --format mmap --workers 8
+
+Open a columnar file with prepare_frame(open_mmap(path)).
+"""
+
+import json
+import os
+from functools import partial
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+
+from data_store import DATA_PATH, MMAP_MAGIC, RAW_COLUMNS, SCHEMA, _align
+
+DISCRETE_COLUMNS = ["Age", "Gender", "Ethnicity", "ParentalEducation", "Tutoring",
+                    "ParentalSupport", "Extracurricular", "Sports", "Music", "Volunteering"]
+GPA_FEATURES = ["StudyTimeWeekly", "Absences", "Tutoring", "ParentalSupport",
+                "Extracurricular", "Sports", "Music", "Volunteering"]
+GPA_CUTS = [2.0, 2.5, 3.0, 3.5]  # GPA band edges for GradeClass 4 (F) .. 0 (A)
+N_QUANTILES = 201
+CHUNK_ROWS = 1_000_000
+FIRST_ID = 1001
+
+
+# ─── profile ──────────────────────────────────────────────────────────────────
+def _pmf(s):
+    freq = s.value_counts(normalize=True).sort_index()
+    return {"values": freq.index.astype(int).tolist(), "probs": freq.tolist()}
+
+
+def gpa_band(gpa):
+    return 4 - np.digitize(gpa, GPA_CUTS)
+
+
+def fit_profile(path=DATA_PATH):
+    """Summarise *path* into a small JSON-serialisable generation profile."""
+    df = pd.read_csv(path)
+    df.columns = df.columns.str.strip()
+
+    X = np.column_stack([np.ones(len(df))] + [df[c].to_numpy(float) for c in GPA_FEATURES])
+    coef, *_ = np.linalg.lstsq(X, df["GPA"].to_numpy(float), rcond=None)
+    resid = df["GPA"].to_numpy(float) - X @ coef
+
+    grades = pd.crosstab(gpa_band(df["GPA"].to_numpy()), df["GradeClass"].astype(int))
+    grades = grades.reindex(index=range(5), columns=range(5), fill_value=0) + 1e-9
+    grades = grades.div(grades.sum(axis=1), axis=0)
+
+    q = np.linspace(0, 1, N_QUANTILES)
+    return {
+        "discrete": {c: _pmf(df[c]) for c in DISCRETE_COLUMNS + ["Absences"]},
+        "study_quantiles": np.quantile(df["StudyTimeWeekly"], q).tolist(),
+        "gpa_coef": coef.tolist(),
+        "gpa_sigma": float(resid.std()),
+        "grade_given_band": grades.to_numpy().tolist(),
+    }
+
+
+# ─── generation ───────────────────────────────────────────────────────────────
+def generate_chunk(profile, n, start_id=FIRST_ID, seed=0, chunk=0):
+    """Return *n* synthetic raw rows with StudentIDs from *start_id*."""
+    rng = np.random.default_rng([seed, chunk])
+    out = {"StudentID": np.arange(start_id, start_id + n, dtype=np.int64)}
+    for col, pmf in profile["discrete"].items():
+        out[col] = rng.choice(np.array(pmf["values"]), size=n, p=np.array(pmf["probs"]))
+
+    quantiles = np.array(profile["study_quantiles"])
+    out["StudyTimeWeekly"] = np.interp(rng.random(n), np.linspace(0, 1, len(quantiles)),
+                                       quantiles)
+
+    coef = np.array(profile["gpa_coef"])
+    gpa = np.full(n, coef[0])
+    for c, b in zip(GPA_FEATURES, coef[1:]):
+        gpa += b * out[c]
+    gpa += rng.normal(0.0, profile["gpa_sigma"], n)
+    out["GPA"] = np.clip(gpa, 0.0, 4.0)
+
+    # Inverse-CDF draw of GradeClass from its row of P(GradeClass | GPA band).
+    cum = np.cumsum(np.array(profile["grade_given_band"]), axis=1)
+    cum[:, -1] = 1.0
+    rows = cum[gpa_band(out["GPA"])]
+    out["GradeClass"] = (rng.random(n)[:, None] > rows).sum(axis=1)
+    return pd.DataFrame(out)[RAW_COLUMNS]
+
+
+def _chunks(rows, chunk_rows):
+    return [(i, start, min(chunk_rows, rows - start))
+            for i, start in enumerate(range(0, rows, chunk_rows))]
+
+
+def _csv_chunk(profile, seed, job):
+    i, start, n = job
+    df = generate_chunk(profile, n, FIRST_ID + start, seed, i)
+    return df.to_csv(index=False, header=i == 0).encode()
+
+
+def write_csv(path, rows, profile=None, seed=0, workers=None, chunk_rows=CHUNK_ROWS):
+    profile = profile or fit_profile()
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with Pool(workers) as pool, open(tmp, "wb") as fh:
+        for block in pool.imap(partial(_csv_chunk, profile, seed), _chunks(rows, chunk_rows)):
+            fh.write(block)
+    os.replace(tmp, path)
+    return path
+
+
+def _mmap_layout(rows):
+    """Header and per-column (offset, dtype) of a raw-column mmap store."""
+    specs, offset = [], 0
+    for col in RAW_COLUMNS:
+        dtype = np.dtype(SCHEMA[col])
+        specs.append({"name": col, "dtype": dtype.str, "offset": offset,
+                      "nbytes": rows * dtype.itemsize})
+        offset = _align(offset + rows * dtype.itemsize)
+    header = json.dumps({"rows": rows, "columns": specs}).encode()
+    return header, _align(16 + len(header)), specs, offset
+
+
+def _mmap_chunk(profile, seed, path, rows, job):
+    i, start, n = job
+    _, base, specs, _ = _mmap_layout(rows)
+    df = generate_chunk(profile, n, FIRST_ID + start, seed, i)
+    for spec in specs:
+        dtype = np.dtype(spec["dtype"])
+        col = np.memmap(path, mode="r+", dtype=dtype, shape=(n,),
+                        offset=base + spec["offset"] + start * dtype.itemsize)
+        col[:] = df[spec["name"]].to_numpy().astype(dtype)
+        col.flush()
+        del col
+    return n
+
+
+def write_mmap(path, rows, profile=None, seed=0, workers=None, chunk_rows=CHUNK_ROWS):
+    profile = profile or fit_profile()
+    header, base, _, size = _mmap_layout(rows)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(MMAP_MAGIC + np.uint64(len(header)).tobytes() + header)
+        fh.truncate(base + size)
+    with Pool(workers) as pool:
+        for _ in pool.imap_unordered(partial(_mmap_chunk, profile, seed, tmp, rows),
+                                     _chunks(rows, chunk_rows)):
+            pass
+    os.replace(tmp, path)
+    return path
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    ap = argparse.ArgumentParser(description="Generate a synthetic student cohort.")
+    ap.add_argument("rows", type=int)
+    ap.add_argument("-o", "--out", required=True)
+    ap.add_argument("--format", choices=["csv", "mmap"], default="csv")
+    ap.add_argument("--source", default=DATA_PATH, help="file to fit the profile on")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--workers", type=int)
+    ap.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    write = write_csv if args.format == "csv" else write_mmap
+    write(args.out, args.rows, fit_profile(args.source), args.seed, args.workers,
+          args.chunk_rows)
+    print(f"Wrote {args.rows:,} students to {args.out} in {time.perf_counter() - t0:.1f}s")
@@ -0,0 +1,39 @@
+"""
+test_data_store.py
+The mmap store must hand back the prepared frame as views of the mapped file.
+"""
+
+import numpy as np
+import pandas as pd
+
+from data_store import DATA_PATH, load_students, open_mmap, save_mmap
+
+
+def _column_array(s):
+    return s.array.codes if isinstance(s.dtype, pd.CategoricalDtype) else s.to_numpy()
+
+
+def _mapping(a):
+    while not isinstance(a, np.memmap):
+        a = a.base
+    return a
+
+
+def test_mmap_columns_are_views_of_the_file(tmp_path):
+    df = load_students(DATA_PATH, use_cache=False)
+    path = str(tmp_path / "students.mmap")
+    save_mmap(df, path)
+    mapped = open_mmap(path)
+
+    pd.testing.assert_frame_equal(mapped, df)
+    whole = _mapping(_column_array(mapped["StudentID"]))
+    for col in mapped.columns:
+        assert np.shares_memory(_column_array(mapped[col]), whole), col
+
+
+def test_cache_keeps_source_precision():
+    raw = pd.read_csv(DATA_PATH)
+    df = load_students(DATA_PATH, use_cache=False).set_index("StudentID")
+    src = raw.set_index("StudentID").loc[df.index]
+    for col in ("GPA", "StudyTimeWeekly"):
+        np.testing.assert_array_equal(df[col].to_numpy(), src[col].to_numpy())
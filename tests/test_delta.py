@@ -0,0 +1,158 @@
+"""
+test_delta.py
+Incremental delta ingest must agree with scoring the result from scratch.
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_store import DATA_PATH, RAW_COLUMNS, load_students, prepare_frame
+from delta import DeltaState, apply_to_store
+from roster import Roster
+from snapshot import SnapshotStore
+from streaming import CohortAggregates
+from student_index import StudentIndex, student_index
+
+SORTS = [None, [{"column_id": "GPA", "direction": "asc"}],
+         [{"column_id": "Risk Level", "direction": "desc"}]]
+
+
+@pytest.fixture(scope="module")
+def cohort():
+    return load_students(DATA_PATH, use_cache=False)
+
+
+def assert_recomputed(state):
+    live = state.frame()
+    ref = prepare_frame(live[RAW_COLUMNS].copy())
+    np.testing.assert_array_equal(live["RiskScore"].to_numpy(), ref["RiskScore"].to_numpy())
+    full = CohortAggregates.from_frame(ref, state.top_k)
+    assert state.agg.kpis() == pytest.approx(full.kpis())
+    pd.testing.assert_frame_equal(state.agg.risk_summary(), full.risk_summary())
+    assert state.agg.top_n()["StudentID"].tolist() == full.top_n()["StudentID"].tolist()
+
+
+def warmed_store(cohort):
+    # A store whose first snapshot has its roster (sorted both ways) and index built.
+    store = SnapshotStore(DATA_PATH, loader=lambda p: cohort, interval=0)
+    snap = store.current()
+    roster = snap.derive("roster", lambda s: Roster(s.df))
+    for sort_by in SORTS:
+        roster.order(sort_by)
+    student_index(snap)
+    return store
+
+
+def pages(snap):
+    roster = snap.derive("roster", lambda s: Roster(s.df))
+    return [roster.page(p, 25, sort_by, query) for sort_by in SORTS for p in (0, 7)
+            for query in ("", "{Risk Level} = High")]
+
+
+def test_insert_update_delete(cohort):
+    state = DeltaState(cohort, top_k=20)
+    new = cohort.iloc[[0]][RAW_COLUMNS].assign(StudentID=999_001, GPA=0.4)
+    delta = pd.concat([
+        pd.DataFrame({"StudentID": [1001, 1002], "Absences": [12, 3], "GPA": [1.1, None]}),
+        pd.DataFrame({"StudentID": [1003], "Op": ["D"]}),
+        new,
+    ], ignore_index=True)
+    result = state.apply(delta)
+    assert (result.inserted, result.updated, result.deleted) == (1, 2, 1)
+    assert len(state.frame()) == len(cohort)
+    assert_recomputed(state)
+
+
+def test_deleting_the_top_students(cohort):
+    state = DeltaState(cohort, top_k=20)
+    top = state.agg.top_n()["StudentID"].tolist()[:5]
+    state.apply(pd.DataFrame({"StudentID": top, "Op": ["D"] * len(top)}))
+    assert_recomputed(state)
+
+
+def test_deleting_the_max_holder_rescores(cohort):
+    state = DeltaState(cohort, top_k=20)
+    holders = cohort.loc[cohort["Absences"] == cohort["Absences"].max(), "StudentID"].tolist()
+    result = state.apply(pd.DataFrame({"StudentID": holders, "Op": ["D"] * len(holders)}))
+    assert result.rescored
+    assert_recomputed(state)
+    result = state.apply(pd.DataFrame({"StudentID": [1010], "Absences": [60]}))
+    assert result.rescored
+    assert_recomputed(state)
+
+
+def test_concurrent_applies_all_land(cohort):
+    store = SnapshotStore(DATA_PATH, loader=lambda p: cohort, interval=0)
+    ids = cohort["StudentID"].tolist()[:8]
+    threads = [threading.Thread(target=apply_to_store,
+                                args=(store, pd.DataFrame({"StudentID": [sid], "GPA": [0.5]}), 20))
+               for sid in ids]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    df = store.current().df
+    assert (df.loc[df["StudentID"].isin(ids), "GPA"] == 0.5).all()
+    state = store.current().derive("delta", lambda s: None)
+    assert_recomputed(state)
+
+
+def test_published_views_match_a_rebuild(cohort):
+    store = warmed_store(cohort)
+    # Copies of untouched students: ties on every column with the originals.
+    new = cohort.iloc[10:13][RAW_COLUMNS].assign(StudentID=[999_001, 999_002, 999_003])
+    deltas = [
+        pd.DataFrame({"StudentID": [1001, 1002], "Absences": [12, 3], "GPA": [1.1, 3.9]}),
+        pd.DataFrame({"StudentID": [1003, 1004], "Op": ["D", "D"]}),
+        new,
+        pd.DataFrame({"StudentID": [999_002, 1005], "GPA": [0.2, 2.5]}),
+    ]
+    for delta in deltas:
+        version = apply_to_store(store, delta, 20).version
+        snap = store.current()
+        assert snap.version == version
+        live = snap.df
+        for got, want in zip(pages(snap), [Roster(live).page(p, 25, sort_by, query)
+                                           for sort_by in SORTS for p in (0, 7)
+                                           for query in ("", "{Risk Level} = High")]):
+            assert got == want
+        roster, full = snap.derive("roster", lambda s: None), Roster(live)
+        for sort_by in SORTS:
+            ids = roster.values["Student ID"][roster.order(sort_by)]
+            assert ids.tolist() == full.values["Student ID"][full.order(sort_by)].tolist()
+        index, rebuilt = student_index(snap), StudentIndex(live)
+        assert len(index) == len(rebuilt) == len(live)
+        for sid in (1001, 1003, 1005, 1500, 999_002, 999_004):
+            assert index.lookup(sid) == rebuilt.lookup(sid)
+        agg = snap.derive("agg", lambda s: None)
+        assert agg.kpis() == pytest.approx(CohortAggregates.from_frame(live, 20).kpis())
+
+
+def test_publishing_does_not_copy(cohort):
+    store = warmed_store(cohort)
+    new = cohort.iloc[:2][RAW_COLUMNS].assign(StudentID=[999_001, 999_002])
+    apply_to_store(store, new, 20)
+    snap = store.current()
+    state = snap.derive("delta", lambda s: None)
+    for col in ("StudentID", "GPA", "RiskScore"):
+        assert np.shares_memory(snap.df[col].to_numpy(), state.store[col])
+    assert np.shares_memory(snap.df["RiskCategory"].array.codes, state.store["RiskCategory"])
+
+
+def test_older_snapshots_do_not_change(cohort):
+    store = warmed_store(cohort)
+    apply_to_store(store, pd.DataFrame({"StudentID": [1001], "GPA": [0.3]}), 20)
+    old = store.current()
+    df, seen = old.df.copy(), pages(old)
+    kpis, found = old.derive("agg", lambda s: None).kpis(), student_index(old).lookup(1002)
+    apply_to_store(store, pd.DataFrame({"StudentID": [1002, 1006], "Op": ["U", "D"],
+                                        "GPA": [3.7, None]}), 20)
+    apply_to_store(store, cohort.iloc[:1][RAW_COLUMNS].assign(StudentID=999_001), 20)
+    assert store.current() is not old
+    pd.testing.assert_frame_equal(old.df, df)
+    assert pages(old) == seen
+    assert old.derive("agg", lambda s: None).kpis() == kpis
+    assert student_index(old).lookup(1002) == found
@@ -0,0 +1,60 @@
+"""
+test_histogram.py
+Histogram tiers must put every score where pd.cut(..., include_lowest=True) does.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from histogram import ScoreHistogram
+from scoring import RISK_BINS
+
+CUTS = [
+    RISK_BINS,
+    [0, 29.99, 30, 30.01, 100],
+    [0, 12.345, 50.5, 99.995, 100],
+    [10, 20.005, 60],
+]
+
+
+@pytest.fixture(scope="module")
+def cohort():
+    rng = np.random.default_rng(7)
+    # Every cut point and its 0.01 neighbours, several times over, plus noise.
+    edges = np.array([0, 0.01, 9.99, 10, 10.01, 12.34, 12.35, 20, 20.01, 29.98, 29.99,
+                      30, 30.01, 30.02, 50.5, 50.51, 55, 55.01, 60, 60.01, 75, 75.01,
+                      99.99, 100])
+    scores = np.concatenate([np.repeat(edges, 3), rng.integers(0, 10_001, 5000) / 100])
+    return pd.DataFrame({"RiskScore": scores,
+                         "GPA": rng.uniform(0, 4, len(scores)),
+                         "Absences": rng.integers(0, 30, len(scores)).astype(np.float64)})
+
+
+@pytest.fixture(scope="module")
+def hist(cohort):
+    return ScoreHistogram().fold(cohort["RiskScore"].to_numpy(), cohort["GPA"].to_numpy(),
+                                 cohort["Absences"].to_numpy())
+
+
+@pytest.mark.parametrize("cuts", CUTS)
+def test_summary_matches_pd_cut(cohort, hist, cuts):
+    tier = pd.cut(cohort["RiskScore"], cuts, include_lowest=True)
+    want = cohort.groupby(tier, observed=False).agg(
+        Count=("RiskScore", "size"), AvgGPA=("GPA", "mean"),
+        AvgAbsences=("Absences", "mean"), AvgRiskScore=("RiskScore", "mean"))
+    got = hist.summary(cuts)
+    assert got["Count"].tolist() == want["Count"].tolist()
+    for col in ("AvgGPA", "AvgAbsences", "AvgRiskScore"):
+        np.testing.assert_allclose(got[col].to_numpy(), want[col].to_numpy(), rtol=1e-9)
+
+
+@pytest.mark.parametrize("threshold", sorted({c for cuts in CUTS for c in cuts}))
+def test_above_is_strictly_greater(cohort, hist, threshold):
+    rows = cohort[cohort["RiskScore"] > threshold]
+    got = hist.above(threshold)
+    assert got["count"] == len(rows)
+    if len(rows):
+        assert got["avg_gpa"] == pytest.approx(rows["GPA"].mean())
+        assert got["avg_score"] == pytest.approx(rows["RiskScore"].mean())
+    assert hist.rank(threshold) == (cohort["RiskScore"] <= threshold).sum()
@@ -0,0 +1,108 @@
+"""
+test_roster.py
+DataTable paging, sorting and filter queries answered by roster.Roster.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_store import LABEL_DTYPES
+from roster import Roster
+from scoring import RISK_DTYPE
+
+
+@pytest.fixture(scope="module")
+def roster():
+    # Two rows have no risk level (-1 codes) and one has no grade letter.
+    df = pd.DataFrame({
+        "StudentID": np.arange(1001, 1009, dtype=np.int32),
+        "GPA": [2.929195, 3.5, 1.0, 0.75, 2.0, 3.95, 1.5, 2.93],
+        "GradeLetter": pd.Categorical(["C", "A", "F", "F", None, "A", "D", "C"],
+                                      dtype=LABEL_DTYPES["GradeLetter"]),
+        "Absences": np.array([7, 0, 25, 29, 10, 1, 18, 3], dtype=np.uint8),
+        "StudyTimeWeekly": [19.83, 15.4, 2.1, 0.5, 8.0, 18.2, 5.5, 12.0],
+        "RiskScore": [40.1, 12.0, 80.5, 91.25, 55.0, 8.5, 66.0, 39.9],
+        "RiskCategory": pd.Categorical(["Medium", "Low", "Critical", None, "Medium", "Low",
+                                        "High", None], dtype=RISK_DTYPE),
+    })
+    return Roster(df)
+
+
+def ids(roster, query="", sort_by=None, page=0, size=10):
+    rows, _ = roster.page(page, size, sort_by, query)
+    return [r["Student ID"] for r in rows]
+
+
+def test_default_order_is_ranked(roster):
+    assert ids(roster) == [1004, 1003, 1007, 1005, 1001, 1008, 1002, 1006]
+
+
+@pytest.mark.parametrize("query", [
+    "{Risk Level} = Medium",
+    "{Risk Level} s= Medium",
+    '{Risk Level} = "Medium"',
+    "{Risk Level} = 'Medium'",
+    "{Risk Level} eq `Medium`",
+])
+def test_equality_forms(roster, query):
+    assert sorted(ids(roster, query)) == [1001, 1005]
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("{Risk Level} contains i", [1001, 1003, 1005, 1007]),
+    ("{Risk Level} scontains I", [1001, 1003, 1005, 1007]),
+    ('{Grade} contains "f"', [1003, 1004]),
+    ("{Student ID} contains 100", [1001, 1002, 1003, 1004, 1005, 1006, 1007, 1008]),
+    ("{Student ID} scontains 7", [1007]),
+])
+def test_contains_forms(roster, query, expected):
+    assert sorted(ids(roster, query)) == expected
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("{Risk Level} > Medium", [1003, 1007]),
+    ("{Risk Level} s< Medium", [1002, 1006]),
+    ("{Risk Level} != Medium", [1002, 1003, 1004, 1006, 1007, 1008]),
+    ("{Risk Level} = Unknown", []),
+    ("{Risk Level} != Unknown", [1001, 1002, 1003, 1004, 1005, 1006, 1007, 1008]),
+])
+def test_missing_levels_only_match_not_equal(roster, query, expected):
+    assert sorted(ids(roster, query)) == expected
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("{GPA} = 2.93", [1001, 1008]),
+    ("{GPA} s>= 3.5", [1002, 1006]),
+    ("{Risk Score} > 55 && {Absences} < 20", [1007]),
+    ("{Study Hrs/Wk} le 2.1", [1003, 1004]),
+])
+def test_numeric_filters(roster, query, expected):
+    assert sorted(ids(roster, query)) == expected
+
+
+def test_bad_queries_raise(roster):
+    for query in ("{Nope} = 1", "{GPA} ~ 3", "{GPA} > high"):
+        with pytest.raises(ValueError):
+            roster.page(0, 10, None, query)
+
+
+def test_sorting_puts_missing_levels_first_ascending(roster):
+    asc = [{"column_id": "Risk Level", "direction": "asc"}]
+    desc = [{"column_id": "Risk Level", "direction": "desc"}]
+    rows, _ = roster.page(0, 10, asc)
+    assert [r["Risk Level"] for r in rows] == [None, None, "Low", "Low", "Medium", "Medium",
+                                               "High", "Critical"]
+    rows, _ = roster.page(0, 10, desc)
+    assert [r["Risk Level"] for r in rows][-2:] == [None, None]
+    rows, _ = roster.page(0, 10, [{"column_id": "Grade", "direction": "asc"}])
+    assert rows[0]["Grade"] is None and rows[0]["Student ID"] == 1005
+
+
+def test_paging(roster):
+    assert ids(roster, size=3, page=2) == [1002, 1006]
+    rows, total = roster.page(3, 3)
+    assert rows == [] and total == 8
+    rows, total = roster.page(50, 10, None, "{Risk Level} = Critical")
+    assert rows == [] and total == 1
+    assert ids(roster, page=-1, size=2) == [1004, 1003]
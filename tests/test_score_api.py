@@ -0,0 +1,154 @@
+"""
+test_score_api.py
+POST /api/score and /api/delta through Flask's test client.
+"""
+
+import gzip
+import io
+
+import pandas as pd
+import pytest
+from flask import Flask
+
+import score_api
+from data_store import DATA_PATH, load_students
+from snapshot import Snapshot, SnapshotStore
+
+HEADER = b"StudentID,RiskScore,RiskCategory\n"
+
+
+@pytest.fixture(scope="module")
+def snap():
+    return Snapshot("test", DATA_PATH, "0" * 40, load_students(DATA_PATH, use_cache=False))
+
+
+@pytest.fixture(scope="module")
+def client(snap):
+    server = Flask(__name__)
+    score_api.register(server, lambda: snap)
+    return server.test_client()
+
+
+@pytest.fixture(scope="module")
+def body():
+    with open(DATA_PATH, "rb") as fh:
+        return fh.read()
+
+
+def scored(data):
+    return pd.read_csv(io.BytesIO(data), keep_default_na=False, na_values=[""])
+
+
+def test_csv_scores_match_the_dashboard(client, snap, body):
+    r = client.post("/api/score", data=body, content_type="text/csv")
+    assert r.status_code == 200 and r.mimetype == "text/csv"
+    assert "Content-Encoding" not in r.headers
+    out = scored(r.data)
+    want = snap.df[["StudentID", "RiskScore", "RiskCategory"]]
+    assert out["StudentID"].tolist() == want["StudentID"].tolist()  # request order
+    assert (out["RiskScore"].to_numpy() == want["RiskScore"].to_numpy()).all()
+    assert out["RiskCategory"].tolist() == want["RiskCategory"].astype(str).tolist()
+
+
+def test_gzip_round_trip(client, body):
+    plain = client.post("/api/score", data=body, content_type="text/csv")
+    r = client.post("/api/score?chunk_rows=500", data=gzip.compress(body),
+                    content_type="text/csv",
+                    headers={"Content-Encoding": "gzip", "Accept-Encoding": "gzip"})
+    assert r.status_code == 200
+    assert r.headers["Content-Encoding"] == "gzip"
+    assert r.headers["Vary"] == "Accept-Encoding"
+    assert gzip.decompress(r.data) == plain.data
+
+
+@pytest.mark.parametrize("headers", [{}, {"Accept-Encoding": "gzip"}])
+def test_empty_body_gets_the_header_row(client, headers):
+    r = client.post("/api/score", data=b"", content_type="text/csv", headers=headers)
+    assert r.status_code == 200
+    data = gzip.decompress(r.data) if headers else r.data
+    assert data == HEADER
+
+
+def test_header_only_body_gets_the_header_row(client):
+    r = client.post("/api/score", data=b"StudentID,GPA,Absences,StudyTimeWeekly,"
+                                       b"ParentalSupport,GradeClass\n",
+                    content_type="text/csv")
+    assert r.status_code == 200 and r.data == HEADER
+
+
+def test_missing_columns_are_a_400(client):
+    r = client.post("/api/score", data=b"StudentID,GPA\n1001,2.5\n", content_type="text/csv")
+    assert r.status_code == 400
+    assert "error" in r.get_json()
+
+
+def test_invalid_rows_come_back_empty(client):
+    body = (b"StudentID,GPA,Absences,StudyTimeWeekly,ParentalSupport,GradeClass,Note\n"
+            b"1,3.0,4,10,2,1,kept\n"
+            b"2,9.0,4,10,2,1,GPA out of range\n")
+    out = scored(client.post("/api/score", data=body, content_type="text/csv").data)
+    assert out["StudentID"].tolist() == [1, 2]
+    assert out["RiskScore"].notna().tolist() == [True, False]
+    assert out["RiskCategory"].notna().tolist() == [True, False]
+
+
+@pytest.mark.parametrize("query", ["chunk_rows=0", "max_abs=-1", "max_study=lots"])
+def test_bad_parameters_are_a_400(client, body, query):
+    r = client.post(f"/api/score?{query}", data=body, content_type="text/csv")
+    assert r.status_code == 400
+
+
+def test_unsupported_types_are_a_415(client):
+    r = client.post("/api/score", data=b"{}", content_type="application/json")
+    assert r.status_code == 415
+    r = client.post("/api/score", data=b"x", content_type="text/csv",
+                    headers={"Content-Encoding": "br"})
+    assert r.status_code == 415
+
+
+@pytest.fixture
+def store(snap):
+    return SnapshotStore(DATA_PATH, loader=lambda p: snap.df, interval=0)
+
+
+@pytest.fixture
+def delta_client(store, monkeypatch):
+    monkeypatch.setattr(score_api, "DELTA_API", True)
+    server = Flask(__name__)
+    score_api.register(server, store.current, store=store)
+    return server.test_client()
+
+
+def test_delta_is_off_by_default(store):
+    version = store.current().version
+    server = Flask(__name__)
+    score_api.register(server, store.current, store=store)
+    r = server.test_client().post("/api/delta", data=b"StudentID,Op\n1001,D\n",
+                                  content_type="text/csv")
+    assert r.status_code == 403
+    assert store.current().version == version
+
+
+def test_delta_publishes_a_version(delta_client, store):
+    before = store.current()
+    body = b"StudentID,GPA,Op\n1001,0.5,\n1002,,D\n999999,,D\n"
+    r = delta_client.post("/api/delta", data=gzip.compress(body), content_type="text/csv",
+                          headers={"Content-Encoding": "gzip"})
+    assert r.status_code == 200
+    got = r.get_json()
+    assert (got["updated"], got["deleted"], got["missing"], got["inserted"]) == (1, 1, 1, 0)
+    assert got["version"] == store.current().version != before.version
+    df = store.current().df
+    assert df.loc[df["StudentID"] == 1001, "GPA"].tolist() == [0.5]
+    assert 1002 not in df["StudentID"].tolist()
+    r = delta_client.get("/api/student/1002")
+    assert r.status_code == 404
+
+
+@pytest.mark.parametrize("body", [b"", b"GPA\n2.0\n", b"StudentID,GPA\n1001,9.5\n",
+                                  b"StudentID,Op\n1001,X\n"])
+def test_rejected_deltas_are_a_400(delta_client, store, body):
+    version = store.current().version
+    r = delta_client.post("/api/delta", data=body, content_type="text/csv")
+    assert r.status_code == 400 and "error" in r.get_json()
+    assert store.current().version == version
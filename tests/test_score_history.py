@@ -0,0 +1,78 @@
+"""
+test_score_history.py
+Run-to-run diff of two recorded score snapshots.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from score_history import NEW, REMOVED, ScoreRun, baseline_run, diff, list_runs, record_run
+from scoring import RISK_DTYPE, RISK_LEVELS
+
+
+def run_frame(rows):
+    ids, scores, levels = zip(*rows)
+    return pd.DataFrame({"StudentID": np.array(ids, dtype=np.int32),
+                         "RiskScore": np.array(scores),
+                         "RiskCategory": pd.Categorical(levels, dtype=RISK_DTYPE)})
+
+
+# 1 and 6 leave, 7 and 8 arrive, 2 and 4 change level, 3 stays put and 5
+# loses its level (counted as removed from Low, not as a mover).
+OLD = run_frame([(1, 10.0, "Low"), (2, 40.0, "Medium"), (3, 60.0, "High"),
+                 (4, 90.0, "Critical"), (5, 20.0, "Low"), (6, 70.0, "High")])
+NEW_RUN = run_frame([(8, 95.0, "Critical"), (2, 80.0, "Critical"), (3, 62.5, "High"),
+                     (4, 50.0, "Medium"), (5, 130.0, None), (7, 5.0, "Low")])
+
+
+@pytest.fixture(scope="module")
+def runs(tmp_path_factory):
+    root = str(tmp_path_factory.mktemp("history"))
+    first = record_run(OLD, "a" * 40, root)
+    assert record_run(OLD, "a" * 40, root) is None  # same data: not recorded again
+    second = record_run(NEW_RUN, "b" * 40, root)
+    assert list_runs(root) == [first, second]
+    return ScoreRun.load(first), ScoreRun.load(second), root
+
+
+def test_snapshots_round_trip(runs):
+    old, new, root = runs
+    assert old.ids.tolist() == [1, 2, 3, 4, 5, 6]
+    assert new.ids.tolist() == [2, 3, 4, 5, 7, 8]  # stored sorted by StudentID
+    assert new.codes.tolist() == [3, 2, 1, -1, 0, 3]
+    assert baseline_run("b" * 40, root).ids.tolist() == old.ids.tolist()
+
+
+def test_transition_matrix(runs):
+    old, new, _ = runs
+    want = pd.DataFrame(0, index=RISK_LEVELS + [NEW], columns=RISK_LEVELS + [REMOVED])
+    want.loc["Low", REMOVED] = 2          # 1 left, 5 lost its level
+    want.loc["Medium", "Critical"] = 1    # 2
+    want.loc["High", "High"] = 1          # 3
+    want.loc["High", REMOVED] = 1         # 6
+    want.loc["Critical", "Medium"] = 1    # 4
+    want.loc[NEW, "Low"] = 1              # 7
+    want.loc[NEW, "Critical"] = 1         # 8
+    pd.testing.assert_frame_equal(diff(old, new).transitions, want, check_dtype=False)
+
+
+def test_movers(runs):
+    old, new, _ = runs
+    d = diff(old, new)
+    assert d.moved == 2
+    movers = d.movers
+    assert movers["StudentID"].tolist() == [2, 4]  # equal jumps: higher new score first
+    assert movers["OldScore"].tolist() == [40.0, 90.0]
+    assert movers["NewScore"].tolist() == [80.0, 50.0]
+    assert movers["OldLevel"].astype(str).tolist() == ["Medium", "Critical"]
+    assert movers["NewLevel"].astype(str).tolist() == ["Critical", "Medium"]
+    assert movers["Change"].tolist() == [2, -2]
+    assert d.escalated()["StudentID"].tolist() == [2]
+
+
+def test_identical_runs_have_no_movers(runs):
+    old, _, _ = runs
+    d = diff(old, old)
+    assert d.moved == 0
+    assert np.diag(d.transitions[RISK_LEVELS].to_numpy()).tolist() == [2, 1, 2, 1]
@@ -0,0 +1,56 @@
+"""
+test_streaming.py
+Aggregates folded chunk by chunk must match the ones built from the whole frame.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_store import DATA_PATH, RAW_COLUMNS, load_normaliser, load_students
+from streaming import TOP_COLUMNS, CohortAggregates, stream_aggregates
+
+CHUNKSIZES = [97, 1000, 100_000]
+
+
+@pytest.fixture(scope="module")
+def tied_csv(tmp_path_factory):
+    # Two copies of the 40 riskiest students under new, larger IDs, written
+    # first so every tie reaches the stream before the students it must rank
+    # behind, and triples straddle the top-K capacity.
+    df = load_students(DATA_PATH, use_cache=False)
+    top = df.nlargest(40, "RiskScore")[RAW_COLUMNS]
+    copies = [top.assign(StudentID=top["StudentID"] + k * 100_000).iloc[::-1] for k in (2, 1)]
+    path = tmp_path_factory.mktemp("stream") / "tied.csv"
+    pd.concat(copies + [df[RAW_COLUMNS]]).to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture(scope="module")
+def frame(tied_csv):
+    return load_students(tied_csv, use_cache=False, normaliser=load_normaliser("cohort"))
+
+
+@pytest.mark.parametrize("top_k", [16, 60])
+@pytest.mark.parametrize("chunksize", CHUNKSIZES)
+def test_top_n_matches_a_full_sort(tied_csv, frame, chunksize, top_k):
+    agg = stream_aggregates(tied_csv, chunksize=chunksize, top_k=top_k,
+                            normaliser=load_normaliser("cohort"))
+    want = (frame.sort_values(["RiskScore", "StudentID"], ascending=[False, True])
+            .head(top_k)[TOP_COLUMNS].reset_index(drop=True))
+    got = agg.top_n()
+    assert got["StudentID"].tolist() == want["StudentID"].tolist()
+    np.testing.assert_array_equal(got["RiskScore"].to_numpy(), want["RiskScore"].to_numpy())
+    for col in ("GradeLetter", "RiskCategory"):
+        assert got[col].astype(str).tolist() == want[col].astype(str).tolist()
+
+
+@pytest.mark.parametrize("chunksize", CHUNKSIZES)
+def test_summaries_match_the_frame(tied_csv, frame, chunksize):
+    agg = stream_aggregates(tied_csv, chunksize=chunksize, normaliser=load_normaliser("cohort"))
+    full = CohortAggregates.from_frame(frame)
+    assert agg.kpis() == pytest.approx(full.kpis())
+    pd.testing.assert_series_equal(agg.grade_distribution(), full.grade_distribution())
+    pd.testing.assert_series_equal(agg.gpa_by_education(), full.gpa_by_education())
+    pd.testing.assert_frame_equal(agg.risk_summary(), full.risk_summary())
+    np.testing.assert_array_equal(agg.hist.counts, full.hist.counts)
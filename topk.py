@@ -0,0 +1,142 @@
+"""
+topk.py
+Top-K at-risk index, maintained as scores change.
+
+TopK keeps the highest RiskScores of a cohort: `limit` rows that can be
+served, plus as much slack again so that a few students leaving the top do not
+force a rebuild.  It is built with one argpartition over the score column, and
+after that it is a min-heap keyed on (score, -StudentID) with the weakest
+member at the root:
+
+  - offer() pushes rows whose key beats the weakest member (delta inserts and
+    updates, streamed chunks, merged aggregates),
+  - discard() drops students (delta deletes and the old version of updated
+    rows; heap entries are invalidated lazily),
+  - top(n) returns the n best for any n <= limit in O(n) from a sorted view
+    that is only re-sorted after a change.
+
+Ties rank by StudentID, as in roster.py.  Once students have been left
+out, only rows that beat the weakest member can be admitted.  If discards then
+shrink the index below `limit`, it reports `stale` and the owner rebuilds it
+from the frame.  Re-weighting always rebuilds.
+"""
+
+import copy
+import heapq
+import os
+
+import numpy as np
+import pandas as pd
+
+from scoring import RISK_DTYPE
+
+TOP_LIMIT = int(os.environ.get("EWS_TOP_LIMIT", "100"))
+TOP_COLUMNS = ["StudentID", "GPA", "GradeLetter", "Absences",
+               "StudyTimeWeekly", "RiskScore", "RiskCategory"]
+_SCORE = TOP_COLUMNS.index("RiskScore")
+
+
+class TopK:
+    def __init__(self, limit=TOP_LIMIT, slack=None):
+        self.limit = limit
+        self.capacity = limit + (limit if slack is None else slack)
+        self.truncated = False  # some offered student is not held
+        self._heap = []         # (score, -StudentID, seq)
+        self._rows = {}         # StudentID -> (seq, row tuple in TOP_COLUMNS order)
+        self._seq = 0
+        self._sorted = None
+
+    @classmethod
+    def build(cls, df, scores=None, codes=None, limit=TOP_LIMIT):
+        """Index *df*, optionally as scored (scores, level codes) instead of its columns."""
+        top = cls(limit)
+        top.offer(df, scores, codes)
+        return top
+
+    def __len__(self):
+        return len(self._rows)
+
+    @property
+    def stale(self):
+        return self.truncated and len(self._rows) < self.limit
+
+    # ── updating ─────────────────────────────────────────────────────────
+    def offer(self, df, scores=None, codes=None):
+        """Consider every row of *df*; only the best `capacity` can get in."""
+        if scores is None:
+            scores = df["RiskScore"].to_numpy(dtype=np.float64)
+        n = len(scores)
+        if n > self.capacity:
+            kth = np.partition(scores, n - self.capacity)[n - self.capacity]
+            cand = np.flatnonzero(scores >= kth)
+        else:
+            cand = np.arange(n)
+        sids = df["StudentID"].to_numpy()[cand]
+        cand = cand[np.lexsort((sids, -scores[cand]))[:self.capacity]]
+
+        rows = df.iloc[cand][TOP_COLUMNS].copy()
+        rows["RiskScore"] = scores[cand]
+        if codes is not None:
+            rows["RiskCategory"] = pd.Categorical.from_codes(codes[cand], dtype=RISK_DTYPE)
+        for row in rows.itertuples(index=False, name=None):
+            self._push(row)
+        if len(cand) < n:
+            self.truncated = True
+        return self
+
+    def copy(self):
+        top = copy.copy(self)
+        top._heap, top._rows = list(self._heap), dict(self._rows)
+        return top
+
+    def discard(self, student_ids):
+        for sid in student_ids:
+            if self._rows.pop(sid, None) is not None:
+                self._sorted = None
+
+    def merge(self, other):
+        for _, row in other._rows.values():
+            self._push(row)
+        self.truncated |= other.truncated
+        return self
+
+    def _push(self, row):
+        sid, score = row[0], row[_SCORE]
+        if sid in self._rows:
+            del self._rows[sid]
+        key = (score, -sid)
+        if self.truncated or len(self._rows) >= self.capacity:
+            weakest = self._weakest()
+            if weakest is None or key <= weakest:
+                self.truncated = True
+                return
+        self._seq += 1
+        self._rows[sid] = (self._seq, row)
+        heapq.heappush(self._heap, (score, -sid, self._seq))
+        self._sorted = None
+        if len(self._rows) > self.capacity:
+            _, neg_sid, _ = heapq.heappop(self._heap)  # _weakest() left a live root
+            del self._rows[-neg_sid]
+            self.truncated = True
+        elif len(self._heap) > 4 * self.capacity:
+            self._heap = [(r[_SCORE], -sid, seq) for sid, (seq, r) in self._rows.items()]
+            heapq.heapify(self._heap)
+
+    def _weakest(self):
+        heap = self._heap
+        while heap:
+            score, neg_sid, seq = heap[0]
+            live = self._rows.get(-neg_sid)
+            if live is not None and live[0] == seq:
+                return score, neg_sid
+            heapq.heappop(heap)
+        return None
+
+    # ── reading ──────────────────────────────────────────────────────────
+    def top(self, n=None):
+        """The n highest-risk students (n <= limit), best first."""
+        n = self.limit if n is None else min(n, self.limit)
+        if self._sorted is None:
+            self._sorted = sorted((row for _, row in self._rows.values()),
+                                  key=lambda r: (-r[_SCORE], r[0]))
+        return pd.DataFrame(self._sorted[:n], columns=TOP_COLUMNS)
@@ -0,0 +1,153 @@
+"""
+validate.py
+Schema and data-quality checks for raw student rows.
+
+validate() makes one vectorised pass over the columns of a raw frame and
+returns a ValidationReport: for every column and rule, the row positions that
+break it.  Rows with any violation are quarantined; the rest go on to scoring.
+
+    missing      blank cell
+    not_numeric  value that does not parse as a number
+    range        outside the column's allowed range / code list
+    integer      fractional value in a code or count column
+    duplicate    StudentID already seen earlier in the file
+
+A missing column is a schema error and raises ValueError instead.
+data_store.read_validated() caches the report next to the frame caches, keyed
+by the file's SHA-1, and writes the quarantined rows to a CSV beside it.
+
+    python validate.py "Student_performance_data _.csv"
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+# Column -> (integer?, min, max).  Code ranges match the label maps in
+# data_store.py; the others are generous plausibility bounds.
+RULES = {
+    "StudentID":         (True, 0, np.iinfo(np.int32).max),
+    "Age":               (True, 10, 25),
+    "Gender":            (True, 0, 1),
+    "Ethnicity":         (True, 0, 3),
+    "ParentalEducation": (True, 0, 4),
+    "StudyTimeWeekly":   (False, 0.0, 40.0),
+    "Absences":          (True, 0, 180),
+    "Tutoring":          (True, 0, 1),
+    "ParentalSupport":   (True, 0, 4),
+    "Extracurricular":   (True, 0, 1),
+    "Sports":            (True, 0, 1),
+    "Music":             (True, 0, 1),
+    "Volunteering":      (True, 0, 1),
+    "GPA":               (False, 0.0, 4.0),
+    "GradeClass":        (True, 0, 4),
+}
+
+
+class ValidationReport:
+    """Row positions (0-based, header excluded) of every violation found."""
+
+    __slots__ = ("rows", "violations", "bad_rows")
+
+    def __init__(self, rows, violations):
+        self.rows = rows
+        self.violations = violations  # column -> rule -> int64 positions
+        found = [pos for rules in violations.values() for pos in rules.values()]
+        self.bad_rows = (np.unique(np.concatenate(found)) if found
+                         else np.empty(0, dtype=np.int64))
+
+    @property
+    def ok(self):
+        return not len(self.bad_rows)
+
+    def __repr__(self):
+        return f"ValidationReport(rows={self.rows}, bad_rows={len(self.bad_rows)})"
+
+    def summary(self, sample=5):
+        """One line per (column, rule): count and the first few row positions."""
+        out = [(col, rule, len(pos), pos[:sample].tolist())
+               for col, rules in self.violations.items() for rule, pos in rules.items()]
+        return pd.DataFrame(out, columns=["Column", "Rule", "Count", "Rows"])
+
+    def clean(self, df):
+        """*df* without the bad rows, with every checked column numeric."""
+        keep = np.ones(len(df), dtype=bool)
+        keep[self.bad_rows] = False
+        df = df.iloc[np.flatnonzero(keep)].reset_index(drop=True) if len(self.bad_rows) else df
+        for col in RULES:
+            if col in df.columns and df[col].dtype.kind not in "biuf":
+                df[col] = pd.to_numeric(df[col])
+        return df
+
+    def quarantine(self, df):
+        """The bad rows of *df*, with a Violations column naming what failed."""
+        reasons = {}
+        for col, rules in self.violations.items():
+            for rule, pos in rules.items():
+                for p in pos.tolist():
+                    reasons.setdefault(p, []).append(f"{col}:{rule}")
+        out = df.iloc[self.bad_rows].copy()
+        out.insert(0, "Row", self.bad_rows)
+        out["Violations"] = [";".join(reasons[p]) for p in self.bad_rows.tolist()]
+        return out
+
+    # ── persistence ──────────────────────────────────────────────────────
+    def to_json(self):
+        return json.dumps({"rows": self.rows, "violations": {
+            col: {rule: pos.tolist() for rule, pos in rules.items()}
+            for col, rules in self.violations.items()}}).encode()
+
+    @classmethod
+    def from_json(cls, payload):
+        data = json.loads(payload)
+        return cls(data["rows"], {
+            col: {rule: np.asarray(pos, dtype=np.int64) for rule, pos in rules.items()}
+            for col, rules in data["violations"].items()})
+
+
+def validate(df, columns=None):
+    """Check the RULES columns of raw frame *df* (default: all) in one vectorised pass."""
+    columns = list(RULES) if columns is None else list(columns)
+    missing_cols = [c for c in columns if c not in df.columns]
+    if missing_cols:
+        raise ValueError(f"student file is missing columns: {missing_cols}")
+
+    violations = {}
+    for col in columns:
+        integer, lo, hi = RULES[col]
+        s = df[col]
+        if s.dtype.kind in "biuf":
+            v = s.to_numpy(dtype=np.float64)
+            present = ~np.isnan(v)
+            checks = {"missing": ~present}
+        else:
+            v = pd.to_numeric(s, errors="coerce").to_numpy(dtype=np.float64)
+            present = ~np.isnan(v)
+            blank = s.isna().to_numpy()
+            checks = {"missing": blank, "not_numeric": ~present & ~blank}
+        with np.errstate(invalid="ignore"):
+            checks["range"] = present & ((v < lo) | (v > hi))
+            if integer and s.dtype.kind not in "iu":
+                checks["integer"] = present & (v != np.floor(v))
+        if col == "StudentID":
+            checks["duplicate"] = s.duplicated(keep="first").to_numpy() & present
+        found = {rule: np.flatnonzero(mask) for rule, mask in checks.items() if mask.any()}
+        if found:
+            violations[col] = found
+    return ValidationReport(len(df), violations)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Validate a raw student file.")
+    ap.add_argument("path")
+    args = ap.parse_args()
+
+    frame = pd.read_csv(args.path)
+    frame.columns = frame.columns.str.strip()
+    report = validate(frame)
+    print(f"{report.rows:,} rows, {len(report.bad_rows):,} with violations")
+    if not report.ok:
+        print(report.summary().to_string(index=False))